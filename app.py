@@ -1,20 +1,46 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response, send_file
 import os
+import io
+import gzip
 import json
+import threading
 import networkx as nx
-from collections import Counter
+from collections import Counter, OrderedDict
 from c3 import (
     listar_corpus,
     listar_documentos,
     descargar_documento,
     TextProcessor,
     GraphBuilder,
-    ReverseDict,
     TEXTS_DIR,
     LEMAS_DIR,
-    GRAPH_DIR,
     cargar_diccionario,
+    combinar_diccionarios,
+    METODOS_COMBINACION,
+    preparar_busqueda,
+    podar_segun_config,
+    vista_previa_gzip,
+    vista_previa_bloques,
+    ruta_vista_previa,
+    guardar_vista_previa,
+    VISTA_PREVIA_N,
+    listar_diccionarios,
+    catalogo,
+    ruta_exportacion,
+    FORMATOS_EXPORTACION,
+    CONFIG,
+    Plazo,
 )
+from servicio import (
+    buscar_coalescido,
+    buscar_progresivo_coalescido,
+    clave_consulta,
+    vuelos_busqueda,
+    exportador,
+)
+import metricas
+import ndjson
+import perfilado
 
 url_prefix = ''
 with open('config.json', 'r') as f:
@@ -39,42 +65,83 @@ state = {
     "reverse_dict": None,
     "last_graph_file": None,
     "current_diccionario": None,
+    "current_version": None,  # versión del catálogo del diccionario en memoria
 }
 
+# Procesador para lematizar consultas antes de saber si hay que cargar un diccionario
+procesador_consultas = TextProcessor()
+
+
+def _perfil_pedido():
+    """True si el request pide un perfil (X-Perfilar) con un X-Admin-Token válido."""
+    return perfilado.pedido(request.headers) and \
+        perfilado.autorizado(request.headers, CONFIG.get("admin_token"))
+
+
+def _con_perfiles(respuesta, perfiles):
+    """Agrega el header X-Perfil con los ids de los perfiles generados por el request."""
+    respuesta = app.make_response(respuesta)
+    if perfiles:
+        respuesta.headers["X-Perfil"] = ",".join(perfiles)
+    return respuesta
+
+
+# Vistas previas que no están en disco: (nombre, versión, n, peso_min) -> gzip
+# (los hilos del servidor la comparten: todo acceso bajo _lock_vistas_previas)
+vistas_previas = OrderedDict()
+_lock_vistas_previas = threading.Lock()
+MAX_VISTAS_PREVIAS = 16
+MAX_NODOS_VISTA_PREVIA = 5000
+# En NDJSON la vista previa se envía por bloques sin armarla entera: se admiten más nodos
+MAX_NODOS_VISTA_PREVIA_STREAM = int(os.getenv("MAX_NODOS_VISTA_PREVIA_STREAM", "100000"))
 
-def graph_to_json(G, top_n_nodes=None):
-    nodes = []
-    edges = []
-    nodes_list = list(G.nodes())
-    if top_n_nodes:
-        try:
-            nodes_sorted = sorted(
-                G.nodes(data=True),
-                key=lambda x: x[1].get("frequency", 0),
-                reverse=True,
-            )[:top_n_nodes]
-            nodes_list = [n for n, _ in nodes_sorted]
-        except Exception:
-            pass
-
-    for n in nodes_list:
-        data = G.nodes[n]
-        nodes.append(
-            {
-                "id": n,
-                "frequency": int(data.get("frequency", 0)),
-                "degree": int(data.get("degree", G.degree(n))),
-            }
-        )
-
-    for u, v, d in G.edges(data=True):
-        if u in nodes_list and v in nodes_list:
-            edges.append(
-                {"source": u, "target": v,
-                    "weight": float(d.get("weight", 1.0))}
-            )
 
-    return {"nodes": nodes, "edges": edges}
+def olvidar_vistas_previas(nombre):
+    with _lock_vistas_previas:
+        for clave in [c for c in vistas_previas if c[0] == nombre]:
+            del vistas_previas[clave]
+
+
+def _version_actual(nombre):
+    entrada = catalogo.obtener(nombre)
+    return entrada["version"] if entrada else None
+
+
+def _version_de(nombre):
+    """Versión que se muestra: la cargada en memoria si es ese diccionario, si no la actual."""
+    if state.get("current_diccionario") == nombre and state.get("current_version"):
+        return state["current_version"]
+    return _version_actual(nombre)
+
+
+def _grafo_de(nombre, version):
+    """Grafo de esa versión del diccionario: el cargado en memoria si es ese, si no desde disco."""
+    if state.get("current_diccionario") == nombre and state.get("current_version") == version \
+            and state.get("current_graph") is not None:
+        return state["current_graph"]
+    grafo, _, _ = cargar_diccionario(nombre, version=version)
+    return grafo
+
+
+def _respuesta_gzip(contenido=None, ruta=None):
+    """
+    Envía JSON ya comprimido con gzip (bytes o archivo). Si el cliente no acepta
+    gzip se descomprime por partes al enviarlo.
+    """
+    if "gzip" in request.accept_encodings:
+        if ruta:
+            respuesta = send_file(os.path.abspath(ruta), mimetype="application/json")
+        else:
+            respuesta = Response(contenido, content_type="application/json")
+        respuesta.headers["Content-Encoding"] = "gzip"
+        respuesta.headers["Vary"] = "Accept-Encoding"
+        return respuesta
+
+    def descomprimir():
+        with gzip.open(ruta if ruta else io.BytesIO(contenido), "rb") as f:
+            for bloque in iter(lambda: f.read(1 << 16), b""):
+                yield bloque
+    return Response(descomprimir(), content_type="application/json")
 
 
 @app.route("/")
@@ -160,8 +227,8 @@ def api_metadatos(corpus_id):
     }
     """
     try:
-        from c3 import client
-        docs = client.docs_tabla(corpus_id)
+        from c3 import obtener_cliente
+        docs = obtener_cliente().docs_tabla(corpus_id)
 
         metadatos = {}
         for d in docs:
@@ -186,6 +253,15 @@ def api_process():
     if not corpus_id or not doc_ids:
         return jsonify({"ok": False, "error": "Faltan corpus_id o doc_ids"}), 400
 
+    perfiles = []
+    with perfilado.solicitud(_perfil_pedido(), perfiles), \
+            perfilado.perfil(f"construir {dic_name}"):
+        respuesta = _procesar_diccionario(corpus_id, doc_ids, dic_name, data.get("poda"))
+    return _con_perfiles(respuesta, perfiles)
+
+
+def _procesar_diccionario(corpus_id, doc_ids, dic_name, poda=None):
+    """Descarga, lematiza, construye y guarda el diccionario (pipeline de /api/process)."""
     try:
         state["status"] = "processing"
         state["message"] = f"Procesando {len(doc_ids)} documentos..."
@@ -222,12 +298,15 @@ def api_process():
         # Construir Grafo
         grafo = builder.construir_grafo_mejorado(tokens_procesados)
 
+        # Podar (criterios del request o de config.json)
+        grafo = podar_segun_config(grafo, builder, poda)
+
         # Guardar
         from c3 import guardar_diccionario
         guardar_diccionario(dic_name, grafo, builder)
 
-        # Preparar búsqueda inversa
-        reverse_dict = ReverseDict(grafo, processor, builder)
+        # Preparar búsqueda inversa (precalcula la caché de PageRank)
+        reverse_dict = preparar_busqueda(dic_name, grafo, processor, builder)
 
         # Actualizar estado global
         state.update({
@@ -238,10 +317,15 @@ def api_process():
             "processor": processor,
             "reverse_dict": reverse_dict,
             "current_diccionario": dic_name,
+            "current_version": builder.version,
         })
 
-        graph_json = graph_to_json(grafo, top_n_nodes=500)
-        return jsonify({"ok": True, "graph": graph_json, "message": state["message"]})
+        olvidar_vistas_previas(dic_name)
+        return jsonify({
+            "ok": True,
+            "message": state["message"],
+            "resumen": {"nodos": grafo.number_of_nodes(), "aristas": grafo.number_of_edges()},
+        })
 
     except Exception as e:
         print(f"ERROR EN PROCESO: {e}")
@@ -249,15 +333,79 @@ def api_process():
         state["message"] = str(e)
         return jsonify({"ok": False, "error": str(e)}), 500
 
+# Combinar diccionarios guardados en uno nuevo, sin volver a procesar los textos
+@app.route("/api/combinar_diccionarios", methods=["POST"])
+def api_combinar_diccionarios():
+    data = request.get_json() or {}
+    nombres = data.get("diccionarios") or []
+    dic_name = data.get("nombre")
+
+    if len(nombres) < 2 or not dic_name:
+        return jsonify({"ok": False, "error": "Faltan al menos dos diccionarios o el nombre del nuevo"}), 400
+    if dic_name in nombres:
+        return jsonify({"ok": False, "error": "El nombre nuevo no puede ser uno de los diccionarios a combinar"}), 400
+    # "auto" es exacto pero puede volver a contar el corpus unido (crece con el
+    # largo de los textos); "conteos" sólo suma conteos y puede no ser exacto
+    metodo = data.get("metodo", "auto")
+    if metodo not in METODOS_COMBINACION:
+        return jsonify({"ok": False, "error": f"metodo debe ser uno de {list(METODOS_COMBINACION)}"}), 400
+
+    try:
+        state["status"] = "processing"
+        state["message"] = f"Combinando {' + '.join(nombres)}..."
+        print(f"--- Combinando diccionarios: {' + '.join(nombres)} -> {dic_name} ---")
+
+        grafo, processor, builder, detalle = combinar_diccionarios(nombres, dic_name, data.get("poda"), metodo)
+
+        # Búsqueda inversa nueva (el grafo combinado no es ninguno de los anteriores)
+        reverse_dict = preparar_busqueda(dic_name, grafo, processor, builder)
+
+        state.update({
+            "status": "done",
+            "message": f"Diccionario '{dic_name}' creado combinando {len(nombres)} diccionarios ({len(grafo.nodes)} nodos).",
+            "current_graph": grafo,
+            "builder": builder,
+            "processor": processor,
+            "reverse_dict": reverse_dict,
+            "current_diccionario": dic_name,
+            "current_version": builder.version,
+        })
+
+        olvidar_vistas_previas(dic_name)
+        return jsonify({
+            "ok": True,
+            "message": state["message"],
+            "resumen": {"nodos": grafo.number_of_nodes(), "aristas": grafo.number_of_edges()},
+            "combinacion": {
+                "exacto": detalle["exacto"],
+                "metodo": detalle["metodo"],
+                "lemas_umbral": len(detalle["lemas_umbral"]),
+                "sin_bordes": detalle["sin_bordes"],
+            },
+        })
+
+    except ValueError as e:
+        state["status"] = "error"
+        state["message"] = str(e)
+        return jsonify({"ok": False, "error": str(e)}), 400
+    except Exception as e:
+        print(f"ERROR AL COMBINAR: {e}")
+        state["status"] = "error"
+        state["message"] = str(e)
+        return jsonify({"ok": False, "error": str(e)}), 500
+
 # Listar diccionarios disponibles
 @app.route("/api/diccionarios", methods=["GET"])
 def api_diccionarios():
-    index_path = os.path.join(GRAPH_DIR, "diccionarios_index.json")
-    if not os.path.exists(index_path):
-        return jsonify({"ok": True, "data": []})
-    with open(index_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    return jsonify({"ok": True, "data": data})
+    return jsonify({"ok": True, "data": listar_diccionarios()})
+
+
+# Historial de versiones de un diccionario
+@app.route("/api/diccionarios/<nombre>/versiones", methods=["GET"])
+def api_versiones_diccionario(nombre):
+    if catalogo.obtener(nombre) is None:
+        return jsonify({"ok": False, "error": f"El diccionario '{nombre}' no existe."}), 404
+    return jsonify({"ok": True, "data": catalogo.versiones(nombre)})
 
 
 # Seleccionar y cargar un diccionario existente
@@ -267,12 +415,16 @@ def api_load_diccionario():
     nombre = data.get("nombre")
     if not nombre:
         return jsonify({"ok": False, "error": "Falta el nombre del diccionario."}), 400
+    # Versión anterior del historial (GET /api/diccionarios/<nombre>/versiones); por defecto la actual
+    version = data.get("version")
+    if version is not None and (not isinstance(version, int) or isinstance(version, bool) or version < 1):
+        return jsonify({"ok": False, "error": "version debe ser un entero positivo."}), 400
 
-    grafo, processor, builder = cargar_diccionario(nombre)
+    grafo, processor, builder = cargar_diccionario(nombre, version=version)
     if grafo is None:
         return jsonify({"ok": False, "error": "No se pudo cargar el diccionario."}), 404
 
-    reverse_dict = ReverseDict(grafo, processor, builder)
+    reverse_dict = preparar_busqueda(nombre, grafo, processor, builder)
     state.update(
         {
             "current_graph": grafo,
@@ -280,6 +432,7 @@ def api_load_diccionario():
             "processor": processor,
             "reverse_dict": reverse_dict,
             "current_diccionario": nombre,
+            "current_version": builder.version,
         }
     )
 
@@ -287,11 +440,149 @@ def api_load_diccionario():
         {
             "ok": True,
             "message": f"Diccionario '{nombre}' cargado correctamente.",
-            "graph": graph_to_json(grafo, top_n_nodes=500),
+            "resumen": {"nodos": grafo.number_of_nodes(), "aristas": grafo.number_of_edges()},
         }
     )
 
 
+# Vista previa del grafo (comprimida); la interfaz la pide al cargar o crear un diccionario
+@app.route("/api/preview/<nombre>", methods=["GET"])
+def api_preview(nombre):
+    """
+    Subgrafo de las n palabras más frecuentes con aristas de peso >= peso_min.
+    - Sin parámetros (n=500, peso_min=0) se envía el archivo que guardar_diccionario
+      dejó listo, sin cargar el diccionario.
+    - Otros valores se calculan una vez y quedan en memoria.
+    - Con ?formato=ndjson (o Accept: application/x-ndjson) se envía una línea
+      por nodo y después una por arista, por bloques, comprimido con br o gzip
+      según Accept-Encoding; no se guarda en memoria.
+    """
+    try:
+        n = int(request.args.get("n", VISTA_PREVIA_N))
+        peso_min = float(request.args.get("peso_min", 0.0))
+    except ValueError:
+        return jsonify({"ok": False, "error": "n y peso_min deben ser numéricos."}), 400
+    stream = request.args.get("formato") == "ndjson" or ndjson.pedido(request)
+    maximo = MAX_NODOS_VISTA_PREVIA_STREAM if stream else MAX_NODOS_VISTA_PREVIA
+    if not 1 <= n <= maximo:
+        return jsonify({"ok": False, "error": f"n debe estar entre 1 y {maximo}."}), 400
+
+    # La del diccionario en memoria si es ese (puede ser una versión anterior)
+    version = _version_de(nombre)
+    if version is None:
+        return jsonify({"ok": False, "error": "Diccionario no encontrado."}), 404
+
+    if stream:
+        grafo = _grafo_de(nombre, version)
+        if grafo is None:
+            return jsonify({"ok": False, "error": "Diccionario no encontrado."}), 404
+        return ndjson.respuesta(vista_previa_bloques(grafo, n, peso_min), request)
+
+    por_defecto = n == VISTA_PREVIA_N and peso_min <= 0
+    if por_defecto:
+        ruta = ruta_vista_previa(nombre, version)
+        if ruta is not None and os.path.exists(ruta):
+            return _respuesta_gzip(ruta=ruta)
+
+    clave = (nombre, version, n, peso_min)
+    with _lock_vistas_previas:
+        contenido = vistas_previas.get(clave)
+        if contenido is not None:
+            vistas_previas.move_to_end(clave)
+    if contenido is None:
+        # Se arma fuera del lock: no bloquea a los demás hilos mientras tanto
+        grafo = _grafo_de(nombre, version)
+        if grafo is None:
+            return jsonify({"ok": False, "error": "Diccionario no encontrado."}), 404
+        if por_defecto:
+            # Diccionario guardado antes de que existieran las vistas previas:
+            # se guarda si es la versión actual (si no, queda en memoria)
+            ruta = guardar_vista_previa(nombre, grafo, version)
+            if ruta is not None:
+                return _respuesta_gzip(ruta=ruta)
+        contenido = vista_previa_gzip(grafo, n, peso_min)
+        with _lock_vistas_previas:
+            vistas_previas[clave] = contenido
+            while len(vistas_previas) > MAX_VISTAS_PREVIAS:
+                vistas_previas.popitem(last=False)
+    return _respuesta_gzip(contenido=contenido)
+
+
+# Exportación a GraphML / GEXF: se genera sólo cuando alguien la pide
+def _parametros_exportacion(nombre, formato):
+    """Valida nombre y formato; devuelve una respuesta de error o None."""
+    if formato not in FORMATOS_EXPORTACION:
+        return jsonify({"ok": False, "error": f"Formato no soportado: {formato}. "
+                                              f"Usa {', '.join(FORMATOS_EXPORTACION)}."}), 400
+    if catalogo.obtener(nombre) is None:
+        return jsonify({"ok": False, "error": "Diccionario no encontrado."}), 404
+    return None
+
+
+def _solicitar_exportacion(nombre, formato):
+    # Se exporta la versión actual: si es la que está en memoria, sin volver a leerla del disco
+    en_memoria = state.get("current_diccionario") == nombre and \
+        state.get("current_version") == _version_actual(nombre)
+    grafo = state["current_graph"] if en_memoria else None
+    return exportador.solicitar(nombre, formato, grafo)
+
+
+@app.route("/api/exportar/<nombre>", methods=["GET"])
+def api_exportar_descargar(nombre):
+    """
+    Descarga el diccionario en ?formato=graphml (por defecto) o gexf.
+    Si no hay una exportación vigente en disco se genera en ese momento
+    (o se espera la que ya está en curso).
+    """
+    formato = request.args.get("formato", "graphml")
+    error = _parametros_exportacion(nombre, formato)
+    if error:
+        return error
+
+    future = _solicitar_exportacion(nombre, formato)
+    if future is not None:
+        try:
+            if future.result() is None:
+                return jsonify({"ok": False, "error": "Diccionario no encontrado."}), 404
+        except Exception as e:
+            return jsonify({"ok": False, "error": f"No se pudo exportar: {e}"}), 500
+
+    ruta = ruta_exportacion(nombre, formato)
+    return send_file(os.path.abspath(ruta), mimetype="application/xml",
+                     as_attachment=True, download_name=os.path.basename(ruta))
+
+
+@app.route("/api/exportar/<nombre>", methods=["POST"])
+def api_exportar_solicitar(nombre):
+    """
+    Pide la exportación en segundo plano (body: {"formato": "graphml"|"gexf"}).
+    Responde 202 mientras se genera y 200 cuando ya está lista para descargar.
+    """
+    data = request.get_json(silent=True) or {}
+    formato = data.get("formato", "graphml")
+    error = _parametros_exportacion(nombre, formato)
+    if error:
+        return error
+
+    future = _solicitar_exportacion(nombre, formato)
+    if future is None:
+        return jsonify({"ok": True, "estado": "listo"})
+    return jsonify({"ok": True, "estado": "en_curso"}), 202
+
+
+@app.route("/api/exportar/<nombre>/estado", methods=["GET"])
+def api_exportar_estado(nombre):
+    """Estado de la exportación: listo, en_curso, error o pendiente."""
+    formato = request.args.get("formato", "graphml")
+    error = _parametros_exportacion(nombre, formato)
+    if error:
+        return error
+    respuesta = {"ok": True, "estado": exportador.estado(nombre, formato)}
+    if respuesta["estado"] == "error":
+        respuesta["error"] = exportador.error(nombre, formato)
+    return jsonify(respuesta)
+
+
 @app.route("/api/delete_diccionario", methods=["POST"])
 def api_delete_diccionario():
     data = request.get_json()
@@ -304,6 +595,7 @@ def api_delete_diccionario():
     success, message = eliminar_diccionario(nombre)
 
     if success:
+        olvidar_vistas_previas(nombre)
         # Si el diccionario borrado era el actual en memoria, limpiamos el estado
         if state.get("current_diccionario") == nombre:
              state.update({
@@ -312,6 +604,7 @@ def api_delete_diccionario():
                 "processor": None,
                 "reverse_dict": None,
                 "current_diccionario": None,
+                "current_version": None,
             })
         return jsonify({"ok": True, "message": message})
     else:
@@ -324,24 +617,96 @@ def api_search():
     definition = data.get("definition", "")
     dic_name = data.get("diccionario")
     top_k = int(data.get("top_k", 10))
+    # Búsqueda progresiva: las estrategias que quepan en deadline_ms (ver ReverseDict.buscar_progresivo)
+    presupuesto = None
 
     if not definition:
         return jsonify({"ok": False, "error": "Falta la definición."}), 400
+    if data.get("progresivo"):
+        try:
+            presupuesto = Plazo.desde_ms(data.get("deadline_ms", 10000))
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+
+    perfiles = []
+    estrategias = None
+    etiqueta = f"buscar {dic_name or state.get('current_diccionario')}"
+    with metricas.desglose() as etapas, \
+            perfilado.solicitud(_perfil_pedido(), perfiles), perfilado.perfil(etiqueta):
+        if dic_name:
+            # Búsquedas idénticas en vuelo comparten también la carga del diccionario
+            # (de su versión actual: la versión va en la clave)
+            version = _version_actual(dic_name)
+            if version is None:
+                return jsonify({"ok": False, "error": "Diccionario no encontrado."}), 404
+            definicion_limpia, lemas = procesador_consultas.procesar_consulta(definition)
+            clave = clave_consulta((dic_name, version), definicion_limpia, lemas, top_k)
+
+            def cargar_y_buscar():
+                grafo, processor, builder = cargar_diccionario(dic_name, version=version)
+                if not grafo:
+                    return None
+                rd = preparar_busqueda(dic_name, grafo, processor, builder)
+                if presupuesto is not None:
+                    return rd.buscar_progresivo(definicion_limpia, lemas, top_k=top_k,
+                                                presupuesto=presupuesto)
+                return rd.buscar_desde_lemas(definicion_limpia, lemas, top_k=top_k)
+
+            if presupuesto is not None:
+                clave += ("progresivo", presupuesto.segundos)
+            resultados = vuelos_busqueda.hacer(clave, cargar_y_buscar)
+            if resultados is None:
+                return jsonify({"ok": False, "error": "Diccionario no encontrado."}), 404
+            if presupuesto is not None:
+                resultados, estrategias = resultados
+        else:
+            rd = state.get("reverse_dict")
+            if rd is None:
+                return jsonify({"ok": False, "error": "No hay diccionario cargado."}), 400
+            # Sólo se coalesce con búsquedas en la misma versión del diccionario
+            diccionario = (state.get("current_diccionario"), state.get("current_version"))
+            if presupuesto is not None:
+                resultados, estrategias = buscar_progresivo_coalescido(
+                    diccionario, rd, definition, top_k=top_k, presupuesto=presupuesto)
+            else:
+                resultados = buscar_coalescido(diccionario, rd, definition, top_k=top_k)
 
-    if dic_name:
-        grafo, processor, builder = cargar_diccionario(dic_name)
-        if not grafo:
-            return jsonify({"ok": False, "error": "Diccionario no encontrado."}), 404
-        rd = ReverseDict(grafo, processor, builder)
-    else:
-        rd = state.get("reverse_dict")
-        if rd is None:
-            return jsonify({"ok": False, "error": "No hay diccionario cargado."}), 400
-
-    resultados = rd.buscar_multiple_estrategias(definition, top_k=top_k)
     resultados_s = [
         {"palabra": r[0], "score": float(r[1])} for r in resultados]
-    return jsonify({"ok": True, "results": resultados_s})
+    respuesta = {"ok": True, "results": resultados_s}
+    if estrategias is not None:
+        respuesta["estrategias"] = estrategias
+    if data.get("debug"):
+        respuesta["debug"] = metricas.debug(etapas)
+    return _con_perfiles(jsonify(respuesta), perfiles)
+
+
+@app.route("/api/metrics", methods=["GET"])
+def api_metrics():
+    """Métricas del proceso en formato de texto de Prometheus."""
+    return Response(metricas.exportar_prometheus(), content_type=metricas.CONTENT_TYPE)
+
+
+@app.route("/api/admin/perfiles", methods=["GET"])
+def api_admin_perfiles():
+    """Perfiles guardados de búsquedas y construcciones (requiere X-Admin-Token)."""
+    if not perfilado.autorizado(request.headers, CONFIG.get("admin_token")):
+        return jsonify({"ok": False, "error": "No autorizado"}), 403
+    return jsonify({"ok": True, "data": perfilado.listar()})
+
+
+@app.route("/api/admin/perfiles/<id_perfil>", methods=["GET"])
+def api_admin_perfil(id_perfil):
+    """Descarga un perfil (.pstats) o su resumen con ?formato=texto."""
+    if not perfilado.autorizado(request.headers, CONFIG.get("admin_token")):
+        return jsonify({"ok": False, "error": "No autorizado"}), 403
+    ruta = perfilado.ruta(id_perfil)
+    if ruta is None:
+        return jsonify({"ok": False, "error": "Perfil no encontrado."}), 404
+    if request.args.get("formato") == "texto":
+        return Response(perfilado.como_texto(id_perfil), content_type="text/plain; charset=utf-8")
+    return send_file(os.path.abspath(ruta), mimetype="application/octet-stream",
+                     as_attachment=True, download_name=id_perfil + ".pstats")
 
 
 if __name__ == "__main__":
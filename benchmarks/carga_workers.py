@@ -0,0 +1,119 @@
+# ============================================
+# Prueba de carga del modo producción: requests por segundo con 1, 2, 4 y 8 workers
+#
+#   python benchmarks/carga_workers.py --diccionario "Corpus Recetas" --duracion 20
+#
+# Para cada número de workers arranca gunicorn (wsgi:api), espera a que
+# /api/v1/health responda, lanza clientes concurrentes contra /api/v1/buscar
+# durante --duracion segundos y reporta requests/s y latencias.
+# ============================================
+
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFINICIONES = [
+    "órgano que bombea sangre",
+    "cebolla picada con tomate",
+    "líquido que se obtiene de la leche",
+    "enfermedad de transmisión sexual",
+    "ingrediente que se agrega al final",
+]
+
+
+def esperar_servidor(url, espera=300):
+    limite = time.time() + espera
+    while time.time() < limite:
+        try:
+            if requests.get(url + "/api/v1/health", timeout=1).ok:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def medir(url, diccionario, clientes, duracion):
+    latencias = []
+    errores = [0]
+    lock = threading.Lock()
+    fin = time.time() + duracion
+
+    def cliente(i):
+        sesion = requests.Session()
+        k = i
+        while time.time() < fin:
+            body = {"diccionario": diccionario,
+                    "definicion": DEFINICIONES[k % len(DEFINICIONES)], "top_k": 10}
+            k += 1
+            t0 = time.perf_counter()
+            try:
+                r = sesion.post(url + "/api/v1/buscar", json=body, timeout=60)
+                ok = r.ok
+            except requests.RequestException:
+                ok = False
+            dt = time.perf_counter() - t0
+            with lock:
+                if ok:
+                    latencias.append(dt)
+                else:
+                    errores[0] += 1
+
+    hilos = [threading.Thread(target=cliente, args=(i,)) for i in range(clientes)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    latencias.sort()
+    p = lambda q: latencias[min(len(latencias) - 1, int(q * len(latencias)))] * 1000 if latencias else 0.0
+    return {
+        "rps": len(latencias) / duracion,
+        "p50_ms": p(0.50),
+        "p95_ms": p(0.95),
+        "errores": errores[0],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de carga por número de workers")
+    parser.add_argument("--diccionario", default="Corpus Recetas")
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--clientes", type=int, default=16)
+    parser.add_argument("--duracion", type=float, default=20)
+    parser.add_argument("--puerto", type=int, default=5101)
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.puerto}"
+    filas = []
+    for n in [int(w) for w in args.workers.split(",")]:
+        env = dict(os.environ, WORKERS=str(n), BIND=f"127.0.0.1:{args.puerto}",
+                   DICCIONARIOS_PRECARGA=args.diccionario,
+                   PIDFILE=os.path.join("data", f"carga_{n}.pid"))
+        proc = subprocess.Popen(["gunicorn", "-c", "gunicorn.conf.py", "wsgi:api"],
+                                cwd=RAIZ, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not esperar_servidor(url):
+                print(f"El servidor con {n} workers no arrancó.")
+                continue
+            medir(url, args.diccionario, args.clientes, 2)  # calentamiento
+            r = medir(url, args.diccionario, args.clientes, args.duracion)
+            filas.append((n, r))
+            print(f"{n} workers: {r['rps']:.1f} req/s  p50={r['p50_ms']:.1f} ms  "
+                  f"p95={r['p95_ms']:.1f} ms  errores={r['errores']}")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    print("\nworkers | req/s  | p50 ms | p95 ms")
+    for n, r in filas:
+        print(f"{n:7d} | {r['rps']:6.1f} | {r['p50_ms']:6.1f} | {r['p95_ms']:6.1f}")
+    sys.exit(0 if filas else 1)
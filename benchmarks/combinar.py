@@ -0,0 +1,161 @@
+# ============================================
+# Combinar diccionarios: suma de coocurrencias contra construir desde cero
+#
+#   python benchmarks/combinar.py
+#   python benchmarks/combinar.py --corpus 18,29,75
+#
+# Con los corpus de data/lemas (en el orden dado; por defecto, todos) construye
+# un GraphBuilder por corpus y otro sobre todos los tokens uno detrás de otro
+# (lo que haría /api/process con los textos unidos). Después los combina con
+# combinar_coocurrencias, pasando los conteos por guardar/cargar como los
+# diccionarios guardados, con metodo "auto" (con las secuencias) y "conteos",
+# y compara contra la construcción desde cero:
+#   - vocab_freq, conteos por distancia, bordes y secuencia
+#   - grafo (nodos, aristas en orden y pesos) sin podar y podado con CONFIG
+# Si combinar_coocurrencias dice que el resultado es exacto tiene que ser
+# idéntico; si no, reporta cuánto difiere. Termina con código 1 si un
+# resultado "exacto" difiere.
+# --sintetico agrega una prueba con los mismos corpus recortados para que
+# ningún lema cruce el umbral de frecuencia (el caso exacto).
+# ============================================
+
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(RAIZ)
+sys.path.insert(0, RAIZ)
+
+import c3  # noqa: E402
+
+
+def leer_tokens(ruta):
+    with open(ruta, "r", encoding="utf-8") as f:
+        return [w for w in f.read().split() if len(w) > 2 and w not in c3.STOPWORDS]
+
+
+def construir(palabras):
+    """(builder, grafo sin podar, grafo podado, segundos) de una secuencia de lemas."""
+    inicio = time.perf_counter()
+    tokens = c3.FlujoTokens()
+    for w in palabras:
+        tokens.agregar(w, 'UNK')
+    builder = c3.GraphBuilder(c3.TextProcessor())
+    grafo = builder.construir_grafo_mejorado(tokens)
+    podado = c3.podar_segun_config(grafo.copy(), builder)
+    return builder, grafo, podado, time.perf_counter() - inicio
+
+
+def aristas(grafo):
+    return [(u, v, d["weight"]) for u, v, d in grafo.edges(data=True)]
+
+
+def comparar(combinado, desde_cero):
+    """Lista de diferencias entre dos (vocab_freq, coocurrencias, grafo, podado)."""
+    (vf_a, co_a, g_a, p_a), (vf_b, co_b, g_b, p_b) = combinado, desde_cero
+    diferencias = []
+    if list(vf_a.items()) != list(vf_b.items()):
+        diferencias.append("vocab_freq")
+    campos = ["inicio", "u", "v", "conteo", "primero", "cabeza", "cola"]
+    if co_a.lemas != co_b.lemas or any(not np.array_equal(getattr(co_a, c), getattr(co_b, c)) for c in campos):
+        diferencias.append("coocurrencias")
+    for nombre, x, y in (("grafo", g_a, g_b), ("grafo podado", p_a, p_b)):
+        if list(x.nodes()) != list(y.nodes()) or aristas(x) != aristas(y):
+            diferencias.append(nombre)
+    return diferencias
+
+
+def distancia_grafos(x, y):
+    """(Jaccard de nodos, Jaccard de aristas, diferencia L1 relativa de pesos)."""
+    nx_, ny_ = set(x.nodes()), set(y.nodes())
+    ax = {tuple(sorted((u, v))): w for u, v, w in aristas(x)}
+    ay = {tuple(sorted((u, v))): w for u, v, w in aristas(y)}
+    claves = set(ax) | set(ay)
+    l1 = sum(abs(ax.get(k, 0.0) - ay.get(k, 0.0)) for k in claves)
+    return (len(nx_ & ny_) / len(nx_ | ny_), len(set(ax) & set(ay)) / len(claves),
+            l1 / sum(ay.values()))
+
+
+def combinar(partes, carpeta, metodo):
+    """(vocab_freq, coocurrencias, grafo, podado, detalle, s cargar, s combinar) como combinar_diccionarios."""
+    inicio = time.perf_counter()
+    entradas = []
+    for i, (builder, _, _, _) in enumerate(partes):
+        # Como en un diccionario guardado: vocab_freq del JSON y conteos del .npz
+        ruta = os.path.join(carpeta, f"parte{i}.coocurrencias.npz")
+        builder.coocurrencias.guardar(ruta)
+        entradas.append((builder.vocab_freq, c3.Coocurrencias.cargar(ruta, con_secuencia=metodo == "auto")))
+    cargado = time.perf_counter()
+    vocab_freq, coocurrencias, detalle = c3.combinar_coocurrencias(entradas, metodo)
+    builder = c3.GraphBuilder(c3.TextProcessor())
+    builder.vocab_freq, builder.coocurrencias = vocab_freq, coocurrencias
+    grafo = builder.grafo_desde_coocurrencias(c3.CONFIG["ventana"], c3.CONFIG["decaimiento"])
+    podado = c3.podar_segun_config(grafo.copy(), builder)
+    return (vocab_freq, coocurrencias, grafo, podado, detalle,
+            cargado - inicio, time.perf_counter() - cargado)
+
+
+def probar(titulo, secuencias, carpeta):
+    partes = [construir(s) for s in secuencias]
+    b_cero, g_cero, p_cero, t_cero = construir([w for s in secuencias for w in s])
+    print(f"\n{titulo}: {sum(len(s) for s in secuencias)} tokens, "
+          f"{g_cero.number_of_nodes()} nodos, {g_cero.number_of_edges()} aristas")
+    print(f"  desde cero (sin descargar ni lematizar): {t_cero * 1000:.0f} ms")
+
+    bien = True
+    for metodo in c3.METODOS_COMBINACION:
+        vocab_freq, coocurrencias, grafo, podado, detalle, t_cargar, t_combinar = \
+            combinar(partes, carpeta, metodo)
+        diferencias = comparar((vocab_freq, coocurrencias, grafo, podado),
+                               (b_cero.vocab_freq, b_cero.coocurrencias, g_cero, p_cero))
+        if metodo == "auto" and not np.array_equal(coocurrencias.secuencia, b_cero.coocurrencias.secuencia):
+            diferencias.append("secuencia")
+        print(f"  metodo={metodo}: método {detalle['metodo']}, "
+              f"exacto={detalle['exacto']} ({len(detalle['lemas_umbral'])} lemas cruzan el umbral); "
+              f"combinar {t_combinar * 1000:.0f} ms (+ {t_cargar * 1000:.0f} ms guardar/cargar)")
+        if diferencias:
+            jn, ja, l1 = distancia_grafos(podado, p_cero)
+            print(f"    difiere en: {', '.join(diferencias)}; grafo podado: Jaccard nodos {jn:.4f}, "
+                  f"aristas {ja:.4f}, diferencia L1 de pesos {l1:.2%}")
+        else:
+            print("    idéntico a la construcción desde cero")
+        bien &= not (detalle["exacto"] and diferencias)
+    return bien
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Combinar diccionarios contra construir desde cero")
+    parser.add_argument("--corpus", help="Ids de corpus separados por coma, en orden (por defecto, todos)")
+    parser.add_argument("--sintetico", action="store_true",
+                        help="Agregar la prueba sin lemas que crucen el umbral")
+    args = parser.parse_args()
+
+    rutas = {os.path.basename(r).split("_")[0]: r
+             for r in glob.glob(os.path.join(c3.LEMAS_DIR, "*_corpus_lemas.txt"))}
+    ids_corpus = args.corpus.split(",") if args.corpus else sorted(rutas)
+    secuencias = [leer_tokens(rutas[i]) for i in ids_corpus]
+
+    bien = True
+    with tempfile.TemporaryDirectory() as carpeta:
+        bien &= probar(" + ".join(ids_corpus), secuencias, carpeta)
+        if args.sintetico:
+            # Cada corpus sólo con los lemas que el filtro deja en todos y en la unión
+            todas = [w for s in secuencias for w in s]
+            lemas, conteos = np.unique(todas, return_counts=True)
+            comunes = set(lemas[c3.GraphBuilder.filtro_frecuencia(conteos)].tolist())
+            for s in secuencias:
+                ls, cs = np.unique(s, return_counts=True)
+                comunes &= set(ls[c3.GraphBuilder.filtro_frecuencia(cs)].tolist())
+            recortadas = [[w for w in s if w in comunes] for s in secuencias]
+            bien &= probar(" + ".join(ids_corpus) + " (sólo lemas comunes)", recortadas, carpeta)
+
+    if not bien:
+        print("\nDIFERENCIAS en un resultado marcado como exacto.")
+        sys.exit(1)
+    print("\nLos resultados marcados como exactos son idénticos a la construcción desde cero.")
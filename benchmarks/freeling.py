@@ -0,0 +1,172 @@
+# ============================================
+# Servidor FreeLing local y benchmark del cliente (freeling.ClienteFreeling)
+#
+#   python benchmarks/freeling.py                       # benchmark
+#   python benchmarks/freeling.py --latencia 200 --fallos 0.2
+#   python benchmarks/freeling.py --servidor --puerto 8765
+#
+# El servidor imita a servicio-freeling/analyze.php: recibe el texto como
+# archivo multipart y responde el JSON de FreeLing (lista de oraciones, cada
+# una una lista de palabras con form, lemma y tag). Lematiza de forma
+# determinista (el lema es la palabra en minúsculas) y tarda --latencia ms
+# más un tiempo proporcional al tamaño del texto, para que se note el efecto
+# de fragmentar y paralelizar. Con --fallos responde 500 a esa fracción de
+# los textos (elegidos por hash, así que un reintento vuelve a fallar).
+#
+# Con TextProcessor(freeling=ClienteFreeling(url local)) el cliente puede
+# probarse sin red: el benchmark compara un solo POST con todo el texto
+# (como antes) contra el cliente en paralelo, verifica que los tokens sean
+# los mismos y que un fragmento fallido sólo afecte a ese fragmento.
+# ============================================
+
+import argparse
+import glob
+import io
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+import zlib
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ForkingMixIn
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(RAIZ)
+sys.path.insert(0, RAIZ)
+
+PATRON_ORACION = re.compile(r"[^.!?;\n]+[.!?;\n]?")
+PATRON_PALABRA = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def analizar_como_freeling(texto):
+    """Respuesta con el formato JSON de FreeLing para el texto."""
+    oraciones = []
+    for oracion in PATRON_ORACION.findall(texto):
+        palabras = []
+        for forma in PATRON_PALABRA.findall(oracion):
+            if forma.isalpha():
+                palabras.append({"form": forma, "lemma": forma.lower(), "tag": "NCMS000"})
+            elif not forma.isspace():
+                palabras.append({"form": forma, "lemma": forma, "tag": "Fp"})
+        if palabras:
+            oraciones.append(palabras)
+    return oraciones
+
+
+class ServidorForking(ForkingMixIn, HTTPServer):
+    """Un proceso por request, como un servicio que atiende en paralelo de verdad."""
+
+
+def crear_servidor(puerto=0, latencia=0.0, fallos=0.0, ms_por_kb=1.0):
+    """Servidor con el servicio FreeLing simulado (puerto 0 = libre)."""
+
+    class Manejador(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            cuerpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            mensaje = BytesParser(policy=HTTP).parsebytes(
+                b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n" + cuerpo)
+            datos = b""
+            for parte in mensaje.iter_parts():
+                if parte.get_param("name", header="content-disposition") == "file":
+                    datos = parte.get_payload(decode=True)
+
+            time.sleep(latencia / 1000 + len(datos) / 1024 * ms_por_kb / 1000)
+            # Falla siempre con el mismo contenido (también en los reintentos)
+            if zlib.crc32(datos) / 2 ** 32 < fallos:
+                self.send_response(500)
+                self.end_headers()
+                return
+
+            respuesta = json.dumps(analizar_como_freeling(datos.decode("utf-8")),
+                                   ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(respuesta)))
+            self.end_headers()
+            self.wfile.write(respuesta)
+
+    return ServidorForking(("127.0.0.1", puerto), Manejador)
+
+
+def un_solo_post(url, texto):
+    """Como lematizar_freeling_mejorado antes: un POST con todo el texto, sin sesión."""
+    import requests
+    archivo = io.BytesIO(texto.encode("utf-8"))
+    archivo.name = "texto.txt"
+    r = requests.post(url, files={"file": archivo},
+                      params={"outf": "tagged", "format": "json"}, timeout=300)
+    return [(w["lemma"], w["form"], w.get("tag")) for sent in r.json() for w in sent]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor FreeLing local y benchmark del cliente")
+    parser.add_argument("--servidor", action="store_true", help="Sólo levantar el servidor")
+    parser.add_argument("--puerto", type=int, default=0)
+    parser.add_argument("--latencia", type=float, default=50.0, help="ms por request")
+    parser.add_argument("--ms-por-kb", type=float, default=1.0)
+    parser.add_argument("--fallos", type=float, default=0.0, help="Fracción de requests que fallan")
+    parser.add_argument("--paralelo", type=int, default=4)
+    parser.add_argument("--fragmento", type=int, default=100000)
+    args = parser.parse_args()
+
+    if args.servidor:
+        servidor = crear_servidor(args.puerto, args.latencia, args.fallos, args.ms_por_kb)
+        print(f"FreeLing local en http://127.0.0.1:{servidor.server_address[1]}/analyze.php", flush=True)
+        servidor.serve_forever()
+        sys.exit(0)
+
+    # El servidor corre en otro proceso para no competir por el GIL con el cliente
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        puerto = s.getsockname()[1]
+    proceso = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--servidor", "--puerto", str(puerto),
+         "--latencia", str(args.latencia), "--ms-por-kb", str(args.ms_por_kb), "--fallos", str(args.fallos)],
+        stdout=subprocess.PIPE, text=True)
+    proceso.stdout.readline()
+    url = f"http://127.0.0.1:{puerto}/analyze.php"
+
+    import c3  # noqa: E402
+    from freeling import ClienteFreeling  # noqa: E402
+
+    processor = c3.TextProcessor()
+    textos = []
+    for ruta in sorted(glob.glob(os.path.join("data", "textos", "*_clean.txt"))):
+        with open(ruta, "r", encoding="utf-8") as f:
+            textos.append(f.read())
+    texto = " ".join(textos)
+    print(f"Texto: {len(texto) / 1e6:.2f} MB; servidor con {args.latencia:.0f} ms + "
+          f"{args.ms_por_kb} ms/KB, fallos {args.fallos:.0%}")
+
+    inicio = time.perf_counter()
+    referencia = processor._tokens_freeling([(texto, un_solo_post(url, texto))]) if args.fallos == 0 else None
+    if referencia is not None:
+        print(f"  un solo POST             {time.perf_counter() - inicio:7.2f} s  {len(referencia)} tokens")
+
+    # Caché suficiente para el corpus completo, para medir la segunda pasada
+    cliente = ClienteFreeling(url=url, max_fragmento=args.fragmento, paralelo=args.paralelo,
+                              max_cache=10 * len(texto.split()))
+    processor = c3.TextProcessor(freeling=cliente)
+    inicio = time.perf_counter()
+    tokens = processor.lematizar_freeling_mejorado(texto)
+    print(f"  cliente ({args.paralelo} en paralelo)  {time.perf_counter() - inicio:7.2f} s  "
+          f"{len(tokens)} tokens en {len(cliente.fragmentar(texto))} fragmentos")
+    inicio = time.perf_counter()
+    processor.lematizar_freeling_mejorado(texto)
+    print(f"  cliente, desde la caché  {time.perf_counter() - inicio:7.2f} s")
+
+    proceso.terminate()
+
+    if referencia is not None:
+        iguales = [t["lema"] for t in tokens] == [t["lema"] for t in referencia]
+        print(f"  lemas {'idénticos' if iguales else 'DIFERENTES'} a un solo POST")
+        if not iguales:
+            sys.exit(1)
@@ -0,0 +1,172 @@
+# ============================================
+# Kernels de kernels.py: equivalencia y aceleración por backend
+#
+#   python benchmarks/kernels.py
+#   python benchmarks/kernels.py --corpus 18,29 --consultas 50
+#
+# Para cada corpus de data/lemas construye el grafo y mide cada kernel con
+# la versión NumPy y, si está instalado, con numba (la compilación se mide
+# aparte, la primera llamada):
+#   - conteo de pares por distancia (1..ventana_max) de Coocurrencias.contar
+#   - propagación de activación de una consulta, contra el bucle en Python
+#     sobre los dicts de networkx que se usaba antes
+#   - filas densas de la adyacencia (embeddings sin node2vec), contra el
+#     bucle anterior; ése es cuadrático, así que se mide sobre --muestra
+#     nodos y se extrapola
+# Verifica que todos los backends den lo mismo (los conteos, idénticos; los
+# flotantes, con tolerancia) y termina con código 1 si alguno difiere.
+# ============================================
+
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(RAIZ)
+sys.path.insert(0, RAIZ)
+
+import c3  # noqa: E402
+import kernels  # noqa: E402
+
+BACKENDS = ["numpy"] + (["numba"] if kernels.numba is not None else [])
+
+
+def propagacion_python(G, lemas_def, iteraciones=3):
+    """ReverseDict._propagacion_activacion antes de kernels.py."""
+    activacion = {node: 0 for node in G.nodes()}
+    for lema in lemas_def:
+        activacion[lema] = 1.0
+    for _ in range(iteraciones):
+        nueva_activacion = {}
+        for node in G.nodes():
+            suma = activacion[node] * 0.5
+            for vecino in G.neighbors(node):
+                suma += activacion[vecino] * G[node][vecino]['weight'] * 0.1
+            nueva_activacion[node] = suma
+        activacion = nueva_activacion
+    max_act = max(activacion.values()) if activacion else 1
+    return {k: v / max_act for k, v in activacion.items()}
+
+
+def filas_python(G, nodos):
+    """Fallback de calcular_embeddings_contextuales antes de kernels.py, para algunos nodos."""
+    embeddings = {}
+    for node in nodos:
+        vector = np.zeros(len(G.nodes()))
+        for n in G.neighbors(node):
+            vector[list(G.nodes()).index(n)] = G[node][n]['weight']
+        embeddings[node] = vector
+    return embeddings
+
+
+def cronometrar(fn, repeticiones=1):
+    """(resultado, segundos por llamada)."""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = fn()
+    return resultado, (time.perf_counter() - inicio) / repeticiones
+
+
+def contar_todas(ids, n, ventana_max, backend):
+    return [kernels.contar_pares(ids, d, n, backend=backend) for d in range(1, ventana_max + 1)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Equivalencia y aceleración de kernels.py")
+    parser.add_argument("--corpus", help="Ids de corpus separados por coma (por defecto, todos)")
+    parser.add_argument("--consultas", type=int, default=20)
+    parser.add_argument("--muestra", type=int, default=100)
+    args = parser.parse_args()
+
+    rutas = sorted(glob.glob(os.path.join(c3.LEMAS_DIR, "*_corpus_lemas.txt")))
+    if args.corpus:
+        ids_corpus = args.corpus.split(",")
+        rutas = [r for r in rutas if os.path.basename(r).split("_")[0] in ids_corpus]
+    print(f"Backends: {', '.join(BACKENDS)}; KERNELS={kernels.KERNELS} usa "
+          + ", ".join(f"{k}={kernels.elegir_backend(k)}" for k in kernels.PREFERIDOS))
+
+    filas, diferencias = [], []
+    for ruta in rutas:
+        corpus = os.path.basename(ruta).split("_")[0]
+        with open(ruta, "r", encoding="utf-8") as f:
+            tokens = c3.FlujoTokens()
+            for w in f.read().split():
+                if len(w) > 2 and w not in c3.STOPWORDS:
+                    tokens.agregar(w, 'UNK')
+        processor = c3.TextProcessor()
+        builder = c3.GraphBuilder(processor)
+        G = builder.construir_grafo_mejorado(tokens)
+        rd = c3.ReverseDict(G, processor, builder)
+        A = rd.adyacencia
+        print(f"\nCorpus {corpus}: {len(tokens)} tokens, {G.number_of_nodes()} nodos, "
+              f"{G.number_of_edges()} aristas")
+
+        # Conteo de pares (sobre los mismos ids compactos que Coocurrencias.contar)
+        ids = tokens.arreglo_ids()
+        ids = np.unique(ids, return_inverse=True)[1].astype(np.int64)
+        n, ventana_max = int(ids.max()) + 1, c3.CONFIG["ventana_max"]
+        tiempos, salidas = {}, {}
+        for backend in BACKENDS:
+            _, compilacion = cronometrar(lambda: contar_todas(ids[:100], n, 2, backend))
+            salidas[backend], tiempos[backend] = cronometrar(lambda: contar_todas(ids, n, ventana_max, backend), 3)
+            if backend == "numba":
+                print(f"  numba: compilación/carga del conteo {compilacion:.2f} s")
+        iguales = all(all(np.array_equal(x, y) for x, y in zip(a, b))
+                      for a, b in zip(salidas["numpy"], salidas[BACKENDS[-1]]))
+        diferencias += [] if iguales else [f"conteo {corpus}"]
+        filas.append(("contar_pares", corpus, None, tiempos))
+
+        # Propagación de activación
+        random.seed(0)
+        consultas = [random.sample(rd.vocab, 3) for _ in range(args.consultas)]
+        semillas = []
+        for lemas_def in consultas:
+            s = np.zeros(len(rd.vocab))
+            s[[rd.indice[l] for l in lemas_def]] = 1.0
+            semillas.append(s)
+        referencia, python = cronometrar(lambda: [propagacion_python(G, l) for l in consultas])
+        python /= len(consultas)
+        tiempos = {}
+        for backend in BACKENDS:
+            kernels.propagar(A.indptr, A.indices, A.data, semillas[0], backend=backend)  # compila
+            salida, tiempos[backend] = cronometrar(
+                lambda: [kernels.propagar(A.indptr, A.indices, A.data, s, backend=backend) for s in semillas])
+            tiempos[backend] /= len(consultas)
+            error = max(abs(r[rd.vocab[j]] - v[j] / v.max())
+                        for r, v in zip(referencia, salida) for j in range(len(rd.vocab)))
+            if error > 1e-9:
+                diferencias.append(f"propagación {corpus} {backend} (error {error:.1e})")
+        filas.append(("propagar", corpus, python, tiempos))
+
+        # Filas densas de la adyacencia
+        muestra = rd.vocab[:args.muestra]
+        referencia, python = cronometrar(lambda: filas_python(G, muestra))
+        python *= len(rd.vocab) / len(muestra)
+        tiempos = {}
+        for backend in BACKENDS:
+            kernels.filas_densas(A.indptr, A.indices, A.data, backend=backend)  # compila
+            densa, tiempos[backend] = cronometrar(lambda: kernels.filas_densas(A.indptr, A.indices, A.data, backend=backend))
+            if not all(np.allclose(referencia[p], densa[i], rtol=0, atol=1e-12) for i, p in enumerate(muestra)):
+                diferencias.append(f"filas densas {corpus} {backend}")
+        filas.append(("filas_densas", corpus, python, tiempos))
+
+    print("\nkernel       | corpus | python (ms) | " + " | ".join(f"{b} (ms)" for b in BACKENDS)
+          + " | aceleración")
+    for kernel, corpus, python, tiempos in filas:
+        celdas = [f"{tiempos[b] * 1000:10.2f}" for b in BACKENDS]
+        base = python if python is not None else tiempos["numpy"]
+        mejor = min(tiempos.values())
+        print(f"{kernel:12s} | {corpus:6s} | {python * 1000 if python else float('nan'):11.2f} | "
+              + " | ".join(celdas) + f" | {base / mejor:8.1f}x")
+    print("(filas_densas en python: extrapolado desde --muestra nodos; aceleración del "
+          "backend más rápido contra python o, en el conteo, contra numpy)")
+
+    if diferencias:
+        print("\nDIFERENCIAS: " + "; ".join(diferencias))
+        sys.exit(1)
+    print("\nTodos los backends dan el mismo resultado.")
@@ -0,0 +1,107 @@
+# ============================================
+# Benchmark de limpieza de texto
+#
+#   python benchmarks/limpieza.py
+#   python benchmarks/limpieza.py --repeticiones 5 --escala 4
+#
+# Compara TextProcessor.limpiar_texto_avanzado (por fragmentos) contra la
+# implementación anterior de cinco re.sub sobre el texto completo, con cada
+# data/textos/*_orig.txt y con todos unidos (como texto_unido en la
+# construcción), y verifica que la salida sea idéntica byte a byte.
+# También mide limpiar_archivo, que lee y escribe por partes.
+# ============================================
+
+import argparse
+import glob
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(RAIZ)
+sys.path.insert(0, RAIZ)
+
+from c3 import TextProcessor  # noqa: E402
+
+
+def limpiar_referencia(texto):
+    """Implementación anterior de limpiar_texto_avanzado (referencia de salida)."""
+    texto = re.sub(
+        r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', texto)
+    texto = re.sub(r'\S+@\S+', '', texto)
+    texto = re.sub(r'\b\d+\b', '', texto)
+    texto = re.sub(r'[^a-záéíóúñü\s]', ' ', texto.lower())
+    texto = re.sub(r'\s+', ' ', texto).strip()
+    return texto
+
+
+def medir(fn, repeticiones):
+    """(mejor tiempo en ms, memoria pico en MB, resultado) de fn()."""
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = fn()
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    tracemalloc.start()
+    try:
+        fn()
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return mejor * 1000, pico / (1024 * 1024), resultado
+
+
+def comparar(nombre, texto, processor, repeticiones):
+    t_ref, m_ref, salida_ref = medir(lambda: limpiar_referencia(texto), repeticiones)
+    t_new, m_new, salida_new = medir(lambda: processor.limpiar_texto_avanzado(texto), repeticiones)
+    identico = salida_ref.encode("utf-8") == salida_new.encode("utf-8")
+    print(f"{nombre:34s} {len(texto.encode('utf-8')) / 1e6:7.2f} MB  "
+          f"{t_ref:8.1f} -> {t_new:7.1f} ms ({t_ref / max(t_new, 1e-9):4.1f}x)  "
+          f"pico {m_ref:6.1f} -> {m_new:5.1f} MB  {'idéntico' if identico else 'DIFERENTE'}")
+    return identico
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de limpieza de texto")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--escala", type=int, default=3,
+                        help="Veces que se repite el texto unido en la prueba grande")
+    args = parser.parse_args()
+
+    processor = TextProcessor()
+    rutas = sorted(glob.glob(os.path.join("data", "textos", "*_orig.txt")))
+    textos = []
+    todos_identicos = True
+
+    print(f"{'archivo':34s} {'tamaño':>10s}  {'anterior -> por fragmentos':>30s}")
+    for ruta in rutas:
+        with open(ruta, "r", encoding="utf-8") as f:
+            texto = f.read()
+        textos.append(texto)
+        todos_identicos &= comparar(os.path.basename(ruta), texto, processor, args.repeticiones)
+
+    texto_unido = " ".join(textos * args.escala)
+    todos_identicos &= comparar(f"unidos x{args.escala}", texto_unido, processor, args.repeticiones)
+
+    # Archivo a archivo, sin cargar el texto completo
+    with tempfile.TemporaryDirectory() as tmp:
+        entrada = os.path.join(tmp, "unido.txt")
+        salida = os.path.join(tmp, "unido_clean.txt")
+        with open(entrada, "w", encoding="utf-8") as f:
+            f.write(texto_unido)
+        t_arch, m_arch, _ = medir(lambda: processor.limpiar_archivo(entrada, salida), args.repeticiones)
+        with open(salida, "rb") as f:
+            identico = f.read() == limpiar_referencia(texto_unido).encode("utf-8")
+        todos_identicos &= identico
+        print(f"{'limpiar_archivo (unidos)':34s} {len(texto_unido.encode('utf-8')) / 1e6:7.2f} MB  "
+              f"{'':>8s}    {t_arch:7.1f} ms         pico {m_arch:5.1f} MB  "
+              f"{'idéntico' if identico else 'DIFERENTE'}")
+
+    if not todos_identicos:
+        print("\nERROR: la salida difiere de la implementación anterior")
+        sys.exit(1)
+    print("\nSalida idéntica en todos los casos")
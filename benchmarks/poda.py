@@ -0,0 +1,123 @@
+# ============================================
+# Reporte de poda del grafo (GraphBuilder.podar_grafo)
+#
+#   python benchmarks/poda.py
+#   python benchmarks/poda.py --criterios '[{"npmi_min": 0.1}, {"top_k": 25, "freq_min": 2}]'
+#
+# Para cada conjunto de data/evaluacion/*.json carga su diccionario, lo poda
+# con cada combinación de criterios y reporta cuánto se reduce (nodos,
+# aristas, tamaño del JSON guardado) contra cuánto cambia la calidad de
+# recuperación (MRR, recall@10) y la latencia de búsqueda.
+# ============================================
+
+import argparse
+import contextlib
+import copy
+import glob
+import io
+import json
+import os
+import random
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(RAIZ)
+sys.path.insert(0, RAIZ)
+
+import c3  # noqa: E402
+
+EVAL_DIR = os.path.join("data", "evaluacion")
+
+CRITERIOS_DEFECTO = [
+    {},
+    {"freq_min": 2},
+    {"freq_min": 3},
+    {"peso_min": 0.5},
+    {"peso_min": 1.0},
+    {"pmi_min": 0.0},
+    {"pmi_min": 1.0},
+    {"npmi_min": 0.0},
+    {"npmi_min": 0.1},
+    {"npmi_min": 0.2},
+    {"npmi_min": 0.3},
+    {"top_k": 50},
+    {"top_k": 25},
+    {"top_k": 10},
+    {"freq_min": 2, "npmi_min": 0.1, "top_k": 25},
+]
+
+
+def tamano_json(nombre, grafo, builder):
+    """Bytes que ocuparía el JSON de guardar_diccionario."""
+    datos = c3.datos_diccionario(nombre, grafo, builder)
+    return len(json.dumps(datos, ensure_ascii=False, indent=2).encode("utf-8"))
+
+
+def evaluar(rd, pruebas, top_k=10):
+    """(MRR, recall@10, p50 ms) de las pruebas sobre un ReverseDict."""
+    random.seed(0)  # la intermediación local muestrea nodos al azar
+    posiciones, tiempos = [], []
+    for prueba in pruebas:
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultados = rd.buscar_multiple_estrategias(prueba["definicion"], top_k=top_k)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        posiciones.append(c3.posicion_esperada([p for p, _ in resultados], prueba["esperadas"]))
+    m = c3.metricas_recuperacion(posiciones, ks=(10,))
+    return m["mrr"], m["recall@10"], sorted(tiempos)[len(tiempos) // 2]
+
+
+def etiqueta(criterios):
+    return ", ".join(f"{k}={v}" for k, v in sorted(criterios.items())) or "sin poda"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reporte de poda del grafo")
+    parser.add_argument("--criterios", help="Lista JSON de combinaciones de criterios")
+    parser.add_argument("--salida", help="Guardar el reporte en JSON")
+    args = parser.parse_args()
+
+    lista_criterios = json.loads(args.criterios) if args.criterios else CRITERIOS_DEFECTO
+    if {} not in lista_criterios:
+        lista_criterios = [{}] + lista_criterios
+    reporte = {}
+
+    for ruta in sorted(glob.glob(os.path.join(EVAL_DIR, "*.json"))):
+        with open(ruta, "r", encoding="utf-8") as f:
+            conjunto = json.load(f)
+        nombre = conjunto["diccionario"]
+        grafo_base, processor, builder_base = c3.cargar_diccionario(nombre)
+        if grafo_base is None:
+            continue
+
+        print(f"\n{nombre} ({len(conjunto['pruebas'])} pruebas)")
+        print(f"  {'criterios':42s} {'nodos':>6s} {'aristas':>8s} {'JSON KB':>8s} "
+              f"{'MRR':>6s} {'R@10':>5s} {'p50 ms':>7s}")
+        reporte[nombre] = []
+        for criterios in lista_criterios:
+            grafo = grafo_base.copy()
+            builder = copy.deepcopy(builder_base)
+            if criterios:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    builder.podar_grafo(grafo, **criterios)
+            rd = c3.ReverseDict(grafo, processor, builder)
+            mrr, recall, p50 = evaluar(rd, conjunto["pruebas"])
+            fila = {
+                "criterios": criterios,
+                "nodos": grafo.number_of_nodes(),
+                "aristas": grafo.number_of_edges(),
+                "json_bytes": tamano_json(nombre, grafo, builder),
+                "mrr": round(mrr, 4),
+                "recall@10": round(recall, 4),
+                "p50_ms": round(p50, 2),
+            }
+            reporte[nombre].append(fila)
+            print(f"  {etiqueta(criterios):42s} {fila['nodos']:6d} {fila['aristas']:8d} "
+                  f"{fila['json_bytes'] / 1024:8.0f} {fila['mrr']:6.3f} {fila['recall@10']:5.2f} "
+                  f"{fila['p50_ms']:7.1f}")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, ensure_ascii=False, indent=2)
+        print(f"\nReporte guardado en {args.salida}")
@@ -0,0 +1,123 @@
+# ============================================
+# Ráfaga contra /api/v1/async/buscar: el control de admisión responde 503
+#
+#   python benchmarks/rafaga.py --diccionario "Corpus Recetas"
+#
+# Arranca gunicorn (wsgi:api, 1 worker) con un pool de búsqueda chico
+# (--pool-hilos + --pool-cola lugares), lanza --clientes requests a la vez y
+# cuenta las respuestas por código. Con los hilos por defecto de
+# gunicorn.conf.py (más que los lugares del pool) tiene que haber 503 con
+# Retry-After; con --threads menor o igual a los lugares no los hay y los
+# requests esperan en el backlog (sale con error sólo en el primer caso).
+# ============================================
+
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+
+import requests
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFINICIONES = [
+    "órgano que bombea sangre",
+    "cebolla picada con tomate",
+    "líquido que se obtiene de la leche",
+    "enfermedad de transmisión sexual",
+    "ingrediente que se agrega al final",
+]
+
+
+def esperar_servidor(url, espera=300):
+    limite = time.time() + espera
+    while time.time() < limite:
+        try:
+            if requests.get(url + "/api/v1/health", timeout=1).ok:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def rafaga(url, diccionario, clientes, deadline_ms):
+    """Lanza los requests juntos (barrera) y devuelve (códigos, Retry-After, segundos)."""
+    codigos = Counter()
+    reintentos = []
+    lock = threading.Lock()
+    barrera = threading.Barrier(clientes)
+
+    def cliente(i):
+        body = {"diccionario": diccionario, "definicion": DEFINICIONES[i % len(DEFINICIONES)],
+                "top_k": 10, "deadline_ms": deadline_ms}
+        barrera.wait()
+        try:
+            r = requests.post(url + "/api/v1/async/buscar", json=body, timeout=120)
+            codigo, reintento = r.status_code, r.headers.get("Retry-After")
+        except requests.RequestException:
+            codigo, reintento = "error", None
+        with lock:
+            codigos[codigo] += 1
+            if reintento is not None:
+                reintentos.append(int(reintento))
+
+    inicio = time.perf_counter()
+    hilos = [threading.Thread(target=cliente, args=(i,)) for i in range(clientes)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    return codigos, reintentos, time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ráfaga contra el control de admisión del pool")
+    parser.add_argument("--diccionario", default="Corpus Recetas")
+    parser.add_argument("--clientes", type=int, default=64)
+    parser.add_argument("--pool-hilos", type=int, default=2)
+    parser.add_argument("--pool-cola", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=None,
+                        help="hilos de gunicorn (por defecto los de gunicorn.conf.py)")
+    parser.add_argument("--deadline-ms", type=float, default=30000)
+    parser.add_argument("--puerto", type=int, default=5102)
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.puerto}"
+    env = dict(os.environ, WORKERS="1", BIND=f"127.0.0.1:{args.puerto}",
+               DICCIONARIOS_PRECARGA=args.diccionario,
+               POOL_HILOS=str(args.pool_hilos), POOL_MAX_COLA=str(args.pool_cola),
+               PIDFILE=os.path.join("data", "rafaga.pid"))
+    if args.threads is not None:
+        env["THREADS"] = str(args.threads)
+    lugares = args.pool_hilos + args.pool_cola
+    proc = subprocess.Popen(["gunicorn", "-c", "gunicorn.conf.py", "wsgi:api"],
+                            cwd=RAIZ, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not esperar_servidor(url):
+            print("El servidor no arrancó.")
+            sys.exit(1)
+        rafaga(url, args.diccionario, min(args.clientes, lugares), args.deadline_ms)  # calentamiento
+        codigos, reintentos, segundos = rafaga(url, args.diccionario, args.clientes, args.deadline_ms)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    print(f"{args.clientes} requests a la vez, pool de {args.pool_hilos} hilos + {args.pool_cola} en cola, "
+          f"threads={args.threads or 'por defecto'}: {segundos:.2f} s")
+    for codigo, n in sorted(codigos.items(), key=lambda c: str(c[0])):
+        print(f"  {codigo}: {n}")
+    if reintentos:
+        print(f"  Retry-After: {min(reintentos)}..{max(reintentos)} s")
+
+    esperado = args.threads is None or args.threads > lugares
+    if esperado and not codigos[503]:
+        print("No hubo 503: el control de admisión no actuó.")
+        sys.exit(1)
+    if codigos[503] and len(reintentos) < codigos[503]:
+        print("Hubo 503 sin Retry-After.")
+        sys.exit(1)
@@ -0,0 +1,257 @@
+# ============================================
+# Benchmark de recuperación (offline) — extiende evaluar_sistema de c3
+#
+#   python benchmarks/recuperacion.py
+#   python benchmarks/recuperacion.py --salida bench.json --comparar bench_anterior.json
+#
+# Para cada conjunto de data/evaluacion/*.json (definición -> palabras esperadas):
+# - carga el diccionario de data/grafos y mide tiempo y memoria pico
+# - ejecuta las consultas de a una (sin competir por el GIL) y reporta MRR y
+#   recall@k por estrategia (pagerank, tfidf, propagacion, betweenness y la
+#   combinada) y latencias p50/p95/p99 por etapa
+# - en una pasada aparte las ejecuta con --hilos hilos y reporta el
+#   rendimiento (consultas por segundo); esas latencias no se usan
+# Además construye un grafo por cada data/lemas/*_corpus_lemas.txt y mide
+# tiempo y memoria pico de la construcción.
+# Todo corre sin red: no usa GECO ni FreeLing si spaCy está instalado.
+#
+# Con --ventana / --decaimiento los diccionarios se evalúan con el grafo
+# armado desde sus coocurrencias guardadas (sin reconstruirlos) y la
+# construcción desde data/lemas usa esa ventana.
+# ============================================
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(RAIZ)
+sys.path.insert(0, RAIZ)
+
+import c3  # noqa: E402
+import metricas  # noqa: E402
+
+EVAL_DIR = os.path.join("data", "evaluacion")
+ESTRATEGIAS = ["pagerank", "tfidf", "propagacion", "betweenness", "combinada"]
+KS = (1, 5, 10)
+
+
+def percentil(valores, q):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))]
+
+
+def ranking(scores, excluir, top_k):
+    """Palabras ordenadas por el score de una sola estrategia (sin los lemas de la definición)."""
+    orden = sorted(((p, s) for p, s in scores.items() if p not in excluir),
+                   key=lambda x: x[1], reverse=True)
+    return [p for p, _ in orden[:top_k]]
+
+
+def medir_construccion(fn):
+    """Ejecuta fn midiendo tiempo y memoria pico (tracemalloc); devuelve (resultado, segundos, MB)."""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    try:
+        resultado = fn()
+        segundos = time.perf_counter() - inicio
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return resultado, segundos, pico / (1024 * 1024)
+
+
+def consultar(rd, prueba, top_k):
+    """Una consulta del conjunto: posiciones por estrategia y tiempos por etapa (ms)."""
+    with metricas.desglose() as etapas:
+        inicio = time.perf_counter()
+        definicion_limpia, lemas = rd.processor.procesar_consulta(prueba["definicion"])
+        lemas_def = [l for l in lemas if l in rd.indice]
+        if lemas_def:
+            scores = rd.scores_estrategias(definicion_limpia, lemas_def)
+            combinada = [p for p, _ in rd.fusionar(scores, lemas_def, top_k=top_k)]
+        else:
+            scores, combinada = {}, []
+        total = time.perf_counter() - inicio
+
+    rankings = {nombre: ranking(s, set(lemas_def), top_k) for nombre, s in scores.items()}
+    rankings["combinada"] = combinada
+    posiciones = {nombre: c3.posicion_esperada(rankings.get(nombre, []), prueba["esperadas"])
+                  for nombre in ESTRATEGIAS}
+    tiempos = {etapa: s * 1000 for etapa, s in etapas.items()}
+    tiempos["total"] = total * 1000
+    return posiciones, tiempos
+
+
+def evaluar_conjunto(ruta, hilos, top_k, ventana=None, decaimiento=None):
+    with open(ruta, "r", encoding="utf-8") as f:
+        conjunto = json.load(f)
+    nombre = conjunto["diccionario"]
+    pruebas = conjunto["pruebas"]
+
+    def construir():
+        try:
+            grafo, processor, builder = c3.cargar_diccionario(nombre, ventana, decaimiento)
+        except ValueError as e:
+            print(f"  {e}")
+            return None
+        if grafo is None:
+            return None
+        if ventana or decaimiento:
+            # La caché de PageRank en disco es la del grafo guardado
+            return c3.ReverseDict(grafo, processor, builder)
+        return c3.preparar_busqueda(nombre, grafo, processor, builder)
+
+    rd, segundos, memoria = medir_construccion(construir)
+    if rd is None:
+        print(f"  (se omite '{nombre}': no está en data/grafos)")
+        return nombre, None
+
+    # Latencias y calidad: de a una consulta por vez
+    salidas = [consultar(rd, p, top_k) for p in pruebas]
+
+    # Rendimiento: las mismas consultas en paralelo (con las cachés ya calientes)
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        list(pool.map(lambda p: consultar(rd, p, top_k), pruebas))
+    rendimiento = len(pruebas) / (time.perf_counter() - inicio)
+
+    resultado = {
+        "consultas": len(pruebas),
+        "nodos": len(rd.vocab),
+        "aristas": rd.grafo.number_of_edges(),
+        "carga_s": round(segundos, 4),
+        "carga_memoria_pico_mb": round(memoria, 2),
+        "consultas_por_s": round(rendimiento, 2),
+        "estrategias": {},
+        "latencias_ms": {},
+    }
+    for nombre_est in ESTRATEGIAS:
+        posiciones = [pos[nombre_est] for pos, _ in salidas]
+        resultado["estrategias"][nombre_est] = {
+            k: round(v, 4) for k, v in c3.metricas_recuperacion(posiciones, KS).items()}
+
+    etapas = sorted({e for _, tiempos in salidas for e in tiempos})
+    for etapa in etapas:
+        valores = [t[etapa] for _, t in salidas if etapa in t]
+        resultado["latencias_ms"][etapa] = {
+            "p50": round(percentil(valores, 0.50), 3),
+            "p95": round(percentil(valores, 0.95), 3),
+            "p99": round(percentil(valores, 0.99), 3),
+        }
+    return nombre, resultado
+
+
+def construir_desde_lemas(ruta, ventana=None, decaimiento=None):
+    """Construye grafo + artefactos de búsqueda desde un archivo de lemas ya procesado."""
+    def construir():
+        with open(ruta, "r", encoding="utf-8") as f:
+            palabras = f.read().split()
+        tokens = c3.FlujoTokens()
+        for w in palabras:
+            if len(w) > 2 and w not in c3.STOPWORDS:
+                tokens.agregar(w, 'UNK')
+        processor = c3.TextProcessor()
+        builder = c3.GraphBuilder(processor)
+        grafo = builder.construir_grafo_mejorado(tokens, ventana, decaimiento)
+        c3.ReverseDict(grafo, processor, builder)
+        return len(tokens), grafo
+
+    (n_tokens, grafo), segundos, memoria = medir_construccion(construir)
+    return {
+        "tokens": n_tokens,
+        "nodos": grafo.number_of_nodes(),
+        "aristas": grafo.number_of_edges(),
+        "construccion_s": round(segundos, 4),
+        "memoria_pico_mb": round(memoria, 2),
+    }
+
+
+def commit_actual():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=RAIZ, text=True).strip()
+    except Exception:
+        return None
+
+
+def comparar(actual, anterior):
+    """Imprime diferencias de MRR, recall y p95 contra un resultado anterior."""
+    print(f"\nComparación contra {anterior.get('commit')}:")
+    for nombre, res in actual["diccionarios"].items():
+        previo = anterior.get("diccionarios", {}).get(nombre)
+        if not res or not previo:
+            continue
+        print(f"  {nombre}")
+        for est, m in res["estrategias"].items():
+            p = previo["estrategias"].get(est)
+            if p:
+                print(f"    {est:12s} MRR {m['mrr']:.3f} ({m['mrr'] - p['mrr']:+.3f})  "
+                      f"R@10 {m['recall@10']:.2f} ({m['recall@10'] - p['recall@10']:+.2f})")
+        t, tp = res["latencias_ms"].get("total"), previo["latencias_ms"].get("total")
+        if t and tp:
+            print(f"    p95 total    {t['p95']:.1f} ms ({t['p95'] - tp['p95']:+.1f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de recuperación offline")
+    parser.add_argument("--salida", default="bench_output.json")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    parser.add_argument("--hilos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--top-k", type=int, default=max(KS))
+    parser.add_argument("--sin-construccion", action="store_true",
+                        help="No medir la construcción desde data/lemas")
+    parser.add_argument("--ventana", type=int, help="Ventana de coocurrencia (por defecto la guardada)")
+    parser.add_argument("--decaimiento", choices=sorted(c3.DECAIMIENTOS),
+                        help="Decaimiento por distancia (por defecto el guardado)")
+    args = parser.parse_args()
+
+    reporte = {
+        "commit": commit_actual(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "hilos": args.hilos,
+        "top_k": args.top_k,
+        "ventana": args.ventana,
+        "decaimiento": args.decaimiento,
+        "diccionarios": {},
+        "construccion": {},
+    }
+
+    for ruta in sorted(glob.glob(os.path.join(EVAL_DIR, "*.json"))):
+        print(f"Evaluando {ruta}...")
+        nombre, resultado = evaluar_conjunto(ruta, args.hilos, args.top_k, args.ventana, args.decaimiento)
+        reporte["diccionarios"][nombre] = resultado
+        if resultado:
+            for est, m in resultado["estrategias"].items():
+                print(f"  {est:12s} MRR={m['mrr']:.3f}  " +
+                      "  ".join(f"R@{k}={m[f'recall@{k}']:.2f}" for k in KS))
+            total = resultado["latencias_ms"]["total"]
+            print(f"  latencia total p50={total['p50']:.1f} p95={total['p95']:.1f} "
+                  f"p99={total['p99']:.1f} ms (de a una); {resultado['consultas_por_s']:.1f} consultas/s "
+                  f"con {args.hilos} hilos; carga {resultado['carga_s']:.2f} s, "
+                  f"{resultado['carga_memoria_pico_mb']:.1f} MB pico")
+
+    if not args.sin_construccion:
+        for ruta in sorted(glob.glob(os.path.join("data", "lemas", "*_corpus_lemas.txt"))):
+            corpus = os.path.basename(ruta).replace("_corpus_lemas.txt", "")
+            print(f"Construyendo corpus {corpus}...")
+            reporte["construccion"][corpus] = construir_desde_lemas(ruta, args.ventana, args.decaimiento)
+            r = reporte["construccion"][corpus]
+            print(f"  {r['tokens']} tokens -> {r['nodos']} nodos, {r['aristas']} aristas "
+                  f"en {r['construccion_s']:.2f} s, {r['memoria_pico_mb']:.1f} MB pico")
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados guardados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            comparar(reporte, json.load(f))
@@ -0,0 +1,113 @@
+# ============================================
+# Capacidad del router (router.py) según el número de shards
+#
+#   python benchmarks/router.py --shards 1,2,4 --duracion 15
+#
+# Para cada número de shards arranca "router.py iniciar" con shards en
+# sockets Unix, espera a que todos respondan y mide:
+#   - memoria (PSS) de cada shard: el máximo es lo que necesita un nodo
+#   - requests/s de /api/v1/buscar a través del router, repartidos entre
+#     todos los diccionarios que se pudieron cargar
+# ============================================
+
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from carga_workers import DEFINICIONES, esperar_servidor  # noqa: E402
+
+
+def pss_mb(pid):
+    """PSS del proceso y sus hijos (la memoria compartida se reparte entre quienes la usan)."""
+    total = 0
+    pendientes = [pid]
+    while pendientes:
+        p = pendientes.pop()
+        try:
+            with open(f"/proc/{p}/smaps_rollup") as f:
+                total += next(int(linea.split()[1]) for linea in f if linea.startswith("Pss:"))
+            with open(f"/proc/{p}/task/{p}/children") as f:
+                pendientes.extend(int(c) for c in f.read().split())
+        except (OSError, StopIteration):
+            pass
+    return total / 1024
+
+
+def medir(url, diccionarios, clientes, duracion):
+    cuenta, errores = [0], [0]
+    lock = threading.Lock()
+    fin = time.time() + duracion
+
+    def cliente(i):
+        sesion = requests.Session()
+        k = i
+        while time.time() < fin:
+            body = {"diccionario": diccionarios[k % len(diccionarios)],
+                    "definicion": DEFINICIONES[k % len(DEFINICIONES)], "top_k": 10}
+            k += 1
+            try:
+                ok = sesion.post(url + "/api/v1/buscar", json=body, timeout=60).ok
+            except requests.RequestException:
+                ok = False
+            with lock:
+                if ok:
+                    cuenta[0] += 1
+                else:
+                    errores[0] += 1
+
+    hilos = [threading.Thread(target=cliente, args=(i,)) for i in range(clientes)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    return cuenta[0] / duracion, errores[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Capacidad del router por número de shards")
+    parser.add_argument("--shards", default="1,2,4")
+    parser.add_argument("--clientes", type=int, default=16)
+    parser.add_argument("--duracion", type=float, default=15)
+    parser.add_argument("--puerto", type=int, default=5201)
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.puerto}"
+    filas = []
+    for n in [int(s) for s in args.shards.split(",")]:
+        proc = subprocess.Popen(
+            [sys.executable, "router.py", "iniciar", "--shards", str(n), "--unix",
+             "--puerto", str(args.puerto)],
+            cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not esperar_servidor(url):
+                print(f"El router con {n} shards no arrancó.")
+                continue
+            diccionarios = [d["nombre"] for d in
+                            requests.get(url + "/api/v1/diccionarios").json()["diccionarios"]]
+            shards = requests.get(url + "/api/v1/router").json()["shards"]
+            memoria = []
+            for s in shards:
+                with open(os.path.join(RAIZ, "data", "router", f"{s['id']}.pid")) as f:
+                    memoria.append(pss_mb(int(f.read())))
+            medir(url, diccionarios, args.clientes, 2)  # calentamiento
+            rps, errores = medir(url, diccionarios, args.clientes, args.duracion)
+            filas.append((n, max(memoria), sum(memoria), rps))
+            por_shard = [len([d for d in s["diccionarios"] if d in diccionarios]) for s in shards]
+            print(f"{n} shards: diccionarios por shard {por_shard}, MB {[round(m) for m in memoria]}, "
+                  f"{rps:.1f} req/s, errores={errores}")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    print("\nshards | MB máx. por shard | MB total | req/s")
+    for n, maximo, total, rps in filas:
+        print(f"{n:6d} | {maximo:16.0f} | {total:8.0f} | {rps:5.1f}")
+    sys.exit(0 if filas else 1)
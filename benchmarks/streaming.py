@@ -0,0 +1,157 @@
+# ============================================
+# Respuestas grandes: JSON completo contra NDJSON por partes
+#
+#   python benchmarks/streaming.py --diccionario "Corpus Recetas"
+#   python benchmarks/streaming.py --diccionario "Corpus Recetas" --definiciones 500 --nodos 5000
+#
+# Con el cliente de pruebas de Flask (sin red) mide, para /api/v1/buscar_batch
+# y para /api/preview/<nombre>:
+#   - tiempo hasta el primer byte y tiempo total
+#   - pico de memoria del servidor durante el request (tracemalloc, en una
+#     pasada aparte porque tracemalloc hace más lento todo)
+#   - bytes enviados sin comprimir, con gzip y con br
+# Verifica que el NDJSON (descomprimido) tenga los mismos resultados que la
+# respuesta JSON y termina con código 1 si difieren (cada request de
+# buscar_batch empieza con la misma semilla de random, que usa betweenness).
+# ============================================
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(RAIZ)
+sys.path.insert(0, RAIZ)
+
+import app as app_ui  # noqa: E402
+import ndjson  # noqa: E402
+import public_api  # noqa: E402
+from c3 import cargar_diccionario  # noqa: E402
+
+
+def descomprimir(cuerpo, codificacion):
+    if codificacion == "gzip":
+        return gzip.decompress(cuerpo)
+    if codificacion == "br":
+        return ndjson.brotli.decompress(cuerpo)
+    return cuerpo
+
+
+def pedir(hacer):
+    """(primer byte s, total s, cuerpo sin comprimir, bytes enviados); consume la respuesta por partes."""
+    inicio = time.perf_counter()
+    r = hacer()
+    partes = iter(r.response)
+    primera = next(partes, b"")
+    ttfb = time.perf_counter() - inicio
+    cuerpo = [primera] + list(partes)
+    total = time.perf_counter() - inicio
+    r.close()
+    enviado = b"".join(cuerpo)
+    return ttfb, total, descomprimir(enviado, r.headers.get("Content-Encoding")), len(enviado)
+
+
+def pico_memoria(hacer):
+    """Pico de memoria (bytes) asignada durante el request, leyendo la respuesta por partes."""
+    tracemalloc.start()
+    r = hacer()
+    for _ in r.response:
+        pass
+    r.close()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return pico
+
+
+def medir(nombre, hacer, codificaciones):
+    """Fila de la tabla para una forma de pedir; devuelve también el cuerpo."""
+    ttfb, total, cuerpo, _ = pedir(lambda: hacer(None))
+    tamanos = {"ninguna": len(cuerpo)}
+    for cod in codificaciones:
+        tamanos[cod] = pedir(lambda: hacer(cod))[3]
+    return (nombre, ttfb, total, pico_memoria(lambda: hacer(None)), tamanos), cuerpo
+
+
+def imprimir(titulo, filas, codificaciones):
+    print(f"\n{titulo}")
+    print("modo     | primer byte (ms) | total (ms) | pico memoria (MB) | "
+          + " | ".join(f"{c} (KB)" for c in ["ninguna"] + codificaciones))
+    for nombre, ttfb, total, pico, tamanos in filas:
+        print(f"{nombre:8s} | {ttfb * 1000:16.1f} | {total * 1000:10.1f} | {pico / 2**20:17.2f} | "
+              + " | ".join(f"{tamanos[c] / 1024:{len(c) + 5}.1f}" for c in ["ninguna"] + codificaciones))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JSON completo contra NDJSON por partes")
+    parser.add_argument("--diccionario", required=True)
+    parser.add_argument("--definiciones", type=int, default=public_api.MAX_DEFINICIONES_BATCH)
+    parser.add_argument("--nodos", type=int, default=app_ui.MAX_NODOS_VISTA_PREVIA)
+    args = parser.parse_args()
+
+    codificaciones = ["gzip"] + (["br"] if ndjson.brotli is not None else [])
+    print(f"Codificador JSON: {'orjson' if ndjson.orjson is not None else 'json'}; "
+          f"compresión: {', '.join(codificaciones)}")
+    diferencias = []
+
+    # /api/v1/buscar_batch
+    ruta_eval = os.path.join("data", "evaluacion", args.diccionario.replace(" ", "_") + ".json")
+    with open(ruta_eval, "r", encoding="utf-8") as f:
+        base = [p["definicion"] for p in json.load(f)["pruebas"]]
+    definiciones = [base[i % len(base)] for i in range(args.definiciones)]
+    cliente = public_api.app.test_client()
+    public_api.get_diccionario(args.diccionario)  # cargado antes de medir
+
+    def batch(stream):
+        def hacer(cod):
+            # betweenness muestrea pivotes con random: misma semilla, mismos resultados
+            random.seed(0)
+            headers = {"Accept-Encoding": cod or "identity"}
+            body = {"diccionario": args.diccionario, "definiciones": definiciones, "top_k": 10, "stream": stream}
+            return cliente.post("/api/v1/buscar_batch", json=body, headers=headers, buffered=False)
+        return hacer
+
+    # Una búsqueda previa para que PageRank y las cachés no cuenten en la primera medición
+    batch(False)(None).close()
+    fila_json, cuerpo = medir("json", batch(False), codificaciones)
+    fila_ndjson, lineas = medir("ndjson", batch(True), codificaciones)
+    esperado = json.loads(cuerpo)["resultados"]
+    lineas = [json.loads(l) for l in lineas.splitlines()]
+    obtenido = [{"definicion": l["definicion"], "palabras": l["palabras"]} for l in lineas[1:]]
+    if obtenido != esperado or [l["n"] for l in lineas[1:]] != list(range(len(definiciones))):
+        diferencias.append("buscar_batch")
+    imprimir(f"/api/v1/buscar_batch con {len(definiciones)} definiciones", [fila_json, fila_ndjson], codificaciones)
+
+    # /api/preview/<nombre> (n distinto del guardado, así se calcula en cada request)
+    grafo, _, _ = cargar_diccionario(args.diccionario)
+    app_ui.state.update({"current_graph": grafo, "current_diccionario": args.diccionario})
+    cliente = app_ui.app.test_client()
+    url = f"/api/preview/{args.diccionario}?n={args.nodos}&peso_min=0.000001"
+
+    def preview(formato):
+        def hacer(cod):
+            app_ui.vistas_previas.clear()
+            headers = {"Accept-Encoding": cod or "identity"}
+            return cliente.get(url + formato, headers=headers, buffered=False)
+        return hacer
+
+    fila_json, cuerpo = medir("json", preview(""), codificaciones)
+    fila_ndjson, lineas = medir("ndjson", preview("&formato=ndjson"), codificaciones)
+    esperado = json.loads(cuerpo)
+    lineas = [json.loads(l) for l in lineas.splitlines()]
+    nodos = [{k: v for k, v in l.items() if k != "tipo"} for l in lineas if l["tipo"] == "nodo"]
+    aristas = [{k: v for k, v in l.items() if k != "tipo"} for l in lineas if l["tipo"] == "arista"]
+    if nodos != esperado["nodes"] or aristas != esperado["edges"]:
+        diferencias.append("vista previa")
+    imprimir(f"/api/preview con n={args.nodos}: {len(nodos)} nodos, {len(aristas)} aristas",
+             [fila_json, fila_ndjson], codificaciones)
+    print("(la vista previa json sólo se comprime con gzip; con br se envía sin comprimir)")
+
+    if diferencias:
+        print("\nDIFERENCIAS: " + ", ".join(diferencias))
+        sys.exit(1)
+    print("\nJSON y NDJSON dan los mismos resultados.")
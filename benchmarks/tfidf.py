@@ -0,0 +1,117 @@
+# ============================================
+# TF-IDF de ReverseDict: desde la adyacencia contra el vectorizador sobre textos
+#
+#   python benchmarks/tfidf.py
+#   python benchmarks/tfidf.py --corpus 18,29 --consultas 200
+#
+# Para cada corpus de data/lemas construye el grafo y arma la matriz TF-IDF
+# de los contextos de dos formas: como antes (unir los contextos de cada
+# palabra en un texto y TfidfVectorizer.fit_transform) y con
+# ReverseDict._tfidf_desde_adyacencia. Compara vocabulario, IDF, matriz y la
+# similitud de consultas al azar, y mide el tiempo de cada una. Termina con
+# código 1 si algo difiere.
+#
+# La suma de la norma L2 del vectorizador sigue el orden de los contextos
+# (un set, que cambia con PYTHONHASHSEED), así que ya entre dos ejecuciones
+# los flotantes pueden diferir en el último bit: se comparan con tolerancia.
+# ============================================
+
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(RAIZ)
+sys.path.insert(0, RAIZ)
+
+import c3  # noqa: E402
+
+TOLERANCIA = 1e-12
+
+
+def cronometrar(fn, repeticiones=3):
+    """(resultado, mejor tiempo en s)."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = fn()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return resultado, mejor
+
+
+def desde_textos(rd):
+    """_preparar_tfidf antes de este cambio."""
+    vectorizador = TfidfVectorizer(max_features=1000, min_df=1, max_df=1.0)
+    return vectorizador, vectorizador.fit_transform(rd._documentos_contexto())
+
+
+def desde_adyacencia(rd):
+    rd.tfidf = TfidfVectorizer(max_features=1000, min_df=1, max_df=1.0)
+    return rd.tfidf, rd._tfidf_desde_adyacencia()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TF-IDF desde la adyacencia contra el vectorizador")
+    parser.add_argument("--corpus", help="Ids de corpus separados por coma (por defecto, todos)")
+    parser.add_argument("--consultas", type=int, default=100)
+    args = parser.parse_args()
+
+    rutas = sorted(glob.glob(os.path.join(c3.LEMAS_DIR, "*_corpus_lemas.txt")))
+    if args.corpus:
+        ids_corpus = args.corpus.split(",")
+        rutas = [r for r in rutas if os.path.basename(r).split("_")[0] in ids_corpus]
+
+    filas, diferencias = [], []
+    for ruta in rutas:
+        corpus = os.path.basename(ruta).split("_")[0]
+        with open(ruta, "r", encoding="utf-8") as f:
+            tokens = c3.FlujoTokens()
+            for w in f.read().split():
+                if len(w) > 2 and w not in c3.STOPWORDS:
+                    tokens.agregar(w, 'UNK')
+        processor = c3.TextProcessor()
+        builder = c3.GraphBuilder(processor)
+        G = builder.construir_grafo_mejorado(tokens)
+        rd = c3.ReverseDict(G, processor, builder)
+        if not rd._contextos_son_vecinos():
+            diferencias.append(f"{corpus}: word_contexts no son los vecinos")
+            continue
+
+        (antes, matriz_antes), t_antes = cronometrar(lambda: desde_textos(rd))
+        (ahora, matriz_ahora), t_ahora = cronometrar(lambda: desde_adyacencia(rd))
+
+        errores = []
+        if antes.vocabulary_ != ahora.vocabulary_:
+            errores.append("vocabulario")
+        elif not np.allclose(antes.idf_, ahora.idf_, rtol=0, atol=TOLERANCIA):
+            errores.append("idf")
+        elif abs(matriz_antes - matriz_ahora).max() > TOLERANCIA:
+            errores.append("matriz")
+        else:
+            # Consultas: palabras al azar del vocabulario, proyectadas con cada vectorizador
+            random.seed(0)
+            consultas = [" ".join(random.sample(rd.vocab, 4)) for _ in range(args.consultas)]
+            sim_antes = cosine_similarity(antes.transform(consultas), matriz_antes)
+            sim_ahora = cosine_similarity(ahora.transform(consultas), matriz_ahora)
+            if np.abs(sim_antes - sim_ahora).max() > TOLERANCIA:
+                errores.append("similitud de consultas")
+        diferencias += [f"{corpus}: {e}" for e in errores]
+
+        filas.append((corpus, len(rd.vocab), G.number_of_edges(), len(ahora.vocabulary_), t_antes, t_ahora))
+
+    print("\ncorpus | nodos | aristas | términos | textos (ms) | adyacencia (ms) | aceleración")
+    for corpus, nodos, aristas, terminos, t_antes, t_ahora in filas:
+        print(f"{corpus:6s} | {nodos:5d} | {aristas:7d} | {terminos:8d} | {t_antes * 1000:11.1f} | "
+              f"{t_ahora * 1000:15.1f} | {t_antes / t_ahora:10.1f}x")
+
+    if diferencias:
+        print("\nDIFERENCIAS: " + "; ".join(diferencias))
+        sys.exit(1)
+    print(f"\nVocabulario idéntico; IDF, matriz y similitudes iguales (tolerancia {TOLERANCIA}).")
@@ -7,21 +7,32 @@
 
 import os
 import re
-import io
 import json
-import requests
+import gzip
+import hashlib
+import heapq
+import math
+import time
+import threading
+from array import array
 import networkx as nx
 from text2graphapi.src.Cooccurrence import Cooccurrence
 import nltk
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
 import numpy as np
+import scipy.sparse as sp
 from scipy.spatial.distance import cosine
 from collections import defaultdict, Counter
 import spacy
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfTransformer, TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from geco3_client import GECO3Client
+import kernels
+import metricas
+import perfilado
+from catalogo import Catalogo, EXTENSION_VISTA_PREVIA, EXTENSION_COOCURRENCIAS, EXTENSION_CACHE_PPR, EXTENSIONES_ARTEFACTOS
+from freeling import ClienteFreeling, URL_DEFECTO as FREELING_URL
 
 # --------------------------------------------
 # CONFIGURACIÓN BASE (desde variables de entorno o config.json)
@@ -49,25 +60,82 @@ def load_config():
     config["app_password"] = os.getenv("GECO_APP_PASSWORD", config.get("app_password", None))
     config["user_token"] = os.getenv("GECO_USER_TOKEN", config.get("user_token", None))
 
+    # Administración: token para /admin y muestreo de perfiles (0 = sólo bajo demanda)
+    config["admin_token"] = os.getenv("ADMIN_TOKEN", config.get("admin_token", None))
+    config["perfil_tasa"] = float(os.getenv("PERFIL_TASA", config.get("perfil_tasa", 0.0)))
+
+    # Poda del grafo antes de guardar, p. ej. {"npmi_min": 0.1, "top_k": 50}
+    # (ver GraphBuilder.podar_grafo; PODA recibe el mismo JSON)
+    config["poda"] = json.loads(os.environ["PODA"]) if os.getenv("PODA") else config.get("poda", {})
+
+    # Caché de PageRank por lema: cuántos lemas (los más frecuentes) se
+    # precalculan por diccionario y cuántos nodos se guardan de cada vector
+    config["ppr_lemas"] = int(os.getenv("PPR_LEMAS", config.get("ppr_lemas", 2000)))
+    config["ppr_top_m"] = int(os.getenv("PPR_TOP_M", config.get("ppr_top_m", 500)))
+
+    # Ventana de coocurrencia del grafo y decaimiento por distancia (ver
+    # DECAIMIENTOS); se guardan los conteos hasta ventana_max, así que
+    # cualquier ventana hasta ese máximo se arma al cargar o consultar
+    config["ventana"] = int(os.getenv("VENTANA", config.get("ventana", 15)))
+    config["decaimiento"] = os.getenv("DECAIMIENTO", config.get("decaimiento", "inversa"))
+    config["ventana_max"] = int(os.getenv("VENTANA_MAX", config.get("ventana_max", 30)))
+
+    # Servicio FreeLing (lematización cuando no hay modelo de spaCy)
+    config["freeling_url"] = os.getenv("FREELING_URL", config.get("freeling_url", FREELING_URL))
+    config["freeling_paralelo"] = int(os.getenv("FREELING_PARALELO", config.get("freeling_paralelo", 4)))
+    config["freeling_fragmento"] = int(os.getenv("FREELING_FRAGMENTO", config.get("freeling_fragmento", 100000)))
+    config["freeling_cache"] = int(os.getenv("FREELING_CACHE", config.get("freeling_cache", 200000)))
+
     return config
 
+# Criterios aceptados por GraphBuilder.podar_grafo
+CRITERIOS_PODA = {"peso_min", "pmi_min", "npmi_min", "top_k", "freq_min"}
+
 # Cargar configuración
 CONFIG = load_config()
+perfilado.configurar(tasa_muestreo=CONFIG["perfil_tasa"])
+
+# Cliente GECO3: se crea y autentica en el primer uso, así importar c3
+# (benchmarks, herramientas offline) no toca la red.
+_client = None
+
+
+def obtener_cliente():
+    """Devuelve el cliente GECO3 autenticado, creándolo la primera vez."""
+    global _client
+    if _client is None:
+        cliente = GECO3Client(
+            host=CONFIG["base_url"],
+            anon_user=CONFIG["anon_user"],
+            anon_pass=CONFIG["anon_pass"],
+            app_name=CONFIG["app_name"],
+            app_password=CONFIG["app_password"]
+        )
+
+        # Si hay un token de usuario configurado, hacer login con él
+        if CONFIG.get("user_token"):
+            cliente.login(token=CONFIG["user_token"])
+        else:
+            cliente.login()
+        _client = cliente
+    return _client
+
 
-# Inicializar cliente GECO3
-client = GECO3Client(
-    host=CONFIG["base_url"],
-    anon_user=CONFIG["anon_user"],
-    anon_pass=CONFIG["anon_pass"],
-    app_name=CONFIG["app_name"],
-    app_password=CONFIG["app_password"]
-)
-
-# Si hay un token de usuario configurado, hacer login con él
-if CONFIG.get("user_token"):
-    client.login(token=CONFIG["user_token"])
-else:
-    client.login()
+_freeling = None
+_lock_freeling = threading.Lock()
+
+
+def obtener_freeling():
+    """Cliente FreeLing compartido (sesión, pool de hilos y caché), creado en el primer uso."""
+    global _freeling
+    with _lock_freeling:
+        if _freeling is None:
+            _freeling = ClienteFreeling(
+                url=CONFIG["freeling_url"],
+                max_fragmento=CONFIG["freeling_fragmento"],
+                paralelo=CONFIG["freeling_paralelo"],
+                max_cache=CONFIG["freeling_cache"])
+        return _freeling
 
 # Directorios de trabajo
 TEXTS_DIR = "data/textos"
@@ -77,6 +145,11 @@ os.makedirs(TEXTS_DIR, exist_ok=True)
 os.makedirs(LEMAS_DIR, exist_ok=True)
 os.makedirs(GRAPH_DIR, exist_ok=True)
 
+# Catálogo de diccionarios guardados (data/grafos/catalogo.db); se conservan
+# los archivos (JSON, vista previa, coocurrencias, caché de PageRank) de las
+# últimas VERSIONES_CONSERVADAS versiones de cada uno
+catalogo = Catalogo(GRAPH_DIR, conservar=int(os.getenv("VERSIONES_CONSERVADAS", "5")))
+
 # --------------------------------------------
 # CLASES Y FUNCIONES EXISTENTES
 # --------------------------------------------
@@ -114,9 +187,356 @@ STOPWORDS.update(STOPWORDS_ADICIONALES)
 # ---------------------------
 
 
+# Limpieza: patrones compilados una sola vez y tamaño de fragmento para
+# limpiar textos grandes por partes (ver TextProcessor.limpiar_flujo)
+PATRON_URL = re.compile(
+    r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+PATRON_CORREO = re.compile(r'\S+@\S+')
+PATRON_NO_ESPACIOS = re.compile(r'\S*')
+PATRON_PALABRAS = re.compile(r'[a-záéíóúñü]+')
+TAM_FRAGMENTO = 1 << 16
+
+
+def _fragmentos_en_espacios(fragmentos):
+    """
+    Reagrupa un iterable de fragmentos de texto para que cada uno termine en un
+    espacio en blanco: así ninguna palabra, URL o correo queda partida entre dos.
+    """
+    pendiente = []
+    for fragmento in fragmentos:
+        if not fragmento:
+            continue
+        i = len(fragmento) - 1
+        while i >= 0 and not fragmento[i].isspace():
+            i -= 1
+        if i < 0:
+            pendiente.append(fragmento)
+            continue
+        pendiente.append(fragmento[:i + 1])
+        yield "".join(pendiente)
+        pendiente = [fragmento[i + 1:]]
+    resto = "".join(pendiente)
+    if resto:
+        yield resto
+
+
+def _quitar_correos(texto):
+    """
+    Igual que re.sub(r'\\S+@\\S+', '', texto), pero sólo mira las palabras que
+    contienen '@' en lugar de probar el patrón en cada posición del texto.
+    """
+    partes = []
+    inicio_copia = 0
+    arroba = texto.find("@")
+    while arroba != -1:
+        inicio = arroba
+        while inicio > 0 and not texto[inicio - 1].isspace():
+            inicio -= 1
+        fin = PATRON_NO_ESPACIOS.match(texto, arroba).end()
+        # La palabra completa es un correo si hay '@' con algo antes y después
+        if PATRON_CORREO.match(texto, inicio, fin):
+            partes.append(texto[inicio_copia:inicio])
+            inicio_copia = fin
+        arroba = texto.find("@", fin)
+    if not partes:
+        return texto
+    partes.append(texto[inicio_copia:])
+    return "".join(partes)
+
+
+# --------------------------------------------
+# FLUJO COMPACTO DE TOKENS
+# --------------------------------------------
+
+class FlujoTokens:
+    """
+    Tokens lematizados en forma compacta, en lugar de un dict con tres
+    strings por token:
+    - ids: id de lema por token (array('i')); los lemas se internan en
+      orden de primera aparición (lemas[id] es el lema)
+    - pos: código de etiqueta POS por token (array('B'), etiquetas[código])
+    - ids_forma / formas: forma superficial, sólo si se pide con con_formas
+    Se puede recorrer e indexar como la lista de dicts {'lema', 'pos', 'texto'}
+    que devolvían antes los lematizadores (sin formas, 'texto' es el lema).
+    """
+
+    def __init__(self, con_formas=False):
+        self.lemas = []
+        self._id_lema = {}
+        self.etiquetas = []
+        self._codigo_pos = {}
+        self.ids = array('i')
+        self.pos = array('B')
+        self.formas = [] if con_formas else None
+        self._id_forma = {}
+        self.ids_forma = array('i') if con_formas else None
+
+    @classmethod
+    def desde_tokens(cls, tokens, con_formas=False):
+        """Convierte una lista de dicts {'lema', 'pos', 'texto'} (o un FlujoTokens)."""
+        if isinstance(tokens, cls):
+            return tokens
+        flujo = cls(con_formas=con_formas)
+        for t in tokens:
+            flujo.agregar(t['lema'], t.get('pos', 'UNK'), t.get('texto'))
+        return flujo
+
+    def agregar(self, lema, pos="UNK", texto=None):
+        id_lema = self._id_lema.get(lema)
+        if id_lema is None:
+            id_lema = self._id_lema[lema] = len(self.lemas)
+            self.lemas.append(lema)
+        self.ids.append(id_lema)
+        self.pos.append(self._codigo(pos))
+        if self.ids_forma is not None:
+            forma = lema if texto is None else texto
+            id_forma = self._id_forma.get(forma)
+            if id_forma is None:
+                id_forma = self._id_forma[forma] = len(self.formas)
+                self.formas.append(forma)
+            self.ids_forma.append(id_forma)
+
+    def _codigo(self, pos):
+        codigo = self._codigo_pos.get(pos)
+        if codigo is None:
+            if len(self.etiquetas) >= 255:
+                # No caben más etiquetas en un byte; las raras quedan como UNK
+                return self._codigo("UNK") if pos != "UNK" else 255
+            codigo = self._codigo_pos[pos] = len(self.etiquetas)
+            self.etiquetas.append(pos)
+        return codigo
+
+    def arreglo_ids(self):
+        """Ids de lema como arreglo de NumPy (sin copiar)."""
+        return np.frombuffer(self.ids, dtype=np.intc) if self.ids else np.zeros(0, dtype=np.intc)
+
+    def token(self, i):
+        lema = self.lemas[self.ids[i]]
+        return {
+            'lema': lema,
+            'pos': self.etiquetas[self.pos[i]] if self.pos[i] < len(self.etiquetas) else "UNK",
+            'texto': self.formas[self.ids_forma[i]] if self.ids_forma is not None else lema,
+        }
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.token(j) for j in range(*i.indices(len(self)))]
+        return self.token(range(len(self))[i])
+
+    def __iter__(self):
+        return (self.token(i) for i in range(len(self.ids)))
+
+
+# --------------------------------------------
+# COOCURRENCIAS POR DISTANCIA
+# --------------------------------------------
+
+# Peso de una coocurrencia a distancia d (arreglo) dentro de una ventana v
+DECAIMIENTOS = {
+    "inversa": lambda d, v: 1.0 / d,
+    "uniforme": lambda d, v: np.ones_like(d),
+    "lineal": lambda d, v: (v - d + 1) / v,
+    "exponencial": lambda d, v: 0.5 ** (d - 1),
+}
+
+
+class Coocurrencias:
+    """
+    Conteos de coocurrencia por distancia (1..ventana_max) de un corpus, con
+    los que se arma el grafo de cualquier ventana y decaimiento sin volver a
+    lematizar ni recorrer el corpus (ver grafo()).
+    - lemas: vocabulario en orden de primera aparición (el de los nodos)
+    - para cada distancia d, los pares (u, v) con u <= v, cuántas veces
+      aparecen a esa distancia y la posición de su primera aparición; los
+      de la distancia d están en [inicio[d - 1], inicio[d]) de u, v, conteo, primero
+    - cabeza / cola: los primeros y los últimos ventana_max tokens (índices
+      en lemas), para contar los pares que cruzan la unión al concatenar con
+      otro corpus (ver concatenar); None en conteos guardados antes
+    - secuencia: la secuencia completa, sin filtrar, como índices en el
+      vocab_freq del corpus (en su orden); para volver a contar al combinar
+      corpus cuando el filtro de frecuencia cambia (ver combinar_coocurrencias).
+      Sólo se carga si se pide
+    """
+
+    def __init__(self, lemas, ventana_max, inicio, u, v, conteo, primero, cabeza=None, cola=None,
+                 secuencia=None):
+        self.lemas = lemas
+        self.ventana_max = ventana_max
+        self.inicio = inicio
+        self.u = u
+        self.v = v
+        self.conteo = conteo
+        self.primero = primero
+        self.cabeza = cabeza
+        self.cola = cola
+        self.secuencia = secuencia
+
+    @classmethod
+    def contar(cls, ids, lemas, ventana_max):
+        """Cuenta sobre la secuencia ids (índices en lemas), una distancia a la vez."""
+        # Vocabulario compacto en orden de primera aparición
+        presentes, primeros = np.unique(ids, return_index=True)
+        orden = presentes[np.argsort(primeros, kind='stable')]
+        compacto = np.zeros(len(lemas), dtype=np.int32)
+        compacto[orden] = np.arange(len(orden), dtype=np.int32)
+        ids = compacto[ids].astype(np.int64)
+        n = len(orden)
+
+        inicio, us, vs, conteos, primeros_d = [0], [], [], [], []
+        for distancia in range(1, ventana_max + 1):
+            if distancia < len(ids):
+                pares_d, primero, conteo = kernels.contar_pares(ids, distancia, n)
+                u, v = np.divmod(pares_d, n)
+            else:
+                u = v = primero = conteo = np.zeros(0, dtype=np.int64)
+            us.append(u.astype(np.int32))
+            vs.append(v.astype(np.int32))
+            conteos.append(conteo.astype(np.int32))
+            primeros_d.append(primero.astype(np.int64))
+            inicio.append(inicio[-1] + len(u))
+
+        return cls([lemas[k] for k in orden.tolist()], ventana_max, np.array(inicio, dtype=np.int64),
+                   np.concatenate(us), np.concatenate(vs), np.concatenate(conteos),
+                   np.concatenate(primeros_d),
+                   ids[:ventana_max].astype(np.int32), ids[len(ids) - ventana_max:].astype(np.int32))
+
+    def concatenar(self, otra, largo):
+        """
+        Conteos de la secuencia de éste seguida de la de otra, iguales a
+        contarlas juntas; largo es la cantidad de tokens de la de éste.
+        - Vocabulario: el de éste y después las palabras nuevas de otra.
+        - Pares de otra con los índices del vocabulario unido y la primera
+          aparición corrida en largo.
+        - Pares que cruzan la unión, desde la cola de éste y la cabeza de
+          otra. Si alguno no tiene bordes (conteos guardados antes) esos
+          pares faltan y el resultado tampoco tiene bordes.
+        Con ventanas máximas distintas se usa la menor.
+        """
+        ventana_max = min(self.ventana_max, otra.ventana_max)
+        lemas = list(self.lemas)
+        indice = {lema: i for i, lema in enumerate(lemas)}
+        for lema in otra.lemas:
+            if lema not in indice:
+                indice[lema] = len(lemas)
+                lemas.append(lema)
+        mapa = np.array([indice[lema] for lema in otra.lemas], dtype=np.int64)
+        n = len(lemas)
+
+        bordes = self.cola is not None and otra.cabeza is not None
+        if bordes:
+            union = np.concatenate([self.cola.astype(np.int64), mapa[otra.cabeza]])
+            k = len(self.cola)
+
+        inicio, us, vs, conteos, primeros_d = [0], [], [], [], []
+        for distancia in range(1, ventana_max + 1):
+            a = slice(self.inicio[distancia - 1], self.inicio[distancia])
+            b = slice(otra.inicio[distancia - 1], otra.inicio[distancia])
+            ub, vb = mapa[otra.u[b]], mapa[otra.v[b]]
+            u = [self.u[a].astype(np.int64), np.minimum(ub, vb)]
+            v = [self.v[a].astype(np.int64), np.maximum(ub, vb)]
+            conteo = [self.conteo[a].astype(np.int64), otra.conteo[b].astype(np.int64)]
+            primero = [self.primero[a], otra.primero[b] + largo]
+            if bordes:
+                i = np.arange(max(0, k - distancia), min(k, len(union) - distancia))
+                x, y = union[i], union[i + distancia]
+                u.append(np.minimum(x, y))
+                v.append(np.maximum(x, y))
+                conteo.append(np.ones(len(i), dtype=np.int64))
+                primero.append(largo - k + i)
+
+            # Sumar los pares repetidos, ordenados como en contar()
+            claves, inversa = np.unique(np.concatenate(u) * n + np.concatenate(v), return_inverse=True)
+            suma = np.zeros(len(claves), dtype=np.int64)
+            np.add.at(suma, inversa, np.concatenate(conteo))
+            minimo = np.full(len(claves), np.iinfo(np.int64).max)
+            np.minimum.at(minimo, inversa, np.concatenate(primero))
+            u_d, v_d = np.divmod(claves, n)
+            us.append(u_d.astype(np.int32))
+            vs.append(v_d.astype(np.int32))
+            conteos.append(suma.astype(np.int32))
+            primeros_d.append(minimo)
+            inicio.append(inicio[-1] + len(claves))
+
+        cabeza = cola = None
+        if bordes:
+            # Una secuencia más corta que la ventana está entera en su cabeza (y su cola)
+            cabeza = self.cabeza if len(self.cabeza) >= ventana_max else \
+                np.concatenate([self.cabeza.astype(np.int64), mapa[otra.cabeza]])
+            cola = mapa[otra.cola] if len(otra.cola) >= ventana_max else union
+            cabeza = cabeza[:ventana_max].astype(np.int32)
+            cola = cola[len(cola) - ventana_max:].astype(np.int32)
+
+        return Coocurrencias(lemas, ventana_max, np.array(inicio, dtype=np.int64),
+                             np.concatenate(us), np.concatenate(vs), np.concatenate(conteos),
+                             np.concatenate(primeros_d), cabeza, cola)
+
+    def aristas(self, ventana=None, decaimiento="inversa"):
+        """
+        (u, v, peso) de cada par que coocurre dentro de la ventana, en el
+        orden en que la ventana deslizante los encuentra por primera vez
+        (posición y luego distancia). El peso suma, por distancia, conteo *
+        2 * decaimiento(d): cada coocurrencia cuenta desde los dos tokens.
+        """
+        ventana = self.ventana_max if ventana is None else ventana
+        if not 1 <= ventana <= self.ventana_max:
+            raise ValueError(f"La ventana debe estar entre 1 y {self.ventana_max} "
+                             f"(la máxima con la que se contó)")
+        if decaimiento not in DECAIMIENTOS:
+            raise ValueError(f"Decaimiento desconocido: {decaimiento} "
+                             f"(opciones: {', '.join(DECAIMIENTOS)})")
+        fin = self.inicio[ventana]
+        distancia = np.repeat(np.arange(1, ventana + 1), np.diff(self.inicio[:ventana + 1]))
+        factor = 2.0 * DECAIMIENTOS[decaimiento](distancia.astype(float), float(ventana))
+
+        n = len(self.lemas)
+        claves, inversa = np.unique(self.u[:fin].astype(np.int64) * n + self.v[:fin], return_inverse=True)
+        pesos = np.bincount(inversa, weights=self.conteo[:fin] * factor, minlength=len(claves))
+        creacion = np.full(len(claves), np.iinfo(np.int64).max)
+        np.minimum.at(creacion, inversa, self.primero[:fin] * (self.ventana_max + 1) + distancia)
+
+        orden = np.argsort(creacion, kind='stable')
+        u, v = np.divmod(claves[orden], n)
+        return u, v, pesos[orden]
+
+    def grafo(self, ventana=None, decaimiento="inversa"):
+        """Grafo con los nodos en orden de primera aparición y las aristas de aristas()."""
+        G = nx.Graph()
+        G.add_nodes_from(self.lemas)
+        u, v, pesos = self.aristas(ventana, decaimiento)
+        G.add_edges_from(
+            (self.lemas[a], self.lemas[b], {'weight': peso})
+            for a, b, peso in zip(u.tolist(), v.tolist(), pesos.tolist()))
+        return G
+
+    def guardar(self, ruta):
+        temporal = _temporal(ruta)
+        with open(temporal, "wb") as f:
+            extra = {} if self.cabeza is None else {"cabeza": self.cabeza, "cola": self.cola}
+            if self.secuencia is not None:
+                extra["secuencia"] = self.secuencia
+            np.savez_compressed(f, lemas=np.array(self.lemas, dtype=str),
+                                ventana_max=self.ventana_max, inicio=self.inicio,
+                                u=self.u, v=self.v, conteo=self.conteo, primero=self.primero,
+                                **extra)
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta, con_secuencia=False):
+        with np.load(ruta) as datos:
+            bordes = (datos["cabeza"], datos["cola"]) if "cabeza" in datos.files else (None, None)
+            secuencia = datos["secuencia"] if con_secuencia and "secuencia" in datos.files else None
+            return cls(datos["lemas"].tolist(), int(datos["ventana_max"]), datos["inicio"],
+                       datos["u"], datos["v"], datos["conteo"], datos["primero"], *bordes,
+                       secuencia=secuencia)
+
+
 class TextProcessor:
-    def __init__(self):
-        self.cache = {}
+    def __init__(self, freeling=None):
+        # Cliente FreeLing propio (p. ej. contra un servidor local); si no, el compartido
+        self.freeling = freeling
         self.pos_weights = {
             'NOUN': 2.0,     # Sustantivos más importantes
             'VERB': 1.5,     # Verbos importantes
@@ -128,27 +548,57 @@ class TextProcessor:
             'CONJ': 0.1      # Conjunciones mínimo peso
         }
 
+    @metricas.cronometrado("clean")
     def limpiar_texto_avanzado(self, texto):
         """Limpieza más sofisticada del texto."""
-        # Eliminar URLs
-        texto = re.sub(
-            r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', texto)
-        # Eliminar emails
-        texto = re.sub(r'\S+@\S+', '', texto)
-        # Eliminar números solos
-        texto = re.sub(r'\b\d+\b', '', texto)
-        # Mantener solo letras y espacios (con acentos)
-        texto = re.sub(r'[^a-záéíóúñü\s]', ' ', texto.lower())
-        # Eliminar espacios múltiples
-        texto = re.sub(r'\s+', ' ', texto).strip()
-        return texto
+        return "".join(self.limpiar_flujo(
+            texto[i:i + TAM_FRAGMENTO] for i in range(0, len(texto), TAM_FRAGMENTO)))
 
-    def lematizar_con_spacy(self, texto):
+    def limpiar_flujo(self, fragmentos):
+        """
+        Versión por partes de limpiar_texto_avanzado: recibe un iterable de
+        fragmentos (o un archivo abierto) y produce el texto limpio en pedazos,
+        sin tener nunca el texto completo en memoria. Unir lo producido da
+        exactamente lo mismo que limpiar el texto entero:
+        - sin URLs ni correos
+        - en minúsculas, sólo letras (con acentos); lo demás separa palabras
+        - palabras separadas por un solo espacio
+        (Los números solos no necesitan un paso propio: sus dígitos y los
+        caracteres que los rodean nunca son letras.)
+        """
+        if hasattr(fragmentos, "read"):
+            archivo = fragmentos
+            fragmentos = iter(lambda: archivo.read(TAM_FRAGMENTO), "")
+        separador = ""
+        for fragmento in _fragmentos_en_espacios(fragmentos):
+            # Eliminar URLs
+            if "http" in fragmento:
+                fragmento = PATRON_URL.sub("", fragmento)
+            # Eliminar emails
+            if "@" in fragmento:
+                fragmento = _quitar_correos(fragmento)
+            # Mantener solo letras (con acentos) y unir con un espacio
+            palabras = PATRON_PALABRAS.findall(fragmento.lower())
+            if palabras:
+                yield separador + " ".join(palabras)
+                separador = " "
+
+    @metricas.cronometrado("clean")
+    def limpiar_archivo(self, ruta_entrada, ruta_salida):
+        """Limpia un archivo de texto por partes y escribe el resultado en ruta_salida."""
+        with open(ruta_entrada, "r", encoding="utf-8") as entrada, \
+                open(ruta_salida, "w", encoding="utf-8") as salida:
+            for pedazo in self.limpiar_flujo(entrada):
+                salida.write(pedazo)
+
+    @metricas.cronometrado("lemmatize")
+    def lematizar_con_spacy(self, texto, con_formas=False):
         """
         Lematización optimizada para textos largos (Chunking).
         Divide el texto en bloques de 100,000 caracteres para evitar desbordamiento de memoria.
+        Devuelve un FlujoTokens (con las formas superficiales si con_formas).
         """
-        tokens_procesados = []
+        tokens_procesados = FlujoTokens(con_formas=con_formas)
 
         # 1. Si NO tenemos spaCy, usamos un método manual simple para evitar fallos de API con textos gigantes
         if not nlp:
@@ -157,11 +607,8 @@ class TextProcessor:
             palabras = texto.split()
             for w in palabras:
                 if len(w) > 2 and w not in STOPWORDS:
-                    tokens_procesados.append({
-                        'lema': w, # Sin spaCy, el lema es la palabra misma
-                        'pos': 'UNK',
-                        'texto': w
-                    })
+                    # Sin spaCy, el lema es la palabra misma
+                    tokens_procesados.agregar(w, 'UNK', w)
             return tokens_procesados
 
         # 2. Configurar spaCy para permitir textos más largos (por seguridad)
@@ -179,48 +626,72 @@ class TextProcessor:
             
             # Procesar ese pedazo
             doc = nlp(lote)
-
             for token in doc:
                 if not token.is_stop and not token.is_punct and len(token.text) > 2:
-                    tokens_procesados.append({
-                        'lema': token.lemma_.lower(),
-                        'pos': token.pos_,
-                        'texto': token.text.lower()
-                    })
+                    tokens_procesados.agregar(
+                        token.lemma_.lower(), token.pos_, token.text.lower() if con_formas else None)
 
         return tokens_procesados
-    def lematizar_freeling_mejorado(self, texto):
-        """Versión mejorada de lematización con FreeLing."""
-        if texto in self.cache:
-            return self.cache[texto]
 
-        url = "http://www.corpus.unam.mx/servicio-freeling/analyze.php"
-        params = {"outf": "tagged", "format": "json"}
+    def procesar_consulta(self, definicion):
+        """
+        Limpia y lematiza una definición de búsqueda.
+        Devuelve (definicion_limpia, lemas) con todos los lemas, estén o no en el grafo.
+        """
+        definicion_limpia = self.limpiar_texto_avanzado(definicion)
+        tokens_def = self.lematizar_con_spacy(definicion_limpia) if nlp else \
+            self.lematizar_freeling_mejorado(definicion_limpia)
+        return definicion_limpia, [t['lema'] for t in tokens_def]
+
+    def _tokens_desde_doc(self, doc):
+        """FlujoTokens con los tokens útiles (sin stopwords ni puntuación) de un Doc de spaCy."""
+        tokens_procesados = FlujoTokens(con_formas=True)
+        for token in doc:
+            if not token.is_stop and not token.is_punct and len(token.text) > 2:
+                tokens_procesados.agregar(token.lemma_.lower(), token.pos_, token.text.lower())
+        return tokens_procesados
 
-        try:
-            archivo = io.BytesIO(texto.encode("utf-8"))
-            archivo.name = "texto.txt"
-            files = {'file': archivo}
-            r = requests.post(url, files=files, params=params, timeout=30)
-            data = r.json()
-
-            tokens_procesados = []
-            for sent in data:
-                for w in sent:
-                    if len(w["lemma"]) > 2 and w["lemma"].lower() not in STOPWORDS:
-                        tokens_procesados.append({
-                            'lema': w["lemma"].lower(),
-                            'pos': w.get("tag", "UNK")[0] if "tag" in w else "UNK",
-                            'texto': w["form"].lower()
-                        })
-
-            self.cache[texto] = tokens_procesados
-            return tokens_procesados
-        except Exception as e:
-            print(f"Error en lematización: {e}")
-            # Fallback: tokenización simple
-            return [{'lema': w, 'pos': 'UNK', 'texto': w}
-                    for w in texto.split() if len(w) > 2 and w not in STOPWORDS]
+    def lematizar_lote(self, textos):
+        """
+        Lematiza varias definiciones cortas de una sola vez; devuelve un
+        FlujoTokens (con formas) por texto, con spaCy o sin él.
+        Con spaCy usa una única llamada a nlp.pipe; sin spaCy recurre a FreeLing
+        texto por texto, igual que la búsqueda individual.
+        """
+        if not nlp:
+            with metricas.medir("lemmatize"):
+                cliente = self.freeling or obtener_freeling()
+                return [self._tokens_freeling(r) for r in cliente.analizar_lote(textos)]
+
+        with metricas.medir("lemmatize"):
+            return [self._tokens_desde_doc(doc)
+                    for doc in nlp.pipe(textos, batch_size=64)]
+
+    @metricas.cronometrado("lemmatize")
+    def lematizar_freeling_mejorado(self, texto):
+        """
+        Lematización con el servicio FreeLing (ver freeling.ClienteFreeling):
+        el texto va en fragmentos, en paralelo y con caché por fragmento. Si
+        un fragmento falla, sólo ése se tokeniza de forma simple.
+        """
+        cliente = self.freeling or obtener_freeling()
+        return self._tokens_freeling(cliente.analizar(texto))
+
+    def _tokens_freeling(self, resultados):
+        """FlujoTokens a partir de [(fragmento, palabras o None)] de ClienteFreeling."""
+        tokens_procesados = FlujoTokens(con_formas=True)
+        for fragmento, palabras in resultados:
+            if palabras is None:
+                # Fallback: tokenización simple
+                for w in fragmento.split():
+                    if len(w) > 2 and w not in STOPWORDS:
+                        tokens_procesados.agregar(w, 'UNK', w)
+                continue
+            for lema, forma, etiqueta in palabras:
+                if len(lema) > 2 and lema.lower() not in STOPWORDS:
+                    tokens_procesados.agregar(
+                        lema.lower(), etiqueta[0] if etiqueta else "UNK", forma.lower())
+        return tokens_procesados
 
 # ---------------------------
 # CONSTRUCCIÓN MEJORADA DEL GRAFO
@@ -232,51 +703,143 @@ class GraphBuilder:
         self.processor = processor
         self.vocab_freq = Counter()
         self.word_contexts = defaultdict(set)
+        # Conteos por distancia de la última construcción, y la ventana y el
+        # decaimiento del grafo armado con ellos (ver construir_grafo_mejorado)
+        self.coocurrencias = None
+        self.ventana = None
+        self.decaimiento = None
+        self.poda = {}  # criterios con que se podó (ver podar_segun_config)
+        self.version = None  # versión del catálogo que se cargó o se guardó
+
+    @perfilado.perfilable("construir")
+    @metricas.cronometrado("build")
+    def construir_grafo_mejorado(self, tokens_procesados, window_size=None, decaimiento=None,
+                                 ventana_max=None):
+        """
+        Construcción mejorada del grafo con pesos contextuales.
+        Recibe un FlujoTokens (o la lista de dicts de antes) y cuenta las
+        coocurrencias por distancia, hasta ventana_max, sobre los ids de lema
+        (ver Coocurrencias); el grafo es el de window_size y decaimiento, y
+        los conteos quedan en self.coocurrencias para guardarlos y armar
+        después otras ventanas sin reconstruir. Por defecto se usan
+        CONFIG["ventana"], CONFIG["decaimiento"] y CONFIG["ventana_max"].
+        """
+        window_size = window_size or CONFIG["ventana"]
+        decaimiento = decaimiento or CONFIG["decaimiento"]
+        ventana_max = max(ventana_max or CONFIG["ventana_max"], window_size)
 
-    def construir_grafo_mejorado(self, tokens_procesados, window_size=15):
-        """Construcción mejorada del grafo con pesos contextuales."""
-        G = nx.Graph()
-
-        # Extraer solo lemas para el grafo
-        lemas = [t['lema'] for t in tokens_procesados]
+        flujo = FlujoTokens.desde_tokens(tokens_procesados)
+        ids = flujo.arreglo_ids()
 
-        # Calcular frecuencias
-        self.vocab_freq = Counter(lemas)
+        # Calcular frecuencias (en orden de primera aparición, como Counter(lemas))
+        conteos = np.bincount(ids, minlength=len(flujo.lemas))
+        self.vocab_freq = Counter(dict(zip(flujo.lemas, conteos.tolist())))
 
         # Filtrar palabras muy raras o muy comunes
-        total_words = len(lemas)
-        lemas_filtrados = []
-        for lema in lemas:
-            freq = self.vocab_freq[lema] / total_words
-            if 0.0001 < freq < 1.0:  # Entre 0.01% y 10% de frecuencia
-                lemas_filtrados.append(lema)
-
-        # Construir grafo con ventana deslizante
-        for i, palabra_central in enumerate(lemas_filtrados):
-            # Ventana de contexto
-            inicio = max(0, i - window_size)
-            fin = min(len(lemas_filtrados), i + window_size + 1)
-
-            for j in range(inicio, fin):
-                if i != j:
-                    palabra_contexto = lemas_filtrados[j]
-                    distancia = abs(i - j)
-                    peso = 1.0 / distancia  # Peso inversamente proporcional a la distancia
-
-                    if G.has_edge(palabra_central, palabra_contexto):
-                        G[palabra_central][palabra_contexto]['weight'] += peso
-                    else:
-                        G.add_edge(palabra_central,
-                                   palabra_contexto, weight=peso)
-
-                    # Guardar contextos para cada palabra
-                    self.word_contexts[palabra_central].add(palabra_contexto)
-
-        # Calcular métricas adicionales del grafo
+        total_words = len(ids)
+        if total_words == 0:
+            self.coocurrencias = None
+            return nx.Graph()
+        validos = self.filtro_frecuencia(conteos)
+        lemas_filtrados = ids[validos[ids]]
+
+        # Contar una sola vez por distancia y armar el grafo de esta ventana
+        self.coocurrencias = Coocurrencias.contar(lemas_filtrados, flujo.lemas, ventana_max)
+        self.coocurrencias.secuencia = ids.astype(np.int32)
+        return self.grafo_desde_coocurrencias(window_size, decaimiento)
+
+    @staticmethod
+    def filtro_frecuencia(conteos):
+        """Máscara de los lemas (conteo de cada uno en el corpus) que entran al grafo."""
+        freq = conteos / conteos.sum()
+        return (freq > 0.0001) & (freq < 1.0)  # Entre 0.01% y 10% de frecuencia
+
+    def grafo_desde_coocurrencias(self, ventana=None, decaimiento="inversa"):
+        """
+        Grafo de self.coocurrencias con la ventana y el decaimiento dados, con
+        los atributos y word_contexts que deja construir_grafo_mejorado.
+        """
+        G = self.coocurrencias.grafo(ventana, decaimiento)
+        if G.number_of_edges() == 0:
+            G = nx.Graph()  # sin coocurrencias no hay grafo (como antes)
+        self.ventana = ventana or self.coocurrencias.ventana_max
+        self.decaimiento = decaimiento
+
+        # Calcular métricas adicionales del grafo y guardar contextos
+        self.word_contexts = defaultdict(set)
         for node in G.nodes():
             G.nodes[node]['frequency'] = self.vocab_freq[node]
             G.nodes[node]['degree'] = G.degree(node)
+            self.word_contexts[node].update(G[node])
+
+        return G
+
+    @metricas.cronometrado("prune")
+    def podar_grafo(self, G, peso_min=None, pmi_min=None, npmi_min=None,
+                    top_k=None, freq_min=None):
+        """
+        Poda del grafo entre la construcción y guardar_diccionario.
+        Cada criterio es opcional (None = no se aplica):
+        - freq_min: quita las palabras con menos apariciones en el corpus
+        - peso_min: quita las aristas con peso (coocurrencia ponderada) menor
+        - pmi_min / npmi_min: quita las aristas con PMI / NPMI menor, calculados
+          sobre los pesos del grafo sin podar (p(u) ~ suma de pesos de u)
+        - top_k: de lo que queda, cada palabra conserva sus top_k aristas de
+          mayor peso (una arista sobrevive si está en el top_k de cualquiera
+          de sus dos extremos)
+        Las palabras sin aristas se eliminan y word_contexts se restringe a los
+        vecinos que quedan, como lo deja construir_grafo_mejorado.
+        Modifica G en el lugar y lo devuelve.
+        """
+        aristas_antes = G.number_of_edges()
+        nodos_antes = G.number_of_nodes()
+
+        # Estadísticas de PMI con los pesos originales (antes de quitar palabras por freq_min)
+        usar_pmi = pmi_min is not None or npmi_min is not None
+        if usar_pmi:
+            fuerza = dict(G.degree(weight="weight"))
+            total = sum(fuerza.values())
+
+        if freq_min:
+            G.remove_nodes_from([n for n in list(G.nodes())
+                                 if self.vocab_freq.get(n, 0) < freq_min])
+
+        quitar = []
+        for u, v, peso in G.edges(data="weight"):
+            if peso_min is not None and peso < peso_min:
+                quitar.append((u, v))
+                continue
+            if usar_pmi:
+                pmi = np.log(peso * total / (fuerza[u] * fuerza[v]))
+                if pmi_min is not None and pmi < pmi_min:
+                    quitar.append((u, v))
+                    continue
+                if npmi_min is not None:
+                    p_uv = peso / total
+                    npmi = pmi / -np.log(p_uv) if p_uv < 1 else 1.0
+                    if npmi < npmi_min:
+                        quitar.append((u, v))
+                        continue
+        G.remove_edges_from(quitar)
+
+        if top_k:
+            conservar = set()
+            for nodo in G.nodes():
+                vecinos = sorted(G[nodo].items(), key=lambda x: x[1]["weight"], reverse=True)
+                for vecino, _ in vecinos[:top_k]:
+                    conservar.add((nodo, vecino))
+            G.remove_edges_from([(u, v) for u, v in G.edges()
+                                 if (u, v) not in conservar and (v, u) not in conservar])
+
+        G.remove_nodes_from(list(nx.isolates(G)))
+
+        for node in G.nodes():
+            G.nodes[node]['degree'] = G.degree(node)
+        self.word_contexts = defaultdict(set, {
+            node: set(G.neighbors(node)) for node in G.nodes()})
 
+        print(f"   Poda: {nodos_antes} -> {G.number_of_nodes()} nodos, "
+              f"{aristas_antes} -> {G.number_of_edges()} aristas")
         return G
 
     def calcular_embeddings_contextuales(self, G, dim=50):
@@ -288,24 +851,183 @@ class GraphBuilder:
             model = node2vec.fit(window=5, min_count=1, batch_words=4)
             return model.wv
         except ImportError:
-            # Fallback: representación basada en vecinos
-            embeddings = {}
-            for node in G.nodes():
-                neighbors = list(G.neighbors(node))
-                vector = np.zeros(len(G.nodes()))
-                for n in neighbors:
-                    idx = list(G.nodes()).index(n)
-                    vector[idx] = G[node][n]['weight'] if G.has_edge(
-                        node, n) else 0
-                embeddings[node] = vector
-            return embeddings
+            # Fallback: representación basada en vecinos (la fila de adyacencia de cada nodo)
+            nodos = list(G.nodes())
+            if not nodos:
+                return {}
+            A = nx.to_scipy_sparse_array(G, nodelist=nodos, weight='weight', dtype=float, format='csr')
+            filas = kernels.filas_densas(A.indptr, A.indices, A.data)
+            return {node: filas[i] for i, node in enumerate(nodos)}
 
 # ---------------------------
 # SISTEMA DE BÚSQUEDA MEJORADO
 # ---------------------------
 
 
+class PlazoVencido(Exception):
+    """Se lanza cuando una búsqueda supera su plazo y el trabajo restante ya no sirve."""
+
+
+class Plazo:
+    """Plazo (deadline) de una búsqueda, medido con reloj monótono."""
+
+    def __init__(self, segundos=None):
+        self.segundos = segundos
+        self.limite = time.monotonic() + segundos if segundos else None
+
+    @classmethod
+    def desde_ms(cls, valor):
+        """
+        Plazo a partir del 'deadline_ms' de un request. Lanza ValueError si no
+        es un número finito y positivo (0, NaN o infinito dejarían la búsqueda
+        sin plazo; un negativo la cancelaría antes de empezar).
+        """
+        try:
+            ms = float(valor)
+        except (TypeError, ValueError):
+            raise ValueError("deadline_ms debe ser un número") from None
+        if not math.isfinite(ms) or ms <= 0:
+            raise ValueError("deadline_ms debe ser un número finito mayor que 0")
+        return cls(ms / 1000.0)
+
+    def restante(self):
+        """Segundos que quedan (None si no hay plazo)."""
+        if self.limite is None:
+            return None
+        return max(0.0, self.limite - time.monotonic())
+
+    def vencido(self):
+        return self.limite is not None and time.monotonic() >= self.limite
+
+    def verificar(self):
+        """Cancela cooperativamente: lanza PlazoVencido si el plazo ya pasó."""
+        if self.vencido():
+            raise PlazoVencido()
+
+
+class BusquedaParcial:
+    """
+    Scores que una búsqueda progresiva lleva calculados (ver buscar_progresivo):
+    quien la espera con un corte duro puede fusionarlos si se rinde antes de que
+    termine. Una búsqueda coalescida sigue a la del líder (seguir).
+    """
+
+    def __init__(self):
+        self.scores = {}
+        self.lemas_def = []
+        self.fuente = None
+
+    def seguir(self, otra):
+        self.fuente = otra
+
+    def fusionar(self, reverse_dict, top_k=15):
+        """(resultados, estrategias) con los scores que ya hay o None si todavía no hay ninguno."""
+        parcial = self.fuente or self
+        scores = dict(parcial.scores)
+        if not scores:
+            return None
+        return reverse_dict.fusionar(scores, parcial.lemas_def, top_k=top_k), list(scores)
+
+
+class CachePPR:
+    """
+    Vectores de PageRank personalizado de un solo lema, truncados a sus top_m
+    nodos de mayor score. PageRank es lineal en el vector de personalización:
+    el de una definición (semilla uniforme sobre sus lemas) es el promedio de
+    los vectores de sus lemas, pesado por la masa que cada uno tendría sin
+    normalizar (todas iguales a 1 si el grafo no tiene nodos colgantes).
+    """
+
+    def __init__(self, n_nodos, top_m=500, alpha=0.85, firma=None, max_lemas=None):
+        self.n_nodos = n_nodos
+        self.top_m = top_m
+        self.alpha = alpha
+        self.firma = firma
+        self.max_lemas = max_lemas
+        self.vectores = {}  # índice del lema -> (índices, valores, masa)
+
+    def masa(self, vector, colgantes):
+        """Suma del vector sin normalizar, a partir de su masa en nodos colgantes."""
+        en_colgantes = float(vector[colgantes].sum()) if colgantes is not None else 0.0
+        return (1 - self.alpha) / (1 - self.alpha + self.alpha * en_colgantes)
+
+    def agregar(self, idx, vector, colgantes):
+        """Guarda el vector (denso, normalizado) del lema idx, truncado a top_m."""
+        if self.max_lemas is not None and len(self.vectores) >= self.max_lemas:
+            return
+        if len(vector) > self.top_m:
+            indices = np.argpartition(-vector, self.top_m - 1)[:self.top_m]
+        else:
+            indices = np.arange(len(vector))
+        indices = np.sort(indices[vector[indices] > 0]).astype(np.int32)
+        self.vectores[idx] = (indices, vector[indices].copy(), self.masa(vector, colgantes))
+
+    def componer(self, idxs):
+        """
+        (acumulado, peso, faltantes): suma de masa * vector de los lemas que
+        están en caché, la suma de sus masas y los lemas que no están.
+        """
+        acumulado = np.zeros(self.n_nodos)
+        peso = 0.0
+        faltantes = []
+        for idx in idxs:
+            entrada = self.vectores.get(idx)
+            if entrada is None:
+                faltantes.append(idx)
+                continue
+            indices, valores, masa = entrada
+            acumulado[indices] += valores * masa
+            peso += masa
+        return acumulado, peso, faltantes
+
+    def guardar(self, ruta):
+        """Escribe la caché en un .npz (reemplazo atómico)."""
+        lemas = np.array(sorted(self.vectores), dtype=np.int64)
+        partes = [self.vectores[idx] for idx in lemas]
+        indptr = np.zeros(len(lemas) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(indices) for indices, _, _ in partes])
+        vacio_i, vacio_v = np.zeros(0, dtype=np.int32), np.zeros(0)
+        temporal = _temporal(ruta)
+        with open(temporal, "wb") as f:
+            np.savez(
+                f, lemas=lemas, indptr=indptr,
+                indices=np.concatenate([i for i, _, _ in partes]) if partes else vacio_i,
+                valores=np.concatenate([v for _, v, _ in partes]) if partes else vacio_v,
+                masas=np.array([m for _, _, m in partes]),
+                parametros=np.array([self.n_nodos, self.top_m, self.alpha]),
+                firma=np.array(self.firma or ""))
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta, firma=None, max_lemas=None):
+        """Lee la caché de ruta; None si no existe o es de otra versión del grafo."""
+        if not os.path.exists(ruta):
+            return None
+        with np.load(ruta) as datos:
+            if firma is not None and str(datos["firma"]) != firma:
+                return None
+            n_nodos, top_m, alpha = datos["parametros"]
+            cache = cls(int(n_nodos), int(top_m), float(alpha), firma=firma, max_lemas=max_lemas)
+            indptr, indices, valores = datos["indptr"], datos["indices"], datos["valores"]
+            for k, (idx, masa) in enumerate(zip(datos["lemas"], datos["masas"])):
+                cache.vectores[int(idx)] = (
+                    indices[indptr[k]:indptr[k + 1]], valores[indptr[k]:indptr[k + 1]], float(masa))
+        return cache
+
+
 class ReverseDict:
+    # Pesos de cada estrategia al combinar scores
+    PESOS = {
+        'pagerank': 0.35,
+        'tfidf': 0.30,
+        'propagacion': 0.25,
+        'betweenness': 0.10
+    }
+
+    # Orden de la búsqueda progresiva mientras no se sabe cuánto tarda cada
+    # estrategia en este grafo; después se ordenan por su duración medida
+    ORDEN_PROGRESIVO = ('tfidf', 'propagacion', 'pagerank', 'betweenness')
+
     def __init__(self, grafo, processor, builder):
         self.grafo = grafo
         self.processor = processor
@@ -313,24 +1035,45 @@ class ReverseDict:
         self.tfidf = None
         self.tfidf_matrix = None
         self.vocab = list(grafo.nodes())
+        self.cache_ppr = None  # ver precalcular_ppr / preparar_busqueda
+        self.duraciones = {}  # estrategia (o 'fusion') -> duración típica en s
+        self._preparar_matrices()
         self._preparar_tfidf()
 
+    def _preparar_matrices(self):
+        """Matrices dispersas del grafo para las búsquedas por lotes."""
+        self.indice = {palabra: i for i, palabra in enumerate(self.vocab)}
+        if not self.vocab:
+            self.adyacencia = None
+            self.transicion = None
+            self.nodos_colgantes = None
+            return
+
+        # Adyacencia ponderada (simétrica; los lazos quedan en la diagonal)
+        self.adyacencia = nx.to_scipy_sparse_array(
+            self.grafo, nodelist=self.vocab, weight='weight', dtype=float, format='csr')
+
+        # Matriz de transición por filas, igual que nx.pagerank
+        grados = np.asarray(self.adyacencia.sum(axis=1)).ravel()
+        inversos = np.zeros_like(grados)
+        inversos[grados != 0] = 1.0 / grados[grados != 0]
+        self.transicion = (sp.diags(inversos) @ self.adyacencia).T.tocsr()
+        self.nodos_colgantes = grados == 0
+
     def _preparar_tfidf(self):
-        """Preparar vectorizador TF-IDF para búsquedas."""
+        """
+        Vectorizador TF-IDF sobre los contextos (vecinos) de cada palabra.
+        Los contextos son las filas de la adyacencia, así que la matriz se arma
+        desde ella (_tfidf_desde_adyacencia) sin unir ni volver a tokenizar
+        textos; si el builder trae contextos distintos de los vecinos
+        (diccionarios viejos) se usa el vectorizador sobre los textos.
+        """
         # 1. Validación de seguridad: Si no hay palabras, salir sin error.
         if not self.vocab:
             self.tfidf = None
             self.tfidf_matrix = None
             return
 
-        # Crear documentos falsos basados en los contextos (vecinos)
-        documentos = []
-        for palabra in self.vocab:
-            contexto = list(self.builder.word_contexts.get(palabra, [palabra]))
-            # Si el contexto está vacío, usamos la palabra misma para que no sea string vacío
-            texto = " ".join(contexto) if contexto else palabra
-            documentos.append(texto)
-
         try:
             # 2. SOLUCIÓN CLAVE: Cambiamos max_df a 1.0 (100%)
             # Esto evita que elimine palabras incluso si aparecen en todos lados.
@@ -339,47 +1082,232 @@ class ReverseDict:
                 min_df=1, 
                 max_df=1.0  # <--- CAMBIO IMPORTANTE: Antes era 0.9
             )
-            self.tfidf_matrix = self.tfidf.fit_transform(documentos)
+            if self._contextos_son_vecinos():
+                self.tfidf_matrix = self._tfidf_desde_adyacencia()
+            else:
+                self.tfidf_matrix = self.tfidf.fit_transform(self._documentos_contexto())
             
         except ValueError:
             # Si aún así falla (ej. palabras de 1 letra que scikit borra), no rompemos la app
             print("Advertencia: No se pudo generar matriz TF-IDF (vocabulario insuficiente).")
             self.tfidf = None
             self.tfidf_matrix = None
-    def buscar_multiple_estrategias(self, definicion, top_k=15):
-        """Búsqueda combinando múltiples estrategias."""
+
+    def _documentos_contexto(self):
+        """Un texto por palabra: sus contextos unidos por espacios (o la palabra si no tiene)."""
+        documentos = []
+        for palabra in self.vocab:
+            contexto = list(self.builder.word_contexts.get(palabra, [palabra]))
+            # Si el contexto está vacío, usamos la palabra misma para que no sea string vacío
+            texto = " ".join(contexto) if contexto else palabra
+            documentos.append(texto)
+        return documentos
+
+    def _contextos_son_vecinos(self):
+        """True si cada palabra tiene tantos contextos como vecinos (word_contexts = vecinos)."""
+        grados = np.diff(self.adyacencia.indptr)
+        contextos = self.builder.word_contexts
+        return all(len(contextos.get(palabra, ())) == grado
+                   for palabra, grado in zip(self.vocab, grados.tolist()))
+
+    def _tfidf_desde_adyacencia(self):
+        """
+        Lo mismo que self.tfidf.fit_transform(self._documentos_contexto()),
+        desde la adyacencia: conteos = documentos x términos de cada palabra,
+        con la misma selección de max_features que CountVectorizer (términos
+        en orden alfabético, los de mayor frecuencia total con el mismo
+        argsort), y el IDF y la normalización de TfidfTransformer. Deja
+        self.tfidf ajustado (vocabulary_, idf_), así las consultas se
+        proyectan con el mismo mapa de términos.
+        """
+        vectorizador = self.tfidf
+        analizar = vectorizador.build_analyzer()
+        n = len(self.vocab)
+
+        # Términos (tokens del analizador) del nombre de cada palabra
+        terminos_palabra = [analizar(palabra) for palabra in self.vocab]
+        terminos = sorted({t for ts in terminos_palabra for t in ts})
+        columna = {t: j for j, t in enumerate(terminos)}
+        filas = np.repeat(np.arange(n), [len(ts) for ts in terminos_palabra])
+        columnas = np.array([columna[t] for ts in terminos_palabra for t in ts], dtype=np.int64)
+        terminos_por_palabra = sp.csr_matrix(
+            (np.ones(len(columnas), dtype=np.intc), (filas, columnas)), shape=(n, len(terminos)))
+
+        # Documento de cada palabra: sus vecinos (fila binaria de la
+        # adyacencia) o, sin vecinos, la palabra misma
+        A = self.adyacencia
+        documentos = sp.csr_matrix(
+            (np.ones(A.nnz, dtype=np.intc), A.indices, A.indptr), shape=A.shape)
+        documentos = documentos + sp.diags((np.diff(A.indptr) == 0).astype(np.intc), format='csr', dtype=np.intc)
+        conteos = (documentos @ terminos_por_palabra).tocsr().astype(np.intc)
+
+        # Sólo los términos que aparecen en algún documento, como en CountVectorizer
+        tfs = np.asarray(conteos.sum(axis=0)).ravel()
+        if not tfs.any():
+            raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+        conservar = np.flatnonzero(tfs)
+        limite = vectorizador.max_features
+        if limite is not None and len(conservar) > limite:
+            # El mismo argsort (sin orden estable) que CountVectorizer._limit_features
+            elegidos = np.zeros(len(conservar), dtype=bool)
+            elegidos[(-tfs[conservar]).argsort()[:limite]] = True
+            conservar = conservar[elegidos]
+        conteos = conteos[:, conservar]
+        conteos.eliminate_zeros()
+        conteos.sort_indices()
+
+        transformador = TfidfTransformer(
+            norm=vectorizador.norm, use_idf=vectorizador.use_idf,
+            smooth_idf=vectorizador.smooth_idf, sublinear_tf=vectorizador.sublinear_tf)
+        matriz = transformador.fit(conteos).transform(conteos, copy=False)
+        vectorizador.vocabulary_ = {terminos[j]: i for i, j in enumerate(conservar.tolist())}
+        vectorizador.idf_ = transformador.idf_
+        return matriz
+
+    @perfilado.perfilable("buscar")
+    def buscar_multiple_estrategias(self, definicion, top_k=15, plazo=None):
+        """
+        Búsqueda combinando múltiples estrategias.
+        Si se da un Plazo, se verifica entre etapas y la búsqueda se cancela
+        con PlazoVencido en cuanto deja de tener sentido continuar.
+        """
         # Procesar definición
-        definicion_limpia = self.processor.limpiar_texto_avanzado(definicion)
-        tokens_def = self.processor.lematizar_con_spacy(definicion_limpia) if nlp else \
-            self.processor.lematizar_freeling_mejorado(definicion_limpia)
+        definicion_limpia, lemas = self.processor.procesar_consulta(definicion)
+        return self.buscar_desde_lemas(definicion_limpia, lemas, top_k=top_k, plazo=plazo)
 
-        lemas_def = [t['lema']
-                     for t in tokens_def if t['lema'] in self.grafo.nodes()]
+    @perfilado.perfilable("buscar")
+    def buscar_desde_lemas(self, definicion_limpia, lemas, top_k=15, plazo=None, normalizar=False):
+        """
+        Parte de scoring de buscar_multiple_estrategias, para una definición ya
+        limpia y lematizada (ver TextProcessor.procesar_consulta).
+        Con normalizar=True los scores son comparables entre diccionarios: se
+        dividen por el mejor score del grafo (la escala de PageRank depende de
+        su tamaño) y se multiplican por la fracción de lemas de la definición
+        que el grafo conoce, así un diccionario que sólo reconoce una palabra
+        de la consulta no compite de igual a igual con uno que las reconoce todas.
+        """
+        plazo = plazo or Plazo()
+        lemas_def = [lema for lema in lemas if lema in self.grafo.nodes()]
 
         if not lemas_def:
             print(" No se encontraron palabras de la definición en el corpus.")
             return []
 
-        # Estrategia 1: PageRank personalizado
-        scores_pr = self._pagerank_personalizado(lemas_def)
+        scores = self.scores_estrategias(definicion_limpia, lemas_def, plazo=plazo)
+        plazo.verificar()
+        resultados = self._fusionar_cronometrado(scores, lemas_def, top_k)
+        if normalizar:
+            resultados = self._normalizar(resultados, lemas_def, lemas)
+        return resultados
+
+    @perfilado.perfilable("buscar")
+    def buscar_progresivo(self, definicion_limpia, lemas, top_k=15, plazo=None,
+                          presupuesto=None, normalizar=False, parcial=None):
+        """
+        Búsqueda "anytime" con presupuesto de tiempo: corre las estrategias de
+        la más barata a la más cara (según lo que tardaron en búsquedas
+        anteriores; ORDEN_PROGRESIVO si todavía no se midieron) y agrega cada
+        una sólo si ella y la fusión caben en lo que queda del presupuesto.
+        Con la caché de PageRank, PageRank suele ser la más barata y la
+        propagación la más cara. La primera que da scores corre siempre,
+        así que siempre hay un resultado; al vencer el presupuesto se fusiona
+        lo que haya. plazo es el corte duro: si vence cuando ya hay scores (una
+        estrategia se pasó de lo previsto) se fusionan esos; sólo sin ninguno
+        se lanza PlazoVencido. Sin presupuesto se usa el mismo plazo.
+        parcial (BusquedaParcial) recibe los scores a medida que se calculan.
+        Devuelve (resultados, estrategias que contribuyeron).
+        """
+        plazo = plazo or Plazo()
+        presupuesto = presupuesto or plazo
+        parcial = parcial or BusquedaParcial()
+        lemas_def = [lema for lema in lemas if lema in self.grafo.nodes()]
+
+        if not lemas_def:
+            print(" No se encontraron palabras de la definición en el corpus.")
+            return [], []
+
+        parcial.lemas_def = lemas_def
+        scores = parcial.scores
+        orden = sorted(self.ORDEN_PROGRESIVO, key=lambda e: self.duraciones.get(e, 0.0))
+        for estrategia in orden:
+            if scores and plazo.vencido():
+                break
+            plazo.verificar()
+            restante = presupuesto.restante()
+            costo = self.duraciones.get(estrategia, 0.0) + self.duraciones.get('fusion', 0.0)
+            if scores and restante is not None and restante <= costo:
+                continue
+            resultado = self._scores_estrategia(estrategia, definicion_limpia, lemas_def)
+            if resultado:
+                scores[estrategia] = resultado
+
+        if not scores:
+            plazo.verificar()
+        resultados = self._fusionar_cronometrado(scores, lemas_def, top_k)
+        if normalizar:
+            resultados = self._normalizar(resultados, lemas_def, lemas)
+        return resultados, list(scores)
+
+    def _normalizar(self, resultados, lemas_def, lemas):
+        """Scores sobre el mejor score, por la cobertura de la definición (ver buscar_desde_lemas)."""
+        if not resultados or resultados[0][1] <= 0:
+            return resultados
+        cobertura = len(set(lemas_def)) / len(set(lemas))
+        maximo = resultados[0][1]
+        return [(palabra, score / maximo * cobertura) for palabra, score in resultados]
+
+    def scores_estrategias(self, definicion_limpia, lemas_def, plazo=None):
+        """
+        Scores {palabra: score} de cada estrategia, para lemas ya filtrados al grafo.
+        Devuelve {'pagerank': ..., 'tfidf': ..., 'propagacion': ..., 'betweenness': ...}.
+        """
+        plazo = plazo or Plazo()
+        scores = {}
+
+        # PageRank personalizado, similitud TF-IDF, propagación de activación
+        # y centralidad de intermediación local
+        for estrategia in ('pagerank', 'tfidf', 'propagacion', 'betweenness'):
+            plazo.verificar()
+            scores[estrategia] = self._scores_estrategia(estrategia, definicion_limpia, lemas_def)
 
-        # Estrategia 2: Similitud TF-IDF
-        scores_tfidf = self._similitud_tfidf(definicion_limpia)
+        return scores
 
-        # Estrategia 3: Propagación de activación
-        scores_prop = self._propagacion_activacion(lemas_def)
+    def _scores_estrategia(self, estrategia, definicion_limpia, lemas_def):
+        """Scores de una estrategia; registra cuánto tardó (ver buscar_progresivo)."""
+        inicio = time.perf_counter()
+        if estrategia == 'pagerank':
+            scores = self._pagerank_personalizado(lemas_def)
+        elif estrategia == 'tfidf':
+            scores = self._similitud_tfidf(definicion_limpia)
+        elif estrategia == 'propagacion':
+            scores = self._propagacion_activacion(lemas_def)
+        else:
+            scores = self._betweenness_local(lemas_def)
+        self._registrar_duracion(estrategia, time.perf_counter() - inicio)
+        return scores
 
-        # Estrategia 4: Centralidad de intermediación local
-        scores_bet = self._betweenness_local(lemas_def)
+    def _fusionar_cronometrado(self, scores, lemas_def, top_k):
+        inicio = time.perf_counter()
+        resultados = self.fusionar(scores, lemas_def, top_k=top_k)
+        self._registrar_duracion('fusion', time.perf_counter() - inicio)
+        return resultados
+
+    def _registrar_duracion(self, etapa, duracion):
+        """Media móvil de la duración de cada etapa (la misma suavización que PoolBusqueda)."""
+        anterior = self.duraciones.get(etapa)
+        self.duraciones[etapa] = duracion if anterior is None else 0.8 * anterior + 0.2 * duracion
+
+    @metricas.cronometrado("fusion")
+    def fusionar(self, scores, lemas_def, top_k=15):
+        """Combina los scores de las estrategias con PESOS y devuelve el top-k."""
+        scores_pr = scores.get('pagerank', {})
+        scores_tfidf = scores.get('tfidf', {})
+        scores_prop = scores.get('propagacion', {})
+        scores_bet = scores.get('betweenness', {})
 
         # Combinar scores con pesos
         scores_combinados = defaultdict(float)
-        pesos = {
-            'pagerank': 0.35,
-            'tfidf': 0.30,
-            'propagacion': 0.25,
-            'betweenness': 0.10
-        }
+        pesos = self.PESOS
 
         for palabra in self.vocab:
             if palabra not in lemas_def:  # No incluir palabras de la definición
@@ -395,8 +1323,243 @@ class ReverseDict:
                             key=lambda x: x[1], reverse=True)
         return [(palabra, score) for palabra, score in resultados[:top_k]]
 
+    @perfilado.perfilable("buscar_batch")
+    def buscar_batch(self, definiciones, top_k=15, plazo=None):
+        """
+        Búsqueda por lotes: lematiza todas las definiciones con una sola
+        llamada, arma una matriz de semillas (nodos x definiciones) y ejecuta
+        PageRank, propagación y TF-IDF como operaciones matriciales por bloque.
+        Devuelve una lista de resultados por definición, en el mismo orden.
+        """
+        if not definiciones or not self.vocab:
+            return [[] for _ in definiciones]
+
+        definiciones_limpias = [
+            self.processor.limpiar_texto_avanzado(d) for d in definiciones]
+        tokens_lote = self.processor.lematizar_lote(definiciones_limpias)
+        return self.buscar_batch_desde_lemas(
+            definiciones_limpias, [[t['lema'] for t in tokens] for tokens in tokens_lote],
+            top_k=top_k, plazo=plazo)
+
+    def buscar_batch_desde_lemas(self, definiciones_limpias, lemas_lote, top_k=15, plazo=None):
+        """
+        Parte de scoring de buscar_batch, para definiciones ya limpias y
+        lematizadas (lemas_lote: la lista de lemas de cada una). Sirve para
+        lematizar una sola vez y buscar en varios diccionarios.
+        """
+        plazo = plazo or Plazo()
+        resultados = [[] for _ in definiciones_limpias]
+        if not definiciones_limpias or not self.vocab:
+            return resultados
+
+        lemas_lote = [[lema for lema in lemas if lema in self.indice]
+                      for lemas in lemas_lote]
+        activas = [i for i, lemas in enumerate(lemas_lote) if lemas]
+        if not activas:
+            return resultados
+
+        lemas_activos = [lemas_lote[i] for i in activas]
+        semillas = self._matriz_semillas(lemas_activos)
+
+        # Cada matriz de scores es (definiciones x nodos)
+        plazo.verificar()
+        scores_pr = self._pagerank_bloque(semillas)
+        plazo.verificar()
+        scores_tfidf = self._tfidf_bloque(
+            [definiciones_limpias[i] for i in activas])
+        plazo.verificar()
+        scores_prop = self._propagacion_bloque(semillas)
+        plazo.verificar()
+        scores_bet = self._betweenness_bloque(lemas_activos)
+        plazo.verificar()
+
+        with metricas.medir("fusion"):
+            # Fusión: una pasada de arreglo por estrategia
+            combinados = scores_pr * self.PESOS['pagerank']
+            combinados += scores_tfidf * self.PESOS['tfidf']
+            combinados += scores_prop * self.PESOS['propagacion']
+            combinados += scores_bet * self.PESOS['betweenness']
+
+            # No incluir palabras de la definición
+            combinados[semillas.T.toarray() > 0] = -np.inf
+
+            # Orden estable para desempatar igual que sorted()
+            top_k = min(top_k, len(self.vocab))
+            orden = np.argsort(-combinados, axis=1, kind='stable')[:, :top_k]
+            for fila, i in enumerate(activas):
+                resultados[i] = [
+                    (self.vocab[j], float(combinados[fila, j]))
+                    for j in orden[fila] if np.isfinite(combinados[fila, j])
+                ]
+        return resultados
+
+    def calentar(self, consultas=3, top_k=10):
+        """
+        Búsquedas de prueba con las palabras más frecuentes del diccionario,
+        antes de recibir tráfico: pasan por cada estrategia, por el camino por
+        lotes y por la lematización, así se compilan los kernels de numba, se
+        tocan las matrices y la caché de PageRank, y buscar_progresivo ya tiene
+        la duración de cada estrategia en este grafo. Devuelve cuántas
+        consultas se hicieron.
+        """
+        frecuentes = [lema for lema, _ in self.builder.vocab_freq.most_common(3 * consultas)
+                      if lema in self.indice]
+        definiciones = [" ".join(frecuentes[i::consultas]) for i in range(consultas)]
+        definiciones = [d for d in definiciones if d]
+        for definicion in definiciones:
+            self.buscar_multiple_estrategias(definicion, top_k=top_k)
+        self.buscar_batch(definiciones, top_k=top_k)
+        return len(definiciones)
+
+    def _matriz_semillas(self, lemas_lote):
+        """Matriz binaria dispersa (nodos x definiciones) con los lemas de cada definición."""
+        filas, columnas = [], []
+        for col, lemas in enumerate(lemas_lote):
+            for idx in {self.indice[lema] for lema in lemas}:
+                filas.append(idx)
+                columnas.append(col)
+        datos = np.ones(len(filas))
+        return sp.csc_matrix((datos, (filas, columnas)),
+                             shape=(len(self.vocab), len(lemas_lote)))
+
+    def _pagerank_iterar(self, p, alpha=0.85, max_iter=200, tol=1.0e-6):
+        """
+        Iteración de potencias de PageRank para cada columna de p (ya
+        normalizada), igual que nx.pagerank. Devuelve (x, convergido por columna).
+        """
+        n = len(self.vocab)
+        x = np.full_like(p, 1.0 / n)
+
+        convergido = np.zeros(p.shape[1], dtype=bool)
+        for _ in range(max_iter):
+            x_prev = x
+            colgante = x[self.nodos_colgantes].sum(axis=0, keepdims=True)
+            x = alpha * (self.transicion @ x + colgante * p) + (1 - alpha) * p
+            convergido = np.abs(x - x_prev).sum(axis=0) < n * tol
+            if convergido.all():
+                break
+        return x, convergido
+
+    @metricas.cronometrado("pagerank")
+    def _pagerank_bloque(self, semillas, alpha=0.85, max_iter=200, tol=1.0e-6):
+        """PageRank personalizado para todas las columnas de semillas a la vez."""
+        if self.cache_ppr is not None:
+            return self._pagerank_bloque_compuesto(semillas, alpha, max_iter, tol)
+
+        p = semillas.toarray()
+        p /= p.sum(axis=0, keepdims=True)
+        x, convergido = self._pagerank_iterar(p, alpha, max_iter, tol)
+
+        if not convergido.all():
+            # Igual que la versión individual: si no converge, PageRank global
+            x[:, ~convergido] = self._pagerank_global(alpha, max_iter)[:, None]
+
+        return x.T
+
+    def _pagerank_global(self, alpha=0.85, max_iter=200):
+        global_pr = nx.pagerank(self.grafo, alpha=alpha, max_iter=max_iter, weight='weight')
+        return np.array([global_pr[palabra] for palabra in self.vocab])
+
+    def _pagerank_bloque_compuesto(self, semillas, alpha, max_iter, tol):
+        """
+        _pagerank_bloque con la caché por lema: cada columna combina los
+        vectores guardados y sólo los lemas que faltan se resuelven, todos
+        juntos en un bloque (una columna por definición).
+        """
+        semillas = sp.csc_matrix(semillas)
+        columnas = [semillas.indices[semillas.indptr[c]:semillas.indptr[c + 1]]
+                    for c in range(semillas.shape[1])]
+        compuestas = [self.cache_ppr.componer(idxs) for idxs in columnas]
+
+        con_faltantes = [c for c, (_, _, faltantes) in enumerate(compuestas) if faltantes]
+        if con_faltantes:
+            p = np.zeros((len(self.vocab), len(con_faltantes)))
+            for col, c in enumerate(con_faltantes):
+                p[compuestas[c][2], col] = 1.0 / len(compuestas[c][2])
+            x_faltantes, convergido = self._pagerank_iterar(p, alpha, max_iter, tol)
+
+        x = np.empty((len(columnas), len(self.vocab)))
+        global_pr = None
+        for c, (acumulado, peso, faltantes) in enumerate(compuestas):
+            if faltantes:
+                col = con_faltantes.index(c)
+                if not convergido[col]:
+                    if global_pr is None:
+                        global_pr = self._pagerank_global(alpha, max_iter)
+                    x[c] = global_pr
+                    continue
+                acumulado, peso = self._sumar_faltantes(
+                    acumulado, peso, faltantes, x_faltantes[:, col])
+            x[c] = acumulado / peso
+        return x
+
+    def _sumar_faltantes(self, acumulado, peso, faltantes, vector):
+        """
+        Suma a la composición el PageRank resuelto con semilla uniforme sobre
+        los lemas faltantes (equivale a len(faltantes) vectores de un lema).
+        Si era un solo lema, su vector queda en la caché para las siguientes consultas.
+        """
+        masa = self.cache_ppr.masa(vector, self.nodos_colgantes)
+        if len(faltantes) == 1:
+            self.cache_ppr.agregar(faltantes[0], vector, self.nodos_colgantes)
+        return acumulado + vector * (masa * len(faltantes)), peso + masa * len(faltantes)
+
+    def precalcular_ppr(self, lemas, top_m=500, bloque=256, max_lemas=None, tol=1.0e-8):
+        """
+        Calcula la caché de PageRank por lema (CachePPR) para los lemas dados,
+        resolviéndolos de a bloques de columnas, y la deja en self.cache_ppr.
+        Como es un cálculo previo, converge con una tolerancia más estricta
+        que la de las consultas.
+        """
+        cache = CachePPR(len(self.vocab), top_m=top_m, max_lemas=max_lemas)
+        idxs = [self.indice[lema] for lema in dict.fromkeys(lemas) if lema in self.indice]
+        for inicio in range(0, len(idxs), bloque):
+            parte = idxs[inicio:inicio + bloque]
+            p = np.zeros((len(self.vocab), len(parte)))
+            p[parte, np.arange(len(parte))] = 1.0
+            x, convergido = self._pagerank_iterar(p, tol=tol)
+            for col, idx in enumerate(parte):
+                if convergido[col]:
+                    cache.agregar(idx, x[:, col], self.nodos_colgantes)
+        self.cache_ppr = cache
+        return cache
+
+    @metricas.cronometrado("tfidf")
+    def _tfidf_bloque(self, definiciones):
+        """Similitud TF-IDF de varias definiciones contra todo el vocabulario."""
+        if self.tfidf is None:
+            return np.zeros((len(definiciones), len(self.vocab)))
+
+        def_vectores = self.tfidf.transform(definiciones)
+        return cosine_similarity(def_vectores, self.tfidf_matrix)
+
+    @metricas.cronometrado("propagation")
+    def _propagacion_bloque(self, semillas, iteraciones=3):
+        """Propagación de activación para todas las columnas de semillas a la vez."""
+        activacion = semillas.toarray()
+        for _ in range(iteraciones):
+            activacion = activacion * 0.5 + (self.adyacencia @ activacion) * 0.1
+
+        max_act = activacion.max(axis=0, keepdims=True)
+        max_act[max_act == 0] = 1
+        return (activacion / max_act).T
+
+    def _betweenness_bloque(self, lemas_lote):
+        """Intermediación local; depende del subgrafo de cada definición, así que se calcula por separado."""
+        scores = np.zeros((len(lemas_lote), len(self.vocab)))
+        for fila, lemas_def in enumerate(lemas_lote):
+            for palabra, score in self._betweenness_local(lemas_def).items():
+                scores[fila, self.indice[palabra]] = score
+        return scores
+
+    @metricas.cronometrado("pagerank")
     def _pagerank_personalizado(self, lemas_def):
         """PageRank con personalización basada en la definición."""
+        if self.cache_ppr is not None and self.vocab:
+            vector = self._pagerank_compuesto(lemas_def)
+            if vector is not None:
+                return {self.vocab[j]: vector[j] for j in np.flatnonzero(vector)}
+
         personalization = {node: 0 for node in self.grafo.nodes()}
         for lema in lemas_def:
             personalization[lema] = 1.0 / len(lemas_def)
@@ -410,6 +1573,23 @@ class ReverseDict:
 
         return scores
 
+    def _pagerank_compuesto(self, lemas_def):
+        """
+        Vector de PageRank de la definición armado con la caché por lema; los
+        lemas que no están se resuelven juntos. None si esa parte no converge.
+        """
+        idxs = list(dict.fromkeys(self.indice[lema] for lema in lemas_def))
+        acumulado, peso, faltantes = self.cache_ppr.componer(idxs)
+        if faltantes:
+            p = np.zeros((len(self.vocab), 1))
+            p[faltantes, 0] = 1.0 / len(faltantes)
+            x, convergido = self._pagerank_iterar(p)
+            if not convergido[0]:
+                return None
+            acumulado, peso = self._sumar_faltantes(acumulado, peso, faltantes, x[:, 0])
+        return acumulado / peso
+
+    @metricas.cronometrado("tfidf")
     def _similitud_tfidf(self, definicion):
         """Similitud basada en TF-IDF."""
         if self.tfidf is None:
@@ -425,29 +1605,26 @@ class ReverseDict:
 
         return scores
 
+    @metricas.cronometrado("propagation")
     def _propagacion_activacion(self, lemas_def, iteraciones=3):
         """Propagación de activación en el grafo."""
-        activacion = {node: 0 for node in self.grafo.nodes()}
+        if not self.vocab:
+            return {}
 
         # Activación inicial
-        for lema in lemas_def:
-            activacion[lema] = 1.0
+        activacion = np.zeros(len(self.vocab))
+        activacion[[self.indice[lema] for lema in lemas_def]] = 1.0
 
-        # Propagar activación
-        for _ in range(iteraciones):
-            nueva_activacion = {}
-            for node in self.grafo.nodes():
-                suma = activacion[node] * 0.5  # Factor de decay
-                for vecino in self.grafo.neighbors(node):
-                    peso = self.grafo[node][vecino]['weight']
-                    suma += activacion[vecino] * peso * 0.1
-                nueva_activacion[node] = suma
-            activacion = nueva_activacion
+        # Propagar activación: cada nodo conserva la mitad (decay) y recibe
+        # 0.1 * peso de la activación de cada vecino
+        A = self.adyacencia
+        activacion = kernels.propagar(A.indptr, A.indices, A.data, activacion, iteraciones)
 
         # Normalizar scores
-        max_act = max(activacion.values()) if activacion else 1
-        return {k: v/max_act for k, v in activacion.items()}
+        max_act = activacion.max()
+        return dict(zip(self.vocab, (activacion / max_act).tolist()))
 
+    @metricas.cronometrado("betweenness")
     def _betweenness_local(self, lemas_def, profundidad=2):
         """Centralidad de intermediación en subgrafo local."""
         # Obtener subgrafo local
@@ -460,7 +1637,8 @@ class ReverseDict:
         if len(nodos_subgrafo) < 3:
             return {}
 
-        subgrafo = self.grafo.subgraph(nodos_subgrafo)
+        # Copia: recorrer una vista filtrada del grafo completo es ~3x más lento
+        subgrafo = self.grafo.subgraph(nodos_subgrafo).copy()
 
         try:
             scores = nx.betweenness_centrality(subgrafo, weight='weight',
@@ -526,6 +1704,7 @@ class ReverseDict:
 def listar_corpus():
     """Lista los corpus disponibles desde la API usando GECO3Client."""
     # Si hay app token, usar corpus de la app; si no, usar corpus públicos
+    client = obtener_cliente()
     if client.is_app_logged():
         corpus_list = client.corpus_app()
     else:
@@ -545,7 +1724,7 @@ def elegir_corpus(corpus_list):
 
 def listar_documentos(corpus_id):
     """Lista documentos dentro de un corpus usando GECO3Client."""
-    documentos = client.docs_corpus(corpus_id)
+    documentos = obtener_cliente().docs_corpus(corpus_id)
     print("\nDocumentos disponibles:\n")
     for i, d in enumerate(documentos, 1):
         print(f"{i}. {d['archivo']} (ID: {d['id']})")
@@ -561,7 +1740,7 @@ def elegir_documentos(documentos):
 
 def descargar_documento(corpus_id, doc_id):
     """Descarga un documento específico por ID usando GECO3Client."""
-    return client.doc_content(corpus_id, doc_id)
+    return obtener_cliente().doc_content(corpus_id, doc_id)
 
 
 # =====================================
@@ -574,7 +1753,7 @@ def filtrar_documentos_por_metadatos(corpus_id):
     """
     try:
         # Obtener documentos con metadatos usando GECO3Client
-        docs = client.docs_tabla(corpus_id)
+        docs = obtener_cliente().docs_tabla(corpus_id)
     except Exception as e:
         print(f"Error al obtener metadatos del corpus: {e}")
         return []
@@ -652,7 +1831,7 @@ def filtrar_documentos_por_metadatos_api(corpus_id, meta_nombre, valor):
     """
     try:
         # Obtener documentos con metadatos usando GECO3Client
-        docs = client.docs_tabla(corpus_id)
+        docs = obtener_cliente().docs_tabla(corpus_id)
     except Exception as e:
         print(f"Error al obtener documentos: {e}")
         return []
@@ -682,7 +1861,7 @@ def filtrar_documentos_por_varios_metadatos_api(corpus_id, metas, valores):
     """
     try:
         # Obtener documentos con metadatos usando GECO3Client
-        docs = client.docs_tabla(corpus_id)
+        docs = obtener_cliente().docs_tabla(corpus_id)
     except Exception as e:
         print(f"Error al obtener documentos: {e}")
         return []
@@ -710,83 +1889,478 @@ def filtrar_documentos_por_varios_metadatos_api(corpus_id, metas, valores):
 # --------------------------------------------
 
 
+# Ventana y decaimiento de los diccionarios guardados antes de que el JSON los registrara
+VENTANA_ORIGINAL = 15
+DECAIMIENTO_ORIGINAL = "inversa"
+
+
+def datos_diccionario(nombre_diccionario, grafo, builder):
+    """Contenido del JSON de un diccionario (lo que escribe guardar_diccionario)."""
+    return {
+        "nombre": nombre_diccionario,
+        "nodes": list(grafo.nodes(data=True)),
+        "edges": list(grafo.edges(data=True)),
+        "word_contexts": {k: list(v) for k, v in builder.word_contexts.items()},
+        "vocab_freq": dict(builder.vocab_freq),
+        # Con qué se armó el grafo, para rearmarlo desde las coocurrencias
+        "ventana": builder.ventana or VENTANA_ORIGINAL,
+        "decaimiento": builder.decaimiento or DECAIMIENTO_ORIGINAL,
+        "poda": builder.poda
+    }
+
+
+# Vista previa: subgrafo de las palabras más frecuentes que muestra la interfaz
+VISTA_PREVIA_N = 500
+
+
+def _nodos_vista_previa(grafo, n):
+    """Las n palabras más frecuentes en el formato de nodo de la interfaz."""
+    elegidos = heapq.nlargest(n, grafo.nodes(data="frequency", default=0), key=lambda x: x[1])
+    return [
+        {
+            "id": nodo,
+            "frequency": int(freq),
+            "degree": int(grafo.nodes[nodo].get("degree", grafo.degree(nodo))),
+        }
+        for nodo, freq in elegidos
+    ]
+
+
+def _aristas_vista_previa(grafo, incluidos, peso_min):
+    """
+    Genera las aristas entre nodos incluidos con peso >= peso_min. Sólo
+    recorre las aristas de esos nodos y respeta el orden de grafo.edges().
+    """
+    vistos = set()
+    for u, vecinos in grafo.adjacency():
+        if u not in incluidos:
+            continue
+        for v, datos in vecinos.items():
+            if v in incluidos and v not in vistos:
+                peso = float(datos.get("weight", 1.0))
+                if peso >= peso_min:
+                    yield {"source": u, "target": v, "weight": peso}
+        vistos.add(u)
+
+
+def vista_previa(grafo, n=VISTA_PREVIA_N, peso_min=0.0):
+    """
+    Subgrafo inducido por las n palabras más frecuentes, con las aristas de
+    peso >= peso_min, en el formato {"nodes": [...], "edges": [...]} de la
+    interfaz.
+    """
+    nodes = _nodos_vista_previa(grafo, n)
+    edges = list(_aristas_vista_previa(grafo, {nodo["id"] for nodo in nodes}, peso_min))
+    return {"nodes": nodes, "edges": edges}
+
+
+def vista_previa_bloques(grafo, n=VISTA_PREVIA_N, peso_min=0.0, tamano=1000):
+    """
+    La misma vista previa por bloques de hasta tamano objetos, para enviarla
+    como NDJSON: primero los nodos ({"tipo": "nodo", ...}) y después las
+    aristas ({"tipo": "arista", ...}). Las aristas se generan a medida que se
+    envían, sin armar la lista completa.
+    """
+    nodes = _nodos_vista_previa(grafo, n)
+    incluidos = {nodo["id"] for nodo in nodes}
+    for inicio in range(0, len(nodes), tamano):
+        yield [{"tipo": "nodo", **nodo} for nodo in nodes[inicio:inicio + tamano]]
+    del nodes
+    bloque = []
+    for arista in _aristas_vista_previa(grafo, incluidos, peso_min):
+        bloque.append({"tipo": "arista", **arista})
+        if len(bloque) == tamano:
+            yield bloque
+            bloque = []
+    yield bloque
+
+
+def vista_previa_gzip(grafo, n=VISTA_PREVIA_N, peso_min=0.0):
+    """vista_previa serializada en JSON compacto y comprimida con gzip."""
+    datos = json.dumps(vista_previa(grafo, n, peso_min), ensure_ascii=False, separators=(",", ":"))
+    return gzip.compress(datos.encode("utf-8"), compresslevel=6)
+
+
+def _version_actual(nombre_diccionario):
+    entrada = catalogo.obtener(nombre_diccionario)
+    return entrada["version"] if entrada else None
+
+
+def ruta_artefacto(nombre_diccionario, extension, version=None):
+    """
+    Archivo <extension> (vista previa, coocurrencias, caché de PageRank)
+    registrado para esa versión del diccionario (por defecto la actual), o
+    None si no lo tiene.
+    """
+    if version is None:
+        version = _version_actual(nombre_diccionario)
+    archivo = catalogo.artefacto(nombre_diccionario, version, extension) if version else None
+    return os.path.join(GRAPH_DIR, archivo) if archivo else None
+
+
+def _guardar_artefacto(nombre_diccionario, version, extension, escribir):
+    """
+    Escribe el artefacto con escribir(ruta temporal) y lo registra para esa
+    versión (catalogo.agregar_artefacto). Devuelve su ruta, o None si la
+    versión ya no está en el catálogo.
+    """
+    temporal = _temporal(os.path.join(GRAPH_DIR, nombre_diccionario.replace(" ", "_") + extension))
+    escribir(temporal)
+    archivo = catalogo.agregar_artefacto(nombre_diccionario, version, extension, temporal)
+    return os.path.join(GRAPH_DIR, archivo) if archivo else None
+
+
+def ruta_vista_previa(nombre_diccionario, version=None):
+    """Archivo con la vista previa por defecto (VISTA_PREVIA_N nodos) ya comprimida, o None."""
+    return ruta_artefacto(nombre_diccionario, EXTENSION_VISTA_PREVIA, version)
+
+
+def _temporal(ruta):
+    """Archivo temporal junto a ruta, propio de este proceso e hilo (para os.replace)."""
+    return f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def _escribir_vista_previa(grafo, ruta):
+    with open(ruta, "wb") as f:
+        f.write(vista_previa_gzip(grafo))
+
+
+def guardar_vista_previa(nombre_diccionario, grafo, version):
+    """
+    Escribe la vista previa por defecto de esa versión del diccionario (el
+    grafo debe ser el suyo) y la registra. Sólo se guarda la de la versión
+    actual; devuelve la ruta o None si no se guardó.
+    """
+    if version != _version_actual(nombre_diccionario):
+        return None
+    return _guardar_artefacto(nombre_diccionario, version, EXTENSION_VISTA_PREVIA,
+                              lambda temporal: _escribir_vista_previa(grafo, temporal))
+
+
+def podar_segun_config(grafo, builder, poda=None):
+    """
+    Aplica GraphBuilder.podar_grafo con los criterios dados o, si no se dan,
+    con los de CONFIG["poda"]. Sin criterios devuelve el grafo intacto.
+    """
+    poda = CONFIG["poda"] if poda is None else poda
+    builder.poda = dict(poda)
+    if not poda:
+        return grafo
+    desconocidos = set(poda) - CRITERIOS_PODA
+    if desconocidos:
+        raise ValueError(f"Criterios de poda desconocidos: {sorted(desconocidos)}")
+    return builder.podar_grafo(grafo, **poda)
+
+
+@metricas.cronometrado("save")
 def guardar_diccionario(nombre_diccionario, grafo, builder):
     """
-    Guarda el grafo como diccionario nombrado en dos formatos:
-    - JSON: conserva toda la información (word_contexts, vocab_freq)
-    - GraphML: compatible con Gephi y herramientas externas
+    Guarda el grafo como diccionario nombrado:
+    - JSON: conserva toda la información (word_contexts, vocab_freq), en
+      un archivo por versión (<nombre>.v<N>.json, ver catalogo.registrar)
+    - Vista previa comprimida que muestra la interfaz y coocurrencias por
+      distancia, también por versión y registradas en la misma transacción
+    GraphML/GEXF (Gephi y herramientas externas) ya no se escriben aquí: se
+    generan bajo demanda con exportar_grafo.
     """
     base_name = nombre_diccionario.replace(" ", "_")
     archivo_json = f"{base_name}.json"
     archivo_graphml = f"{base_name}.graphml"
 
     ruta_json = os.path.join(GRAPH_DIR, archivo_json)
-    ruta_graphml = os.path.join(GRAPH_DIR, archivo_graphml)
 
-    # ----- Guardar en formato JSON -----
-    data = {
-        "nombre": nombre_diccionario,
-        "nodes": list(grafo.nodes(data=True)),
-        "edges": list(grafo.edges(data=True)),
-        "word_contexts": {k: list(v) for k, v in builder.word_contexts.items()},
-        "vocab_freq": dict(builder.vocab_freq)
-    }
+    # ----- Guardar en formato JSON (archivo temporal propio de este proceso/hilo) -----
+    data = datos_diccionario(nombre_diccionario, grafo, builder)
+
+    temporal = _temporal(ruta_json)
+    artefactos = {}
+    try:
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+        # ----- Vista previa para la interfaz -----
+        artefactos[EXTENSION_VISTA_PREVIA] = _temporal(os.path.join(GRAPH_DIR, base_name + EXTENSION_VISTA_PREVIA))
+        _escribir_vista_previa(grafo, artefactos[EXTENSION_VISTA_PREVIA])
+
+        # ----- Coocurrencias por distancia (otras ventanas sin reconstruir) -----
+        if builder.coocurrencias is not None:
+            artefactos[EXTENSION_COOCURRENCIAS] = _temporal(
+                os.path.join(GRAPH_DIR, base_name + EXTENSION_COOCURRENCIAS))
+            builder.coocurrencias.guardar(artefactos[EXTENSION_COOCURRENCIAS])
+
+        # ----- Registrar en el catálogo (mueve los archivos a los de la versión en la misma transacción) -----
+        version, archivo_json = catalogo.registrar(
+            nombre_diccionario, archivo_json, temporal=temporal, archivo_graphml=archivo_graphml,
+            nodos=grafo.number_of_nodes(), aristas=grafo.number_of_edges(), artefactos=artefactos)
+        builder.version = version
+    finally:
+        for ruta in [temporal, *artefactos.values()]:
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+    print(f"Diccionario '{nombre_diccionario}' guardado exitosamente (versión {version}) en:")
+    print(f"   • JSON: {os.path.join(GRAPH_DIR, archivo_json)}")
+
+
+# "auto": exacto siempre que las partes tengan su secuencia (puede volver a
+# contar el corpus unido); "conteos": sólo suma conteos (puede no ser exacto)
+METODOS_COMBINACION = ("auto", "conteos")
 
-    with open(ruta_json, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
 
-    # ----- Guardar en formato GraphML -----
+def _secuencia_valida(freq, coocurrencias):
+    """True si la parte tiene su secuencia y coincide con su vocab_freq."""
+    secuencia = coocurrencias.secuencia
+    if secuencia is None:
+        return False
+    conteos = np.bincount(secuencia, minlength=len(freq)) if len(secuencia) else np.zeros(len(freq))
+    return len(conteos) == len(freq) and conteos.tolist() == list(freq.values())
+
+
+def combinar_coocurrencias(partes, metodo="auto"):
+    """
+    Une los conteos de varios corpus como si se hubieran procesado sus
+    secuencias de tokens una detrás de otra. partes: [(vocab_freq,
+    Coocurrencias)] en ese orden.
+    - Se suman los conteos por distancia (concatenar): el costo depende del
+      vocabulario y de los pares, no del largo de los textos. Es exacto si
+      ningún lema cambia de lado del umbral de frecuencia al unirlos y
+      todas las partes tienen bordes.
+    - Si un lema cambia de lado (uno raro en un corpus puede entrar o salir
+      al sumar el otro), sacar o meter sus tokens cambia las distancias y
+      eso no se corrige desde los conteos. Con metodo="auto", si todas las
+      partes tienen su secuencia, se vuelve a contar sobre las secuencias
+      unidas, igual que construir_grafo_mejorado: exacto, pero cuesta lo
+      mismo que contar el corpus unido (crece con el largo de los textos).
+      Con metodo="conteos" siempre se suman los conteos, aunque no sea exacto.
+    Devuelve (vocab_freq, Coocurrencias, detalle) con detalle = {"metodo":
+    "conteos" o "secuencias", "exacto", "lemas_umbral", "sin_bordes"}.
+    """
+    if metodo not in METODOS_COMBINACION:
+        raise ValueError(f"Método de combinación desconocido: {metodo} (opciones: {METODOS_COMBINACION})")
+    vocab_freq = Counter()
+    for freq, _ in partes:
+        vocab_freq.update(freq)
+    lemas = list(vocab_freq)
+    conteos = np.array([vocab_freq[lema] for lema in lemas], dtype=np.int64)
+    validos = GraphBuilder.filtro_frecuencia(conteos)
+    validos_set = {lema for lema, valido in zip(lemas, validos.tolist()) if valido}
+
+    cambiados = set()
+    for freq, coocurrencias_parte in partes:
+        en_parte = set(coocurrencias_parte.lemas)
+        cambiados.update(lema for lema in freq if (lema in en_parte) != (lema in validos_set))
+    sin_bordes = any(c.cabeza is None for _, c in partes)
+    ventana_max = min(c.ventana_max for _, c in partes)
+
+    # Secuencia unida (índices en vocab_freq), si todas las partes la tienen
+    secuencia = None
+    if metodo == "auto" and all(_secuencia_valida(freq, c) for freq, c in partes):
+        indice = {lema: i for i, lema in enumerate(lemas)}
+        secuencia = np.concatenate([
+            np.array([indice[lema] for lema in freq], dtype=np.int32)[c.secuencia]
+            for freq, c in partes])
+
+    if (cambiados or sin_bordes) and secuencia is not None:
+        ids = secuencia.astype(np.int64)
+        coocurrencias = Coocurrencias.contar(ids[validos[ids]], lemas, ventana_max)
+        detalle = {"metodo": "secuencias", "exacto": True}
+    else:
+        coocurrencias, largo = None, 0
+        for freq, coocurrencias_parte in partes:
+            coocurrencias = coocurrencias_parte if coocurrencias is None else \
+                coocurrencias.concatenar(coocurrencias_parte, largo)
+            # Tokens de la secuencia filtrada de la parte: todas las apariciones de sus lemas
+            largo += sum(freq[lema] for lema in coocurrencias_parte.lemas)
+        detalle = {"metodo": "conteos", "exacto": not cambiados and not sin_bordes}
+    coocurrencias.secuencia = secuencia
+    detalle.update({"lemas_umbral": sorted(cambiados), "sin_bordes": sin_bordes})
+    return vocab_freq, coocurrencias, detalle
+
+
+def combinar_diccionarios(nombres, nombre_nuevo, poda=None, metodo="auto"):
+    """
+    Nuevo diccionario con los corpus de los diccionarios guardados, sin
+    descargar ni lematizar: une sus coocurrencias y sus vocab_freq
+    (combinar_coocurrencias con ese metodo), arma el grafo con la ventana y
+    el decaimiento de CONFIG, lo poda como /api/process (criterios dados o
+    los de CONFIG) y lo guarda con guardar_diccionario.
+    Con metodo="conteos" no se leen las secuencias guardadas; el resultado
+    tampoco tiene la suya, así que no se puede volver a combinar de forma exacta.
+    Lanza ValueError si un diccionario no existe o no tiene coocurrencias.
+    Devuelve (grafo, processor, builder, detalle de combinar_coocurrencias).
+    """
+    partes = []
+    for nombre in nombres:
+        entrada = catalogo.obtener(nombre)
+        ruta = os.path.join(GRAPH_DIR, entrada["archivo_json"]) if entrada else None
+        if not ruta or not os.path.exists(ruta):
+            raise ValueError(f"Diccionario '{nombre}' no encontrado")
+        # Las coocurrencias de la misma versión que el JSON
+        ruta_cooc = ruta_coocurrencias(nombre, entrada["version"])
+        if not ruta_cooc or not os.path.exists(ruta_cooc):
+            raise ValueError(f"El diccionario '{nombre}' no tiene coocurrencias guardadas; "
+                             f"hay que reconstruirlo para combinarlo")
+        with open(ruta, "r", encoding="utf-8") as f:
+            vocab_freq = Counter(json.load(f).get("vocab_freq", {}))
+        partes.append((vocab_freq, Coocurrencias.cargar(ruta_cooc, con_secuencia=metodo == "auto")))
+
+    vocab_freq, coocurrencias, detalle = combinar_coocurrencias(partes, metodo)
+    if not detalle["exacto"]:
+        print(f"Advertencia: la combinación no es exacta ({len(detalle['lemas_umbral'])} lemas "
+              f"cambian de lado del umbral de frecuencia, sin bordes: {detalle['sin_bordes']}) "
+              + ("con metodo='conteos'." if metodo == "conteos" else
+                 "y hay diccionarios guardados sin su secuencia; reconstruirlos la hace exacta."))
+
+    processor = TextProcessor()
+    builder = GraphBuilder(processor)
+    builder.vocab_freq = vocab_freq
+    builder.coocurrencias = coocurrencias
+    grafo = builder.grafo_desde_coocurrencias(CONFIG["ventana"], CONFIG["decaimiento"])
+    grafo = podar_segun_config(grafo, builder, poda)
+    guardar_diccionario(nombre_nuevo, grafo, builder)
+    return grafo, processor, builder, detalle
+
+
+# Formatos para exportar un diccionario a herramientas externas (Gephi, etc.)
+FORMATOS_EXPORTACION = {
+    "graphml": nx.write_graphml,
+    "gexf": nx.write_gexf,
+}
+
+
+def ruta_exportacion(nombre_diccionario, formato):
+    return os.path.join(GRAPH_DIR, f"{nombre_diccionario.replace(' ', '_')}.{formato}")
+
+
+def _ruta_json_diccionario(nombre_diccionario):
+    entrada = catalogo.obtener(nombre_diccionario)
+    return os.path.join(GRAPH_DIR, entrada["archivo_json"]) if entrada else None
+
+
+def exportacion_vigente(nombre_diccionario, formato):
+    """True si ya hay una exportación en ese formato más nueva que el JSON del diccionario."""
+    ruta = ruta_exportacion(nombre_diccionario, formato)
+    ruta_json = _ruta_json_diccionario(nombre_diccionario)
+    if not os.path.exists(ruta) or not ruta_json or not os.path.exists(ruta_json):
+        return False
+    return os.path.getmtime(ruta) >= os.path.getmtime(ruta_json)
+
+
+@metricas.cronometrado("export")
+def exportar_grafo(nombre_diccionario, formato="graphml", grafo=None):
+    """
+    Escribe el diccionario en formato graphml o gexf (si no hay ya una
+    exportación vigente) y devuelve la ruta del archivo, o None si el
+    diccionario no existe. Si no se da el grafo, se carga desde el JSON.
+    """
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(f"Formato de exportación desconocido: {formato}")
+    ruta = ruta_exportacion(nombre_diccionario, formato)
+    if exportacion_vigente(nombre_diccionario, formato):
+        return ruta
+
+    if grafo is None:
+        grafo, _, _ = cargar_diccionario(nombre_diccionario)
+        if grafo is None:
+            return None
+
+    temporal = _temporal(ruta)
+    FORMATOS_EXPORTACION[formato](grafo, temporal)
+    os.replace(temporal, ruta)
+    print(f"Diccionario '{nombre_diccionario}' exportado a {formato}: {ruta}")
+    return ruta
+
+
+def ruta_coocurrencias(nombre_diccionario, version=None):
+    return ruta_artefacto(nombre_diccionario, EXTENSION_COOCURRENCIAS, version)
+
+
+def ruta_cache_ppr(nombre_diccionario, version=None):
+    return ruta_artefacto(nombre_diccionario, EXTENSION_CACHE_PPR, version)
+
+
+def firma_grafo(grafo, vocab):
+    """Identifica una versión del grafo (vocabulario en orden, aristas y peso total)."""
+    peso_total = sum(d.get("weight", 1.0) for _, _, d in grafo.edges(data=True))
+    h = hashlib.sha1(f"{len(vocab)}|{grafo.number_of_edges()}|{peso_total:.6f}|".encode("utf-8"))
+    h.update("\n".join(map(str, vocab)).encode("utf-8"))
+    return h.hexdigest()
+
+
+def preparar_busqueda(nombre_diccionario, grafo, processor, builder):
+    """
+    ReverseDict del diccionario con su caché de PageRank por lema: la lee de
+    la de su versión (builder.version, <nombre>.v<N>.ppr.npz) si corresponde
+    a este grafo o, si no, precalcula los CONFIG["ppr_lemas"] lemas más
+    frecuentes. Sólo se guarda si esa versión es la actual. Con ppr_lemas = 0
+    no se usa caché.
+    """
+    rd = ReverseDict(grafo, processor, builder)
+    n_lemas = CONFIG["ppr_lemas"]
+    if n_lemas <= 0 or not rd.vocab:
+        return rd
+
+    version = builder.version
+    ruta = ruta_cache_ppr(nombre_diccionario, version) if version else None
+    firma = firma_grafo(grafo, rd.vocab)
+    # Los lemas que se resuelven en consultas se agregan hasta duplicar el tamaño inicial
+    max_lemas = 2 * n_lemas
     try:
-        nx.write_graphml(grafo, ruta_graphml)
-    except Exception as e:
-        print(f"No se pudo guardar en formato GraphML: {e}")
-
-    # ----- Actualizar índice global -----
-    index_path = os.path.join(GRAPH_DIR, "diccionarios_index.json")
-    index = []
-    if os.path.exists(index_path):
-        with open(index_path, "r", encoding="utf-8") as f:
-            index = json.load(f)
-
-    if not any(d["nombre"] == nombre_diccionario for d in index):
-        index.append({
-            "nombre": nombre_diccionario,
-            "archivo_json": archivo_json,
-            "archivo_graphml": archivo_graphml
-        })
-        with open(index_path, "w", encoding="utf-8") as f:
-            json.dump(index, f, ensure_ascii=False, indent=2)
-
-    print(f"Diccionario '{nombre_diccionario}' guardado exitosamente en:")
-    print(f"   • JSON: {ruta_json}")
-    print(f"   • GraphML: {ruta_graphml}")
-
-
-def cargar_diccionario(nombre_diccionario):
-    """Carga un diccionario guardado desde disco (formato JSON)."""
-    index_path = os.path.join(GRAPH_DIR, "diccionarios_index.json")
-    if not os.path.exists(index_path):
-        print("No hay diccionarios guardados aún.")
-        return None, None, None
+        rd.cache_ppr = CachePPR.cargar(ruta, firma=firma, max_lemas=max_lemas) if ruta else None
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Advertencia: caché de PageRank ilegible ({e}); se recalcula.")
+    if rd.cache_ppr is not None:
+        return rd
+
+    inicio = time.perf_counter()
+    lemas = [lema for lema, _ in builder.vocab_freq.most_common() if lema in rd.indice][:n_lemas]
+    cache = rd.precalcular_ppr(lemas, top_m=CONFIG["ppr_top_m"], max_lemas=max_lemas)
+    cache.firma = firma
+    if version is not None and version == _version_actual(nombre_diccionario):
+        try:
+            _guardar_artefacto(nombre_diccionario, version, EXTENSION_CACHE_PPR, cache.guardar)
+        except OSError as e:
+            print(f"Advertencia: no se pudo guardar la caché de PageRank: {e}")
+    print(f"Caché de PageRank de '{nombre_diccionario}': {len(cache.vectores)} lemas "
+          f"en {time.perf_counter() - inicio:.1f} s")
+    return rd
+
+
+def listar_diccionarios():
+    """Devuelve las entradas del catálogo de diccionarios guardados (lista vacía si no hay)."""
+    return catalogo.listar()
 
-    with open(index_path, "r", encoding="utf-8") as f:
-        index = json.load(f)
 
-    dic_entry = next(
-        (d for d in index if d["nombre"] == nombre_diccionario), None)
+@metricas.cronometrado("load")
+def cargar_diccionario(nombre_diccionario, ventana=None, decaimiento=None, version=None):
+    """
+    Carga un diccionario guardado desde disco (formato JSON).
+    Si la ventana o el decaimiento pedidos (por defecto CONFIG["ventana"] y
+    CONFIG["decaimiento"]) no son con los que se guardó, el grafo se arma
+    desde sus coocurrencias por distancia y se vuelve a podar con los mismos
+    criterios. Pedirlos explícitamente para un diccionario sin coocurrencias
+    guardadas (construido antes) lanza ValueError.
+    version: una versión anterior del historial (por defecto, la actual);
+    se usan las coocurrencias guardadas con esa versión.
+    builder.version queda con la versión cargada.
+    """
+    dic_entry = catalogo.obtener(nombre_diccionario)
     if not dic_entry:
         print(f"No se encontró el diccionario '{nombre_diccionario}'.")
         return None, None, None
 
-    # Nuevo formato: preferir archivo_json, mantener compatibilidad con versiones viejas
-    ruta = None
-    if "archivo_json" in dic_entry:
-        ruta = os.path.join(GRAPH_DIR, dic_entry["archivo_json"])
-    elif "archivo" in dic_entry:
-        ruta = os.path.join(GRAPH_DIR, dic_entry["archivo"])
-    else:
-        print(
-            f"El registro del diccionario '{nombre_diccionario}' no tiene archivo asociado.")
+    archivo = dic_entry["archivo_json"]
+    anterior = version is not None and version != dic_entry["version"]
+    version_cargada = version if anterior else dic_entry["version"]
+    if anterior:
+        archivo = catalogo.archivo_de_version(nombre_diccionario, version)
+        if archivo is None:
+            print(f"El diccionario '{nombre_diccionario}' no tiene la versión {version}.")
+            return None, None, None
+
+    ruta = os.path.join(GRAPH_DIR, archivo)
+    if not os.path.exists(ruta):
+        print(f"No se encontró el archivo '{ruta}' del diccionario '{nombre_diccionario}'.")
         return None, None, None
 
     with open(ruta, "r", encoding="utf-8") as f:
@@ -803,9 +2377,35 @@ def cargar_diccionario(nombre_diccionario):
     builder.word_contexts = {
         k: set(v) for k, v in data.get("word_contexts", {}).items()}
     builder.vocab_freq = Counter(data.get("vocab_freq", {}))
+    builder.ventana = data.get("ventana", VENTANA_ORIGINAL)
+    builder.decaimiento = data.get("decaimiento", DECAIMIENTO_ORIGINAL)
+    builder.poda = data.get("poda", {})
+    builder.version = version_cargada
+
+    if ventana is not None and ventana < 1:
+        raise ValueError(f"La ventana debe ser al menos 1 (se pidió {ventana})")
+    pedida = (ventana or CONFIG["ventana"], decaimiento or CONFIG["decaimiento"])
+    if pedida != (builder.ventana, builder.decaimiento):
+        ruta_cooc = ruta_coocurrencias(nombre_diccionario, version_cargada)
+        etiqueta = f"La versión {version} de '{nombre_diccionario}'" if anterior else \
+            f"El diccionario '{nombre_diccionario}'"
+        if ruta_cooc and os.path.exists(ruta_cooc):
+            builder.coocurrencias = Coocurrencias.cargar(ruta_cooc)
+            G = builder.grafo_desde_coocurrencias(*pedida)
+            if builder.poda:
+                G = podar_segun_config(G, builder, builder.poda)
+            print(f"Diccionario '{nombre_diccionario}': grafo con ventana {pedida[0]}, "
+                  f"decaimiento {pedida[1]} (guardado con {data.get('ventana', VENTANA_ORIGINAL)})")
+        elif ventana is not None or decaimiento:
+            raise ValueError(f"{etiqueta} no tiene coocurrencias guardadas; "
+                             f"hay que reconstruirlo para usar otra ventana o decaimiento")
+        else:
+            print(f"Advertencia: {etiqueta} no tiene coocurrencias guardadas; "
+                  f"se usa su ventana {builder.ventana} ({builder.decaimiento})")
 
     print(
-        f"Diccionario '{nombre_diccionario}' cargado correctamente desde JSON.")
+        f"Diccionario '{nombre_diccionario}' cargado correctamente desde JSON"
+        f"{f' (versión {version})' if anterior else ''}.")
     print(f"   Nodos: {len(G.nodes())}, Aristas: {len(G.edges())}")
 
     return G, processor, builder
@@ -813,30 +2413,31 @@ def cargar_diccionario(nombre_diccionario):
 
 def eliminar_diccionario(nombre_diccionario):
     """
-    Elimina los archivos asociados a un diccionario y lo saca del índice.
+    Elimina los archivos asociados a un diccionario y lo saca del catálogo.
     """
-    index_path = os.path.join(GRAPH_DIR, "diccionarios_index.json")
-    if not os.path.exists(index_path):
-        return False, "El índice de diccionarios no existe."
-
-    # 1. Leer el índice
-    with open(index_path, "r", encoding="utf-8") as f:
-        index = json.load(f)
-
-    # 2. Buscar la entrada
-    dic_entry = next((d for d in index if d["nombre"] == nombre_diccionario), None)
+    # 1. Sacarlo del catálogo (a partir de aquí ya no se puede cargar)
+    try:
+        dic_entry = catalogo.eliminar(nombre_diccionario)
+    except Exception as e:
+        return False, f"Error al actualizar el catálogo: {e}"
     if not dic_entry:
-        return False, f"El diccionario '{nombre_diccionario}' no se encontró en el índice."
-
-    # 3. Eliminar archivos físicos
-    archivos_a_borrar = []
-    if "archivo_json" in dic_entry:
-        archivos_a_borrar.append(os.path.join(GRAPH_DIR, dic_entry["archivo_json"]))
+        return False, f"El diccionario '{nombre_diccionario}' no se encontró en el catálogo."
+
+    # 2. Eliminar archivos físicos
+    archivos_a_borrar = [os.path.join(GRAPH_DIR, dic_entry["archivo_json"])]
+    for archivo in dic_entry.get("archivos_versiones", []):
+        ruta = os.path.join(GRAPH_DIR, archivo)
+        if ruta not in archivos_a_borrar:
+            archivos_a_borrar.append(ruta)
     if "archivo_graphml" in dic_entry:
         archivos_a_borrar.append(os.path.join(GRAPH_DIR, dic_entry["archivo_graphml"]))
-    # Compatibilidad con versiones viejas que usaban la clave "archivo"
-    if "archivo" in dic_entry:
-        archivos_a_borrar.append(os.path.join(GRAPH_DIR, dic_entry["archivo"]))
+    # Artefactos por nombre que hayan quedado de antes de que fueran por versión
+    for extension in EXTENSIONES_ARTEFACTOS:
+        archivos_a_borrar.append(os.path.join(GRAPH_DIR, nombre_diccionario.replace(" ", "_") + extension))
+    for formato in FORMATOS_EXPORTACION:
+        ruta = ruta_exportacion(nombre_diccionario, formato)
+        if ruta not in archivos_a_borrar:
+            archivos_a_borrar.append(ruta)
 
     errores = []
     for ruta in archivos_a_borrar:
@@ -846,16 +2447,8 @@ def eliminar_diccionario(nombre_diccionario):
         except Exception as e:
             errores.append(str(e))
 
-    # 4. Actualizar y guardar el índice sin el diccionario borrado
-    index = [d for d in index if d["nombre"] != nombre_diccionario]
-    try:
-        with open(index_path, "w", encoding="utf-8") as f:
-            json.dump(index, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        return False, f"Error al guardar el índice actualizado: {e}"
-
     if errores:
-        return True, f"Diccionario eliminado del índice, pero hubo errores con archivos: {', '.join(errores)}"
+        return True, f"Diccionario eliminado del catálogo, pero hubo errores con archivos: {', '.join(errores)}"
     
     return True, f"Diccionario '{nombre_diccionario}' eliminado correctamente."
 
@@ -865,24 +2458,53 @@ def eliminar_diccionario(nombre_diccionario):
 # ---------------------------
 
 
-def evaluar_sistema(diccionario_inverso, pruebas):
-    """Evaluar el sistema con casos de prueba."""
+def posicion_esperada(resultados_palabras, esperado):
+    """
+    Posición (1-based) de la primera palabra esperada en la lista de resultados,
+    o None si no aparece. 'esperado' puede ser una palabra o una lista de aceptables.
+    """
+    aceptables = {esperado} if isinstance(esperado, str) else set(esperado)
+    for i, palabra in enumerate(resultados_palabras, 1):
+        if palabra in aceptables:
+            return i
+    return None
+
+
+def evaluar_sistema(diccionario_inverso, pruebas, top_k=10, ks=(1, 5, 10)):
+    """
+    Evaluar el sistema con casos de prueba (definición, esperado).
+    Imprime CORRECTO/INCORRECTO (top 5) y devuelve MRR y recall@k.
+    """
     print("\n" + "="*50)
     print("EVALUACIÓN DEL SISTEMA")
     print("="*50)
 
+    posiciones = []
     for definicion, esperado in pruebas:
         print(f"\nDefinición: '{definicion}'")
         print(f"Esperado: {esperado}")
         resultados = diccionario_inverso.buscar_multiple_estrategias(
-            definicion, top_k=10)
-        resultados_palabras = [r[0] for r in resultados[:5]]
-        print(f"Obtenido: {resultados_palabras}")
-        if esperado in resultados_palabras:
+            definicion, top_k=top_k)
+        resultados_palabras = [r[0] for r in resultados]
+        print(f"Obtenido: {resultados_palabras[:5]}")
+        posicion = posicion_esperada(resultados_palabras, esperado)
+        posiciones.append(posicion)
+        if posicion is not None and posicion <= 5:
             print(" CORRECTO")
         else:
             print(" INCORRECTO")
 
+    return metricas_recuperacion(posiciones, ks)
+
+
+def metricas_recuperacion(posiciones, ks=(1, 5, 10)):
+    """MRR y recall@k a partir de las posiciones (None = no encontrada)."""
+    n = len(posiciones) or 1
+    resumen = {"mrr": sum(1.0 / p for p in posiciones if p) / n}
+    for k in ks:
+        resumen[f"recall@{k}"] = sum(1 for p in posiciones if p and p <= k) / n
+    return resumen
+
 
 # --------------------------------------------
 # PROCESAMIENTO PRINCIPAL
@@ -931,6 +2553,7 @@ if __name__ == "__main__":
 
     print("\nConstruyendo grafo...")
     grafo = builder.construir_grafo_mejorado(tokens_procesados)
+    grafo = podar_segun_config(grafo, builder)
     print(
         f"  Grafo creado con {len(grafo.nodes())} nodos y {len(grafo.edges())} aristas.")
 
@@ -939,27 +2562,24 @@ if __name__ == "__main__":
     guardar_diccionario(nombre_dic, grafo, builder)
 
     # Opcional: cargar un diccionario existente
-    index_path = os.path.join(GRAPH_DIR, "diccionarios_index.json")
-    if os.path.exists(index_path):
-        with open(index_path, "r", encoding="utf-8") as f:
-            index = json.load(f)
-        if index:
-            print("\nDiccionarios disponibles:")
-            for i, d in enumerate(index, 1):
-                print(f"{i}. {d['nombre']}")
-            opcion = input(
-                "\n¿Deseas cargar uno existente para prueba? (s/n): ").lower()
-            if opcion == "s":
-                idx = int(input("Elige el número del diccionario: ")) - 1
-                nombre_sel = index[idx]["nombre"]
-                grafo, processor, builder = cargar_diccionario(nombre_sel)
-                if grafo:
-                    print(
-                        f"Diccionario '{nombre_sel}' cargado correctamente.")
-                    print(
-                        f"   Nodos: {len(grafo.nodes())}, Aristas: {len(grafo.edges())}")
-                else:
-                    print("No se pudo cargar el diccionario.")
+    index = listar_diccionarios()
+    if index:
+        print("\nDiccionarios disponibles:")
+        for i, d in enumerate(index, 1):
+            print(f"{i}. {d['nombre']}")
+        opcion = input(
+            "\n¿Deseas cargar uno existente para prueba? (s/n): ").lower()
+        if opcion == "s":
+            idx = int(input("Elige el número del diccionario: ")) - 1
+            nombre_sel = index[idx]["nombre"]
+            grafo, processor, builder = cargar_diccionario(nombre_sel)
+            if grafo:
+                print(
+                    f"Diccionario '{nombre_sel}' cargado correctamente.")
+                print(
+                    f"   Nodos: {len(grafo.nodes())}, Aristas: {len(grafo.edges())}")
+            else:
+                print("No se pudo cargar el diccionario.")
 
     print("\n Proceso completado.")
 
@@ -0,0 +1,382 @@
+# ============================================
+# catalogo.py — catálogo de diccionarios guardados (SQLite)
+# - Reemplaza a diccionarios_index.json: búsqueda por nombre indexada en
+#   lugar de leer y recorrer el índice completo en cada operación
+# - Modo WAL: lectores concurrentes y escrituras serializadas entre hilos
+#   y procesos (workers de gunicorn, construcciones en paralelo)
+# - Historial de versiones por diccionario: cada versión en su propio
+#   archivo (<base>.v<N>.json), registrado en la misma transacción que la
+#   fila; se conservan los archivos de las últimas `conservar` versiones
+# - Los archivos que acompañan a cada versión (vista previa, coocurrencias,
+#   caché de PageRank) también son por versión (<base>.v<N><extensión>) y
+#   quedan registrados en su fila
+# - Al abrirse por primera vez importa el diccionarios_index.json existente
+# ============================================
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+ARCHIVO_CATALOGO = "catalogo.db"
+ARCHIVO_INDICE_JSON = "diccionarios_index.json"
+
+# Archivos que acompañan al JSON de una versión
+EXTENSION_VISTA_PREVIA = ".preview.json.gz"
+EXTENSION_COOCURRENCIAS = ".coocurrencias.npz"
+EXTENSION_CACHE_PPR = ".ppr.npz"
+EXTENSIONES_ARTEFACTOS = (EXTENSION_VISTA_PREVIA, EXTENSION_COOCURRENCIAS, EXTENSION_CACHE_PPR)
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS diccionarios (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre          TEXT NOT NULL UNIQUE,
+    archivo_json    TEXT NOT NULL,
+    archivo_graphml TEXT,
+    version         INTEGER NOT NULL DEFAULT 1,
+    creado          REAL NOT NULL,
+    actualizado     REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS versiones (
+    nombre       TEXT NOT NULL,
+    version      INTEGER NOT NULL,
+    archivo_json TEXT NOT NULL,
+    nodos        INTEGER,
+    aristas      INTEGER,
+    bytes        INTEGER,
+    fecha        REAL NOT NULL,
+    artefactos   TEXT NOT NULL DEFAULT '{}',
+    PRIMARY KEY (nombre, version)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+_COLUMNAS = "nombre, archivo_json, archivo_graphml, version, creado, actualizado"
+
+
+def _entrada(fila):
+    """Fila de diccionarios -> dict con las mismas claves que el índice JSON."""
+    if fila is None:
+        return None
+    nombre, archivo_json, archivo_graphml, version, creado, actualizado = fila
+    entrada = {"nombre": nombre, "archivo_json": archivo_json}
+    if archivo_graphml:
+        entrada["archivo_graphml"] = archivo_graphml
+    entrada["version"] = version
+    entrada["creado"] = _fecha(creado)
+    entrada["actualizado"] = _fecha(actualizado)
+    return entrada
+
+
+def archivo_version(archivo_json, version):
+    """<base>.json -> <base>.v<N>.json"""
+    base, extension = os.path.splitext(archivo_json)
+    return f"{base}.v{version}{extension}"
+
+
+def archivo_artefacto(archivo_json, extension):
+    """<base>.v<N>.json -> <base>.v<N><extension> (p. ej. .coocurrencias.npz)"""
+    return os.path.splitext(archivo_json)[0] + extension
+
+
+def _archivos_heredados(directorio, archivo_json):
+    """
+    Artefactos por nombre (<base><extension>) de antes de que fueran por
+    versión: pertenecen a la versión actual del diccionario.
+    """
+    base = re.sub(r"\.v\d+$", "", os.path.splitext(archivo_json)[0])
+    return {extension: base + extension for extension in EXTENSIONES_ARTEFACTOS
+            if os.path.exists(os.path.join(directorio, base + extension))}
+
+
+def _fecha(marca):
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(marca)) if marca else None
+
+
+class Catalogo:
+    """
+    Catálogo de diccionarios en <directorio>/catalogo.db.
+    Cada hilo (y cada proceso tras un fork) usa su propia conexión.
+    conservar: versiones por diccionario cuyos archivos se mantienen (las
+    anteriores siguen en el historial, sin archivo).
+    """
+
+    def __init__(self, directorio, archivo=ARCHIVO_CATALOGO, conservar=5):
+        self.directorio = directorio
+        self.ruta = os.path.join(directorio, archivo)
+        self.conservar = conservar
+        self._local = threading.local()
+        self._lock_migracion = threading.Lock()
+        self._migrado = False
+
+    # --------------------------------------------
+    # CONEXIÓN
+    # --------------------------------------------
+
+    def _conexion(self):
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None or self._local.pid != os.getpid():
+            os.makedirs(self.directorio, exist_ok=True)
+            # isolation_level=None: las transacciones se abren explícitamente
+            conexion = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            conexion.executescript(_ESQUEMA)
+            self._migrar_artefactos(conexion)
+            self._local.conexion = conexion
+            self._local.pid = os.getpid()
+        if not self._migrado:
+            self._migrar_indice_json(conexion)
+        return conexion
+
+    @contextmanager
+    def _transaccion(self):
+        """BEGIN IMMEDIATE: toma el lock de escritura al entrar (sin carreras lectura→escritura)."""
+        conexion = self._conexion()
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            yield conexion
+        except BaseException:
+            conexion.execute("ROLLBACK")
+            raise
+        conexion.execute("COMMIT")
+
+    def _migrar_artefactos(self, conexion):
+        """
+        Agrega la columna artefactos a un catálogo anterior y le asigna a la
+        versión actual de cada diccionario sus archivos por nombre.
+        """
+        columnas = lambda: {c[1] for c in conexion.execute("PRAGMA table_info(versiones)")}
+        if "artefactos" in columnas():
+            return
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            # Otro proceso pudo migrarlo mientras se esperaba el lock
+            if "artefactos" not in columnas():
+                conexion.execute("ALTER TABLE versiones ADD COLUMN artefactos TEXT NOT NULL DEFAULT '{}'")
+                for nombre, archivo_json, version in conexion.execute(
+                        "SELECT nombre, archivo_json, version FROM diccionarios").fetchall():
+                    conexion.execute(
+                        "UPDATE versiones SET artefactos = ? WHERE nombre = ? AND version = ?",
+                        (json.dumps(_archivos_heredados(self.directorio, archivo_json)), nombre, version))
+            conexion.execute("COMMIT")
+        except BaseException:
+            conexion.execute("ROLLBACK")
+            raise
+
+    def _migrar_indice_json(self, conexion):
+        """Importa diccionarios_index.json una sola vez (se marca en la tabla meta)."""
+        with self._lock_migracion:
+            if self._migrado:
+                return
+            conexion.execute("BEGIN IMMEDIATE")
+            try:
+                hecho = conexion.execute(
+                    "SELECT valor FROM meta WHERE clave = 'migracion_indice_json'").fetchone()
+                importados = 0
+                ruta_indice = os.path.join(self.directorio, ARCHIVO_INDICE_JSON)
+                if hecho is None and os.path.exists(ruta_indice):
+                    with open(ruta_indice, "r", encoding="utf-8") as f:
+                        indice = json.load(f)
+                    for d in indice:
+                        # Compatibilidad con versiones viejas que usaban la clave "archivo"
+                        archivo_json = d.get("archivo_json") or d.get("archivo")
+                        if not d.get("nombre") or not archivo_json:
+                            continue
+                        ruta_json = os.path.join(self.directorio, archivo_json)
+                        marca = os.path.getmtime(ruta_json) if os.path.exists(ruta_json) else time.time()
+                        cursor = conexion.execute(
+                            "INSERT OR IGNORE INTO diccionarios "
+                            "(nombre, archivo_json, archivo_graphml, version, creado, actualizado) "
+                            "VALUES (?, ?, ?, 1, ?, ?)",
+                            (d["nombre"], archivo_json, d.get("archivo_graphml"), marca, marca))
+                        if cursor.rowcount:
+                            conexion.execute(
+                                "INSERT OR IGNORE INTO versiones "
+                                "(nombre, version, archivo_json, bytes, fecha, artefactos) VALUES (?, 1, ?, ?, ?, ?)",
+                                (d["nombre"], archivo_json,
+                                 os.path.getsize(ruta_json) if os.path.exists(ruta_json) else None, marca,
+                                 json.dumps(_archivos_heredados(self.directorio, archivo_json))))
+                            importados += 1
+                if hecho is None:
+                    conexion.execute(
+                        "INSERT INTO meta (clave, valor) VALUES ('migracion_indice_json', ?)",
+                        (_fecha(time.time()),))
+                conexion.execute("COMMIT")
+            except BaseException:
+                conexion.execute("ROLLBACK")
+                raise
+            self._migrado = True
+        if importados:
+            print(f"Catálogo: {importados} diccionarios importados desde {ARCHIVO_INDICE_JSON}")
+
+    # --------------------------------------------
+    # CONSULTAS
+    # --------------------------------------------
+
+    def obtener(self, nombre):
+        """Entrada del diccionario (nombre, archivo_json, ...) o None si no existe."""
+        fila = self._conexion().execute(
+            f"SELECT {_COLUMNAS} FROM diccionarios WHERE nombre = ?", (nombre,)).fetchone()
+        return _entrada(fila)
+
+    def listar(self):
+        """Entradas de todos los diccionarios, en orden de registro."""
+        filas = self._conexion().execute(
+            f"SELECT {_COLUMNAS} FROM diccionarios ORDER BY id").fetchall()
+        return [_entrada(f) for f in filas]
+
+    def versiones(self, nombre):
+        """
+        Historial de versiones del diccionario, de la más nueva a la más vieja;
+        "disponible" indica si su archivo todavía existe (se puede cargar).
+        """
+        filas = self._conexion().execute(
+            "SELECT version, archivo_json, nodos, aristas, bytes, fecha FROM versiones "
+            "WHERE nombre = ? ORDER BY version DESC", (nombre,)).fetchall()
+        return [{"version": v, "archivo_json": a, "nodos": n, "aristas": e, "bytes": b, "fecha": _fecha(f),
+                 "disponible": os.path.exists(os.path.join(self.directorio, a))}
+                for v, a, n, e, b, f in filas]
+
+    def archivo_de_version(self, nombre, version):
+        """archivo_json de esa versión del diccionario o None si no está registrada."""
+        fila = self._conexion().execute(
+            "SELECT archivo_json FROM versiones WHERE nombre = ? AND version = ?",
+            (nombre, version)).fetchone()
+        return fila[0] if fila else None
+
+    def artefacto(self, nombre, version, extension):
+        """Archivo <extension> registrado para esa versión del diccionario o None."""
+        fila = self._conexion().execute(
+            "SELECT artefactos FROM versiones WHERE nombre = ? AND version = ?",
+            (nombre, version)).fetchone()
+        return json.loads(fila[0]).get(extension) if fila else None
+
+    # --------------------------------------------
+    # ESCRITURA
+    # --------------------------------------------
+
+    def registrar(self, nombre, archivo_json, temporal=None, archivo_graphml=None, nodos=None, aristas=None,
+                  artefactos=None):
+        """
+        Registra una versión nueva del diccionario y devuelve (versión, archivo).
+        Si se da temporal, se mueve a su propio archivo <base>.v<N>.json
+        (archivo_version) dentro de la transacción, sin tocar los de versiones
+        anteriores: si la transacción falla se borra y el catálogo sigue
+        apuntando a la versión anterior, con su archivo intacto. Sin temporal
+        se registra archivo_json tal cual.
+        artefactos: {extensión: temporal} que se mueven igual, a
+        <base>.v<N><extensión> (archivo_artefacto), y quedan en la fila.
+        """
+        ahora = time.time()
+        movidos = []
+        try:
+            with self._transaccion() as conexion:
+                fila = conexion.execute(
+                    "SELECT version FROM diccionarios WHERE nombre = ?", (nombre,)).fetchone()
+                version = fila[0] + 1 if fila else 1
+                archivo = archivo_version(archivo_json, version) if temporal is not None else archivo_json
+                ruta = os.path.join(self.directorio, archivo)
+                if temporal is not None:
+                    os.replace(temporal, ruta)
+                    movidos.append(ruta)
+                registrados = {}
+                for extension, temporal_artefacto in (artefactos or {}).items():
+                    registrados[extension] = archivo_artefacto(archivo, extension)
+                    os.replace(temporal_artefacto, os.path.join(self.directorio, registrados[extension]))
+                    movidos.append(os.path.join(self.directorio, registrados[extension]))
+                if fila:
+                    conexion.execute(
+                        "UPDATE diccionarios SET archivo_json = ?, archivo_graphml = ?, version = ?, "
+                        "actualizado = ? WHERE nombre = ?",
+                        (archivo, archivo_graphml, version, ahora, nombre))
+                else:
+                    conexion.execute(
+                        "INSERT INTO diccionarios "
+                        "(nombre, archivo_json, archivo_graphml, version, creado, actualizado) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (nombre, archivo, archivo_graphml, version, ahora, ahora))
+                conexion.execute(
+                    "INSERT OR REPLACE INTO versiones "
+                    "(nombre, version, archivo_json, nodos, aristas, bytes, fecha, artefactos) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (nombre, version, archivo, nodos, aristas,
+                     os.path.getsize(ruta) if os.path.exists(ruta) else None, ahora, json.dumps(registrados)))
+        except BaseException:
+            for movido in movidos:
+                if os.path.exists(movido):
+                    os.remove(movido)
+            raise
+        self._podar_versiones(nombre, version)
+        return version, archivo
+
+    def agregar_artefacto(self, nombre, version, extension, temporal):
+        """
+        Mueve temporal a <base>.v<N><extensión> de esa versión y lo registra en
+        su fila, en la misma transacción (cachés que se escriben después de
+        guardar la versión). Devuelve el archivo, o None (y borra temporal) si
+        la versión ya no está en el catálogo o su JSON ya se podó.
+        """
+        try:
+            with self._transaccion() as conexion:
+                fila = conexion.execute(
+                    "SELECT archivo_json, artefactos FROM versiones WHERE nombre = ? AND version = ?",
+                    (nombre, version)).fetchone()
+                if fila is None or not os.path.exists(os.path.join(self.directorio, fila[0])):
+                    return None
+                registrados = json.loads(fila[1])
+                registrados[extension] = registrados.get(extension) or archivo_artefacto(fila[0], extension)
+                os.replace(temporal, os.path.join(self.directorio, registrados[extension]))
+                conexion.execute(
+                    "UPDATE versiones SET artefactos = ? WHERE nombre = ? AND version = ?",
+                    (json.dumps(registrados), nombre, version))
+                return registrados[extension]
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+
+    def _archivos(self, conexion, condicion, parametros):
+        """JSON y artefactos de las filas de versiones que cumplen la condición."""
+        archivos = []
+        for archivo_json, artefactos in conexion.execute(
+                f"SELECT archivo_json, artefactos FROM versiones WHERE {condicion}", parametros).fetchall():
+            archivos.append(archivo_json)
+            archivos.extend(json.loads(artefactos).values())
+        return archivos
+
+    def _podar_versiones(self, nombre, version):
+        """Borra los archivos (JSON y artefactos) de las versiones anteriores a las últimas `conservar`."""
+        if not self.conservar:
+            return
+        conexion = self._conexion()
+        viejos = self._archivos(conexion, "nombre = ? AND version <= ?", (nombre, version - self.conservar))
+        vigentes = set(self._archivos(conexion, "nombre = ? AND version > ?", (nombre, version - self.conservar)))
+        for archivo in dict.fromkeys(viejos):
+            ruta = os.path.join(self.directorio, archivo)
+            if archivo not in vigentes and os.path.exists(ruta):
+                try:
+                    os.remove(ruta)
+                except OSError as e:
+                    print(f"Advertencia: no se pudo borrar la versión vieja '{ruta}': {e}")
+
+    def eliminar(self, nombre):
+        """
+        Quita el diccionario y su historial; devuelve la entrada borrada (con
+        "archivos_versiones": los archivos de todas sus versiones, JSON y
+        artefactos) o None.
+        """
+        with self._transaccion() as conexion:
+            entrada = _entrada(conexion.execute(
+                f"SELECT {_COLUMNAS} FROM diccionarios WHERE nombre = ?", (nombre,)).fetchone())
+            if entrada is not None:
+                entrada["archivos_versiones"] = list(dict.fromkeys(
+                    self._archivos(conexion, "nombre = ?", (nombre,))))
+                conexion.execute("DELETE FROM diccionarios WHERE nombre = ?", (nombre,))
+                conexion.execute("DELETE FROM versiones WHERE nombre = ?", (nombre,))
+        return entrada
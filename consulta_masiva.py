@@ -0,0 +1,221 @@
+# ============================================
+# consulta_masiva.py — búsquedas masivas sin servidor (definiciones -> JSONL)
+# - Lee definiciones de un .txt (una por línea) o .jsonl (un string o un
+#   objeto con "definicion" y, opcional, "id" por línea)
+# - Busca en uno o más diccionarios con ReverseDict.buscar_batch por lotes;
+#   cada lote se lematiza una sola vez para todos los diccionarios
+# - Pool de procesos: los diccionarios se cargan una vez en el proceso
+#   principal y los workers se crean con fork, así comparten (copy-on-write)
+#   las matrices y la caché de PageRank en vez de cargarlas cada uno
+# - Escribe una línea JSON por definición, en el orden de la entrada, a
+#   medida que terminan los lotes
+# - Reanudable: si la salida ya existe se descarta la última línea
+#   incompleta y se sigue desde la siguiente definición
+# No pide nada por teclado ni usa GECO.
+#
+#   python consulta_masiva.py definiciones.txt -d "Corpus Recetas" -o resultados.jsonl
+#   python consulta_masiva.py definiciones.jsonl -d A -d B -o salida.jsonl --procesos 4
+# ============================================
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+
+import c3
+
+# Diccionarios del proceso: {nombre: ReverseDict}. Con fork los heredan los workers
+_diccionarios = {}
+
+
+def cargar(nombres):
+    """Carga los diccionarios (con su caché de PageRank) en este proceso."""
+    for nombre in nombres:
+        if nombre in _diccionarios:
+            continue
+        grafo, processor, builder = c3.cargar_diccionario(nombre)
+        if grafo is None:
+            raise ValueError(f"Diccionario '{nombre}' no encontrado")
+        _diccionarios[nombre] = c3.preparar_busqueda(nombre, grafo, processor, builder)
+
+
+def leer_definiciones(ruta):
+    """Genera (id, definicion) de un .txt o .jsonl; se saltan las líneas vacías."""
+    jsonl = ruta.endswith(".jsonl")
+    with open(ruta, "r", encoding="utf-8") as f:
+        for numero, linea in enumerate(f, 1):
+            linea = linea.strip()
+            if not linea:
+                continue
+            if not jsonl:
+                yield None, linea
+                continue
+            try:
+                dato = json.loads(linea)
+            except ValueError:
+                raise ValueError(f"{ruta}:{numero}: JSON inválido")
+            if isinstance(dato, str):
+                yield None, dato
+            elif isinstance(dato, dict) and dato.get("definicion"):
+                yield dato.get("id"), dato["definicion"]
+            else:
+                raise ValueError(f"{ruta}:{numero}: falta 'definicion'")
+
+
+def preparar_salida(ruta):
+    """
+    Cuántas definiciones ya están en la salida. Descarta una última línea
+    incompleta (interrupción a mitad de escritura) y verifica que las
+    líneas estén numeradas en orden.
+    """
+    if not os.path.exists(ruta):
+        return 0
+    completas, fin, ultima = 0, 0, None
+    with open(ruta, "rb+") as f:
+        for linea in f:
+            if not linea.endswith(b"\n"):
+                break
+            completas, fin, ultima = completas + 1, fin + len(linea), linea
+        f.truncate(fin)
+    if ultima is not None and json.loads(ultima)["n"] != completas - 1:
+        raise ValueError(f"{ruta} no es una salida de consulta_masiva en orden; usa --desde-cero")
+    return completas
+
+
+def buscar_lote(lote, top_k):
+    """
+    Busca un lote [(n, id, definicion)] en todos los diccionarios.
+    Devuelve (líneas JSON, definiciones con error).
+    """
+    definiciones = [d for _, _, d in lote]
+    por_diccionario = {}
+    try:
+        processor = next(iter(_diccionarios.values())).processor
+        limpias = [processor.limpiar_texto_avanzado(d) for d in definiciones]
+        lemas_lote = [[t['lema'] for t in tokens] for tokens in processor.lematizar_lote(limpias)]
+        for nombre, rd in _diccionarios.items():
+            por_diccionario[nombre] = rd.buscar_batch_desde_lemas(limpias, lemas_lote, top_k=top_k)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+
+    lineas = []
+    for i, (n, id_def, definicion) in enumerate(lote):
+        fila = {"n": n, "id": id_def, "definicion": definicion}
+        if error:
+            fila["error"] = error
+        else:
+            fila["resultados"] = {
+                nombre: [{"palabra": p, "score": round(float(s), 4)} for p, s in resultados[i]]
+                for nombre, resultados in por_diccionario.items()
+            }
+        lineas.append(json.dumps(fila, ensure_ascii=False))
+    return lineas, len(lote) if error else 0
+
+
+def lotes(definiciones, inicio, tamano):
+    """Lotes de (n, id, definicion), desde la definición número inicio."""
+    numeradas = ((n, id_def, d) for n, (id_def, d) in enumerate(definiciones))
+    numeradas = itertools.islice(numeradas, inicio, None)
+    while True:
+        lote = list(itertools.islice(numeradas, tamano))
+        if not lote:
+            return
+        yield lote
+
+
+def _iniciar_worker(nombres):
+    # Ctrl-C lo atiende el proceso principal, que termina el pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    cargar(nombres)
+
+
+def _buscar_lote_worker(args):
+    return buscar_lote(*args)
+
+
+def ejecutar(entrada, nombres, salida, procesos=1, lote=64, top_k=10, desde_cero=False):
+    """Procesa toda la entrada; devuelve (definiciones nuevas, definiciones con error)."""
+    if desde_cero and os.path.exists(salida):
+        os.remove(salida)
+    hechas = preparar_salida(salida)
+    if hechas:
+        print(f"Reanudando: {hechas} definiciones ya estaban en {salida}")
+
+    cargar(nombres)
+    # A lo sumo 4 lotes por proceso entre la lectura y la escritura, así la
+    # entrada se lee a medida que se procesa y no entera en memoria
+    en_vuelo = threading.BoundedSemaphore(4 * max(1, procesos))
+    detener = threading.Event()
+
+    def tareas():
+        for l in lotes(leer_definiciones(entrada), hechas, lote):
+            # Con espera acotada: el pool no termina mientras este generador esté bloqueado
+            while not en_vuelo.acquire(timeout=0.5):
+                if detener.is_set():
+                    return
+            yield l, top_k
+
+    pool = None
+    if procesos > 1:
+        # fork: los workers heredan los diccionarios ya cargados
+        metodo = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+        contexto = multiprocessing.get_context(metodo)
+        pool = contexto.Pool(procesos, initializer=_iniciar_worker, initargs=(nombres,))
+        resultados = pool.imap(_buscar_lote_worker, tareas())
+    else:
+        resultados = (buscar_lote(*t) for t in tareas())
+
+    nuevas = errores = 0
+    inicio = ultimo_aviso = time.perf_counter()
+    try:
+        with open(salida, "a", encoding="utf-8") as f:
+            for lineas, con_error in resultados:
+                f.write("\n".join(lineas) + "\n")
+                f.flush()
+                en_vuelo.release()
+                nuevas += len(lineas)
+                errores += con_error
+                ahora = time.perf_counter()
+                if ahora - ultimo_aviso >= 10:
+                    ultimo_aviso = ahora
+                    print(f"  {hechas + nuevas} definiciones ({nuevas / (ahora - inicio):.1f}/s)", flush=True)
+    finally:
+        detener.set()
+        if pool is not None:
+            pool.terminate()
+    return nuevas, errores
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Búsquedas masivas de definiciones a JSONL")
+    parser.add_argument("entrada", help="Archivo .txt (una definición por línea) o .jsonl")
+    parser.add_argument("-d", "--diccionario", action="append", required=True,
+                        help="Diccionario donde buscar (se puede repetir)")
+    parser.add_argument("-o", "--salida", required=True, help="Archivo JSONL de resultados")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--lote", type=int, default=64, help="Definiciones por lote")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--desde-cero", action="store_true",
+                        help="Borrar la salida en vez de reanudarla")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    try:
+        nuevas, errores = ejecutar(args.entrada, args.diccionario, args.salida, args.procesos,
+                                   args.lote, args.top_k, args.desde_cero)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print(f"Interrumpido; el mismo comando reanuda desde donde quedó {args.salida}")
+        sys.exit(130)
+    segundos = time.perf_counter() - inicio
+    print(f"{nuevas} definiciones en {segundos:.1f} s "
+          f"({nuevas / segundos * 3600:.0f}/hora); {errores} con error -> {args.salida}")
+    sys.exit(1 if errores else 0)
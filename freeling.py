@@ -0,0 +1,149 @@
+# ============================================
+# freeling.py — cliente del servicio de lematización FreeLing
+# - Parte el texto en fragmentos (fin de oración o, si no hay, entre palabras)
+# - Una sesión HTTP con pool de conexiones reutilizada por todos los hilos
+# - Fragmentos en paralelo, con un máximo de requests simultáneos
+# - Caché LRU por hash del contenido de cada fragmento, acotada en palabras
+# - Si un fragmento falla se informa sólo ése (None); el resto se usa igual
+# ============================================
+
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metricas
+
+URL_DEFECTO = "http://www.corpus.unam.mx/servicio-freeling/analyze.php"
+FIN_ORACION = ".!?;\n"
+
+
+class ClienteFreeling:
+    """
+    analizar(texto) devuelve [(fragmento, palabras)], donde palabras es una
+    lista de (lema, forma, etiqueta) o None si el servicio falló para ese
+    fragmento.
+    """
+
+    def __init__(self, url=URL_DEFECTO, max_fragmento=100000, paralelo=4,
+                 timeout=30, max_cache=200000, reintentos=2):
+        self.url = url
+        self.max_fragmento = max(1, int(max_fragmento))
+        self.timeout = timeout
+        self.max_cache = max_cache
+
+        self.sesion = requests.Session()
+        # Reintenta conexiones fallidas y 502-504; no reenvía si ya se agotó la lectura
+        reintento = Retry(total=reintentos, read=0, backoff_factor=0.2,
+                          status_forcelist=(502, 503, 504), allowed_methods=None)
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=paralelo, max_retries=reintento)
+        self.sesion.mount("http://", adaptador)
+        self.sesion.mount("https://", adaptador)
+        self._pool = ThreadPoolExecutor(max_workers=paralelo, thread_name_prefix="freeling")
+
+        self._cache = OrderedDict()  # hash del fragmento -> palabras
+        self._palabras_en_cache = 0
+        self._lock = threading.Lock()
+
+    # --------------------------------------------
+    # FRAGMENTOS
+    # --------------------------------------------
+
+    def fragmentar(self, texto):
+        """
+        Parte el texto en fragmentos de hasta max_fragmento caracteres, cortando
+        después del último fin de oración de cada tramo o, si no hay (el texto
+        limpio no tiene puntuación), en el último espacio. Una palabra más
+        larga que el tramo se corta donde cae.
+        """
+        fragmentos = []
+        inicio, n = 0, len(texto)
+        while inicio < n:
+            fin = inicio + self.max_fragmento
+            if fin >= n:
+                corte = n
+            else:
+                corte = max(texto.rfind(c, inicio, fin) for c in FIN_ORACION) + 1
+                if corte <= inicio:
+                    corte = texto.rfind(" ", inicio, fin) + 1
+                if corte <= inicio:
+                    corte = fin
+            fragmento = texto[inicio:corte]
+            if fragmento.strip():
+                fragmentos.append(fragmento)
+            inicio = corte
+        return fragmentos
+
+    # --------------------------------------------
+    # ANÁLISIS
+    # --------------------------------------------
+
+    def analizar(self, texto):
+        return self.analizar_lote([texto])[0]
+
+    def analizar_lote(self, textos):
+        """analizar() para varios textos, con todos sus fragmentos en paralelo."""
+        fragmentos_por_texto = [self.fragmentar(t) for t in textos]
+        pendientes = {}
+        resultados = []
+        for fragmentos in fragmentos_por_texto:
+            salida = []
+            for fragmento in fragmentos:
+                clave = hashlib.sha1(fragmento.encode("utf-8")).hexdigest()
+                palabras = self._de_cache(clave)
+                metricas.registrar_cache("freeling", palabras is not None)
+                if palabras is None and clave not in pendientes:
+                    pendientes[clave] = self._pool.submit(self._pedir, fragmento)
+                salida.append((fragmento, clave, palabras))
+            resultados.append(salida)
+
+        resueltas = {clave: futuro.result() for clave, futuro in pendientes.items()}
+        for clave, palabras in resueltas.items():
+            if palabras is not None:
+                self._a_cache(clave, palabras)
+
+        return [[(fragmento, palabras if palabras is not None else resueltas.get(clave))
+                 for fragmento, clave, palabras in salida]
+                for salida in resultados]
+
+    def _pedir(self, fragmento):
+        """Manda un fragmento al servicio; devuelve [(lema, forma, etiqueta)] o None."""
+        archivo = io.BytesIO(fragmento.encode("utf-8"))
+        archivo.name = "texto.txt"
+        try:
+            r = self.sesion.post(self.url, files={"file": archivo},
+                                 params={"outf": "tagged", "format": "json"}, timeout=self.timeout)
+            r.raise_for_status()
+            data = r.json()
+            return [(w["lemma"], w["form"], w.get("tag")) for sent in data for w in sent]
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            print(f"Error en lematización ({len(fragmento)} caracteres): {e}")
+            return None
+
+    # --------------------------------------------
+    # CACHÉ
+    # --------------------------------------------
+
+    def _de_cache(self, clave):
+        with self._lock:
+            palabras = self._cache.get(clave)
+            if palabras is not None:
+                self._cache.move_to_end(clave)
+            return palabras
+
+    def _a_cache(self, clave, palabras):
+        if len(palabras) > self.max_cache:
+            return
+        with self._lock:
+            if clave in self._cache:
+                return
+            self._cache[clave] = palabras
+            self._palabras_en_cache += len(palabras)
+            while self._palabras_en_cache > self.max_cache:
+                _, viejas = self._cache.popitem(last=False)
+                self._palabras_en_cache -= len(viejas)
@@ -0,0 +1,49 @@
+# Configuración de gunicorn para el modo producción (ver servidor.py)
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:5001")
+workers = int(os.getenv("WORKERS", "2"))
+worker_class = "gthread"
+
+# Una vista async (/api/v1/async/*) ocupa su hilo hasta que termina su trabajo
+# en el pool de búsqueda: con menos hilos que POOL_HILOS + POOL_MAX_COLA la
+# cola del pool nunca se llena, no hay 503 y los requests esperan en el
+# backlog del socket. Los THREADS_LIBRES de más responden el 503 y atienden
+# los demás endpoints.
+_lugares_pool = int(os.getenv("POOL_HILOS", "4")) + int(os.getenv("POOL_MAX_COLA", "32"))
+threads = int(os.getenv("THREADS", str(_lugares_pool + int(os.getenv("THREADS_LIBRES", "4")))))
+if threads <= _lugares_pool:
+    print(f"Advertencia: THREADS={threads} no supera POOL_HILOS + POOL_MAX_COLA ({_lugares_pool}); "
+          f"/api/v1/async/* no llegará a responder 503 con la cola llena.")
+
+# Cargar la app (y los diccionarios) en el master antes del fork
+preload_app = True
+
+# Necesario para la recarga sin caída (servidor.py recargar)
+pidfile = os.getenv("PIDFILE", "data/gunicorn.pid")
+
+timeout = 120
+graceful_timeout = 30
+
+
+# --------------------------------------------
+# Avisos para servidor.py recargar
+# --------------------------------------------
+def pre_exec(server):
+    # Ya en el proceso que será el master nuevo (USR2), antes de precargar:
+    # su pid, para retirarlo si no llega a estar listo a tiempo
+    with open(server.cfg.pidfile + ".nuevo", "w") as f:
+        f.write(f"{os.getpid()}\n")
+
+
+def post_worker_init(worker):
+    # Una línea "<pid> <workers esperados>" por worker que ya atiende requests
+    with open(f"{worker.cfg.pidfile}.{worker.ppid}.workers", "a") as f:
+        f.write(f"{os.getpid()} {worker.cfg.workers}\n")
+
+
+def on_exit(server):
+    try:
+        os.remove(f"{server.cfg.pidfile}.{server.pid}.workers")
+    except OSError:
+        pass
@@ -0,0 +1,173 @@
+# ============================================
+# kernels.py — bucles calientes sobre arreglos de enteros
+# - Conteo de pares de coocurrencia a una distancia (Coocurrencias.contar)
+# - Propagación de activación sobre la adyacencia CSR (ReverseDict)
+# - Filas densas de la adyacencia (embeddings sin node2vec)
+# Cada kernel tiene una versión NumPy/SciPy y otra compilada con numba (si
+# está instalado; se compila la primera vez que se usa y queda en la caché
+# de numba). KERNELS=auto (por defecto) usa en cada kernel el backend que
+# resultó más rápido en benchmarks/kernels.py; KERNELS=numpy o
+# KERNELS=numba fuerzan uno.
+# ============================================
+
+import os
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+KERNELS = os.getenv("KERNELS", "auto")
+
+# Backend de cada kernel con KERNELS=auto y numba instalado. np.unique (orden)
+# y el producto CSR de SciPy ya son código compilado y le ganan a numba; la
+# matriz densa se llena más rápido con numba que con toarray()
+PREFERIDOS = {"contar_pares": "numpy", "propagar": "numpy", "filas_densas": "numba"}
+
+
+def elegir_backend(kernel):
+    """Backend que usa el kernel según KERNELS y si numba está instalado."""
+    if numba is None or KERNELS == "numpy":
+        return "numpy"
+    if KERNELS == "numba":
+        return "numba"
+    return PREFERIDOS[kernel]
+
+
+# --------------------------------------------
+# VERSIÓN NUMPY / SCIPY
+# --------------------------------------------
+
+def _pares(ids, distancia, n):
+    """Clave u * n + v (u <= v) de cada par de tokens a esa distancia."""
+    a, b = ids[:-distancia], ids[distancia:]
+    return np.minimum(a, b) * n + np.maximum(a, b)
+
+
+def contar_pares_numpy(ids, distancia, n):
+    """(pares ordenados, posición de su primera aparición, conteo), como np.unique."""
+    return np.unique(_pares(ids, distancia, n), return_index=True, return_counts=True)
+
+
+def propagar_numpy(indptr, indices, datos, activacion, iteraciones=3):
+    """activacion <- 0.5 * activacion + 0.1 * A @ activacion, iteraciones veces."""
+    import scipy.sparse as sp
+    n = len(indptr) - 1
+    A = sp.csr_matrix((datos, indices, indptr), shape=(n, n))
+    for _ in range(iteraciones):
+        activacion = activacion * 0.5 + (A @ activacion) * 0.1
+    return activacion
+
+
+def filas_densas_numpy(indptr, indices, datos):
+    """Matriz densa n x n de la adyacencia CSR."""
+    import scipy.sparse as sp
+    n = len(indptr) - 1
+    return sp.csr_matrix((datos, indices, indptr), shape=(n, n)).toarray()
+
+
+# --------------------------------------------
+# VERSIÓN NUMBA
+# --------------------------------------------
+
+if numba is not None:
+
+    @numba.njit(cache=True)
+    def _ranura(clave, bits):
+        # Hash de Fibonacci: los bits altos del producto reparten bien claves contiguas
+        return np.int64((np.uint64(clave) * np.uint64(11400714819323198485)) >> np.uint64(64 - bits))
+
+    @numba.njit(cache=True)
+    def _contar_pares_numba(ids, distancia, n):
+        # Tabla hash con direccionamiento abierto: una pasada, sin ordenar los m
+        # pares; crece (al doble) con los pares distintos
+        m = len(ids) - distancia
+        bits = 10
+        tabla = np.full(1 << bits, -1, np.int64)
+        posicion = np.empty(1 << bits, np.int64)
+        claves = np.empty(m, np.int64)
+        primero = np.empty(m, np.int64)
+        conteo = np.zeros(m, np.int64)
+        k = 0
+        for i in range(m):
+            a, b = ids[i], ids[i + distancia]
+            clave = a * n + b if a <= b else b * n + a
+            h = _ranura(clave, bits)
+            while True:
+                if tabla[h] == clave:
+                    conteo[posicion[h]] += 1
+                    break
+                if tabla[h] == -1:
+                    tabla[h] = clave
+                    posicion[h] = k
+                    claves[k] = clave
+                    primero[k] = i
+                    conteo[k] = 1
+                    k += 1
+                    if 2 * k > len(tabla):
+                        bits += 1
+                        tabla = np.full(1 << bits, -1, np.int64)
+                        posicion = np.empty(1 << bits, np.int64)
+                        for j in range(k):
+                            h = _ranura(claves[j], bits)
+                            while tabla[h] != -1:
+                                h = (h + 1) & (len(tabla) - 1)
+                            tabla[h] = claves[j]
+                            posicion[h] = j
+                    break
+                h = (h + 1) & (len(tabla) - 1)
+        orden = np.argsort(claves[:k])
+        return claves[:k][orden], primero[:k][orden], conteo[:k][orden]
+
+    @numba.njit(cache=True)
+    def _propagar_numba(indptr, indices, datos, activacion, iteraciones):
+        n = len(indptr) - 1
+        actual = activacion.copy()
+        for _ in range(iteraciones):
+            nueva = np.empty(n)
+            for i in range(n):
+                suma = 0.0
+                for k in range(indptr[i], indptr[i + 1]):
+                    suma += actual[indices[k]] * datos[k]
+                nueva[i] = actual[i] * 0.5 + suma * 0.1
+            actual = nueva
+        return actual
+
+    @numba.njit(cache=True)
+    def _filas_densas_numba(indptr, indices, datos):
+        n = len(indptr) - 1
+        densa = np.zeros((n, n))
+        for i in range(n):
+            for k in range(indptr[i], indptr[i + 1]):
+                densa[i, indices[k]] = datos[k]
+        return densa
+
+
+# --------------------------------------------
+# INTERFAZ
+# --------------------------------------------
+
+def contar_pares(ids, distancia, n, backend=None):
+    """
+    Pares de tokens a la distancia dada sobre ids (enteros en [0, n)).
+    Devuelve (claves u * n + v ordenadas, primera posición, conteo).
+    """
+    if (backend or elegir_backend("contar_pares")) == "numba":
+        return _contar_pares_numba(np.ascontiguousarray(ids, dtype=np.int64), distancia, n)
+    return contar_pares_numpy(ids, distancia, n)
+
+
+def propagar(indptr, indices, datos, activacion, iteraciones=3, backend=None):
+    """Propagación de activación (vector de n) sobre la adyacencia CSR."""
+    if (backend or elegir_backend("propagar")) == "numba":
+        return _propagar_numba(indptr, indices, datos, np.asarray(activacion, dtype=float), iteraciones)
+    return propagar_numpy(indptr, indices, datos, activacion, iteraciones)
+
+
+def filas_densas(indptr, indices, datos, backend=None):
+    """Matriz densa n x n de la adyacencia CSR."""
+    if (backend or elegir_backend("filas_densas")) == "numba":
+        return _filas_densas_numba(indptr, indices, datos)
+    return filas_densas_numpy(indptr, indices, datos)
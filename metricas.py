@@ -0,0 +1,246 @@
+# ============================================
+# metricas.py — métricas internas del servicio
+# - Contadores e histogramas con etiquetas, seguros entre hilos
+# - Cronómetros por etapa (clean, lemmatize, pagerank, tfidf, propagation,
+#   betweenness, fusion, load, build) y desglose opcional por request
+# - Exportación en formato de texto de Prometheus
+# ============================================
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIJO = "diccionario_inverso_"
+
+
+class Contador:
+    """Contador monótono, opcionalmente separado por etiquetas."""
+
+    tipo = "counter"
+
+    def __init__(self, nombre, ayuda):
+        self.nombre = PREFIJO + nombre
+        self.ayuda = ayuda
+        self._lock = threading.Lock()
+        self._valores = {}
+
+    def inc(self, n=1, **etiquetas):
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + n
+
+    def valor(self, **etiquetas):
+        return self._valores.get(tuple(sorted(etiquetas.items())), 0)
+
+    def exportar(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        with self._lock:
+            valores = sorted(self._valores.items())
+        for clave, valor in valores:
+            lineas.append(f"{self.nombre}{_etiquetas(clave)} {valor}")
+        return lineas
+
+
+class Histograma:
+    """Histograma acumulativo con buckets fijos (en segundos), separado por etiquetas."""
+
+    tipo = "histogram"
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+               0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+    def __init__(self, nombre, ayuda, buckets=None):
+        self.nombre = PREFIJO + nombre
+        self.ayuda = ayuda
+        self.buckets = tuple(buckets or self.BUCKETS)
+        self._lock = threading.Lock()
+        self._series = {}  # clave -> [conteos por bucket..., suma, total]
+
+    def observar(self, valor, **etiquetas):
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [0] * len(self.buckets) + [0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[i] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def media(self, **etiquetas):
+        """Promedio observado (None si aún no hay observaciones)."""
+        serie = self._series.get(tuple(sorted(etiquetas.items())))
+        if not serie or not serie[-1]:
+            return None
+        return serie[-2] / serie[-1]
+
+    def exportar(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        with self._lock:
+            series = sorted((clave, list(serie)) for clave, serie in self._series.items())
+        for clave, serie in series:
+            for limite, conteo in zip(self.buckets, serie):
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(clave + (('le', repr(limite)),))} {conteo}")
+            lineas.append(f"{self.nombre}_bucket{_etiquetas(clave + (('le', '+Inf'),))} {serie[-1]}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(clave)} {serie[-2]}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(clave)} {serie[-1]}")
+        return lineas
+
+
+def _etiquetas(clave):
+    if not clave:
+        return ""
+    pares = ",".join(f'{k}="{_escapar(v)}"' for k, v in clave)
+    return "{" + pares + "}"
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# Registro global de métricas del proceso
+_registro = {}
+_lock_registro = threading.Lock()
+
+
+def contador(nombre, ayuda):
+    """Devuelve el contador registrado con ese nombre (lo crea si no existe)."""
+    with _lock_registro:
+        if nombre not in _registro:
+            _registro[nombre] = Contador(nombre, ayuda)
+        return _registro[nombre]
+
+
+def histograma(nombre, ayuda, buckets=None):
+    """Devuelve el histograma registrado con ese nombre (lo crea si no existe)."""
+    with _lock_registro:
+        if nombre not in _registro:
+            _registro[nombre] = Histograma(nombre, ayuda, buckets)
+        return _registro[nombre]
+
+
+def exportar_prometheus():
+    """Todas las métricas registradas en formato de texto de Prometheus."""
+    with _lock_registro:
+        metricas = list(_registro.values())
+    lineas = []
+    for metrica in metricas:
+        lineas.extend(metrica.exportar())
+    return "\n".join(lineas) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# --------------------------------------------
+# CRONÓMETROS POR ETAPA
+# --------------------------------------------
+
+duracion_etapas = histograma(
+    "etapa_duracion_segundos", "Duración de cada etapa de limpieza, lematización, búsqueda o construcción")
+cache_consultas = contador(
+    "cache_consultas_total", "Consultas a caches internos (resultado=hit|miss)")
+
+# Desglose por request: cada hilo acumula sus etapas si hay un desglose activo
+_local = threading.local()
+
+
+@contextmanager
+def medir(etapa):
+    """Cronometra un bloque como la etapa indicada."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracion = time.perf_counter() - inicio
+        duracion_etapas.observar(duracion, etapa=etapa)
+        desglose = getattr(_local, "desglose", None)
+        if desglose is not None:
+            desglose[etapa] = desglose.get(etapa, 0.0) + duracion
+
+
+def cronometrado(etapa):
+    """Decorador: cronometra cada llamada a la función como la etapa indicada."""
+    def decorador(fn):
+        @functools.wraps(fn)
+        def envoltura(*args, **kwargs):
+            with medir(etapa):
+                return fn(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def registrar_cache(cache, acierto):
+    """Cuenta un hit o miss del cache indicado."""
+    cache_consultas.inc(cache=cache, resultado="hit" if acierto else "miss")
+
+
+class Desglose(dict):
+    """
+    {etapa: segundos} de un request. coalescida: el request reutilizó una
+    búsqueda idéntica en vuelo (servicio.SingleFlight) y las etapas de la
+    búsqueda son las que midió quien la calculó.
+    """
+    coalescida = False
+
+
+@contextmanager
+def desglose():
+    """Recoge el tiempo (s) de cada etapa ejecutada en este hilo dentro del bloque."""
+    anterior = getattr(_local, "desglose", None)
+    etapas = _local.desglose = Desglose()
+    try:
+        yield etapas
+    finally:
+        _local.desglose = anterior
+
+
+@contextmanager
+def desglose_parcial():
+    """
+    Etapas medidas dentro del bloque (el dict se completa al salir), que
+    además siguen sumándose al desglose activo del hilo si lo hay.
+    """
+    activo = getattr(_local, "desglose", None)
+    if activo is None:
+        with desglose() as etapas:
+            yield etapas
+        return
+    antes = dict(activo)
+    parcial = {}
+    try:
+        yield parcial
+    finally:
+        parcial.update({etapa: s - antes.get(etapa, 0.0) for etapa, s in activo.items()
+                        if s != antes.get(etapa, 0.0)})
+
+
+def marcar_coalescida(etapas_lider):
+    """Copia al desglose activo del hilo las etapas de la búsqueda reutilizada y lo marca."""
+    activo = getattr(_local, "desglose", None)
+    if activo is None:
+        return
+    for etapa, s in etapas_lider.items():
+        activo[etapa] = activo.get(etapa, 0.0) + s
+    activo.coalescida = True
+
+
+def en_ms(etapas):
+    """Convierte un desglose en segundos a milisegundos redondeados (para respuestas JSON)."""
+    return {etapa: round(s * 1000, 3) for etapa, s in etapas.items()}
+
+
+def debug(etapas):
+    """Bloque "debug" de una respuesta: etapas en ms y si la búsqueda fue coalescida."""
+    return {"etapas_ms": en_ms(etapas), "coalescida": getattr(etapas, "coalescida", False)}
+
+
+def ejecutar_con_desglose(fn, *args, **kwargs):
+    """
+    Ejecuta fn en el hilo actual (p. ej. dentro del pool) recogiendo sus etapas.
+    Devuelve (resultado, bloque "debug" de la respuesta; ver debug()).
+    """
+    with desglose() as etapas:
+        resultado = fn(*args, **kwargs)
+    return resultado, debug(etapas)
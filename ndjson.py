@@ -0,0 +1,91 @@
+# ============================================
+# ndjson.py — respuestas NDJSON por partes (una línea JSON por resultado)
+# - El contenido llega como bloques (listas de objetos) a medida que se
+#   calculan; cada bloque se serializa, se comprime y se envía enseguida
+# - Compresión negociada con Accept-Encoding: br (si está el paquete
+#   brotli), gzip o ninguna; el compresor se vacía al final de cada bloque
+#   para que el cliente reciba los resultados sin esperar al resto
+# - JSON con orjson si está instalado; si no, json de la biblioteca estándar
+# ============================================
+
+import json
+import zlib
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIMETYPE = "application/x-ndjson"
+
+
+def dumps(obj):
+    """Objeto -> bytes JSON compacto en UTF-8."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def pedido(request, data=None):
+    """True si el request pide NDJSON (Accept o "stream": true en el body)."""
+    if data and data.get("stream"):
+        return True
+    return request.accept_mimetypes.best == MIMETYPE
+
+
+def codificacion(request):
+    """'br', 'gzip' o None según Accept-Encoding y lo que hay instalado."""
+    if brotli is not None and "br" in request.accept_encodings:
+        return "br"
+    if "gzip" in request.accept_encodings:
+        return "gzip"
+    return None
+
+
+def _comprimidos(partes, cod):
+    """Comprime cada parte (bytes) y vacía el compresor después de cada una."""
+    if cod == "br":
+        compresor = brotli.Compressor(quality=4)
+        for parte in partes:
+            salida = compresor.process(parte) + compresor.flush()
+            if salida:
+                yield salida
+        yield compresor.finish()
+    elif cod == "gzip":
+        compresor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: con encabezado gzip
+        for parte in partes:
+            yield compresor.compress(parte) + compresor.flush(zlib.Z_SYNC_FLUSH)
+        yield compresor.flush()
+    else:
+        yield from partes
+
+
+def respuesta(bloques, request, headers=None):
+    """
+    Response con una línea por objeto de cada bloque. Si algo falla a mitad
+    de camino (ya se envió el 200) la última línea es {"ok": false, "error"}.
+    """
+    def partes():
+        try:
+            for bloque in bloques:
+                if bloque:
+                    yield b"".join(dumps(obj) + b"\n" for obj in bloque)
+        except Exception as e:
+            yield dumps({"ok": False, "error": str(e)}) + b"\n"
+
+    cod = codificacion(request)
+    r = Response(_comprimidos(partes(), cod), mimetype=MIMETYPE)
+    r.headers["Vary"] = "Accept-Encoding"
+    r.headers["X-Accel-Buffering"] = "no"  # que un nginx delante no junte la respuesta
+    if cod:
+        r.headers["Content-Encoding"] = cod
+    for clave, valor in (headers or {}).items():
+        r.headers[clave] = valor
+    return r
@@ -0,0 +1,216 @@
+# ============================================
+# perfilado.py — perfiles bajo demanda de búsquedas y construcciones
+# - Se activa por request (header X-Perfilar) o por muestreo (PERFIL_TASA)
+# - cProfile sobre el bloque más externo marcado como perfilable
+# - Cada perfil se guarda como .pstats en un anillo acotado de archivos
+#   (data/perfiles, PERFIL_MAX archivos; los más viejos se borran)
+# Con el perfilado apagado el costo es una lectura de threading.local por llamada.
+# ============================================
+
+import cProfile
+import functools
+import io
+import itertools
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+PERFIL_DIR = os.getenv("PERFIL_DIR", os.path.join("data", "perfiles"))
+HEADER = "X-Perfilar"
+HEADER_TOKEN = "X-Admin-Token"
+
+# Fracción de llamadas perfiladas sin que nadie lo pida (0 = sólo bajo demanda)
+tasa = 0.0
+# Tamaño del anillo de archivos
+max_perfiles = int(os.getenv("PERFIL_MAX", "20"))
+
+_local = threading.local()
+_secuencia = itertools.count()
+_lock_anillo = threading.Lock()
+_ID_VALIDO = re.compile(r"^[\w.-]+$")
+
+
+def configurar(tasa_muestreo=None, maximo=None):
+    """Ajusta la tasa de muestreo y el tamaño del anillo (c3 lo llama con CONFIG)."""
+    global tasa, max_perfiles
+    if tasa_muestreo is not None:
+        tasa = max(0.0, min(1.0, float(tasa_muestreo)))
+    if maximo is not None:
+        max_perfiles = max(1, int(maximo))
+
+
+# --------------------------------------------
+# ACTIVACIÓN
+# --------------------------------------------
+
+def pedido(headers):
+    """True si el request pide un perfil (header X-Perfilar: 1/true/si)."""
+    return str(headers.get(HEADER, "")).strip().lower() in ("1", "true", "si", "sí", "yes")
+
+
+def autorizado(headers, token):
+    """Valida el header X-Admin-Token; sin token configurado no hay acceso."""
+    return bool(token) and headers.get(HEADER_TOKEN) == token
+
+
+@contextmanager
+def solicitud(forzar, generados=None):
+    """
+    Dentro del bloque, el primer perfil() de este hilo se perfila siempre si
+    forzar es True. Produce la lista de ids de los perfiles guardados.
+    """
+    anterior = (getattr(_local, "forzar", False), getattr(_local, "generados", None))
+    _local.forzar = forzar
+    _local.generados = generados if generados is not None else []
+    try:
+        yield _local.generados
+    finally:
+        _local.forzar, _local.generados = anterior
+
+
+def ejecutar_perfilado(etiqueta, forzar, generados, fn, *args, **kwargs):
+    """
+    Ejecuta fn(*args, **kwargs) en el hilo actual dentro de solicitud(forzar,
+    generados) y perfil(etiqueta). Sirve igual en el hilo del request que en el
+    pool de búsqueda; los ids de los perfiles se agregan a generados.
+    """
+    with solicitud(forzar, generados), perfil(etiqueta):
+        return fn(*args, **kwargs)
+
+
+@contextmanager
+def perfil(etiqueta):
+    """
+    Perfila el bloque si está pedido o sale sorteado. Sólo decide el bloque más
+    externo del hilo: los anidados (p. ej. buscar_desde_lemas dentro de un
+    endpoint) no vuelven a sortear ni abren otro perfil.
+    """
+    if getattr(_local, "dentro", False):
+        yield
+        return
+
+    activar = getattr(_local, "forzar", False) or (tasa > 0 and random.random() < tasa)
+    _local.dentro = True
+    try:
+        if not activar:
+            yield
+            return
+
+        perfilador = cProfile.Profile()
+        try:
+            perfilador.enable()
+        except ValueError:
+            # Otro perfilador ya está activo en el proceso; no se perfila
+            yield
+            return
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            perfilador.disable()
+            duracion = time.perf_counter() - inicio
+            id_perfil = _guardar(perfilador, etiqueta, duracion)
+            generados = getattr(_local, "generados", None)
+            if id_perfil and generados is not None:
+                generados.append(id_perfil)
+    finally:
+        _local.dentro = False
+
+
+def perfilable(etiqueta):
+    """Decorador: cada llamada a la función se ejecuta dentro de perfil(etiqueta)."""
+    def decorador(fn):
+        @functools.wraps(fn)
+        def envoltura(*args, **kwargs):
+            with perfil(etiqueta):
+                return fn(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+# --------------------------------------------
+# ANILLO DE ARCHIVOS
+# --------------------------------------------
+
+def _limpiar_etiqueta(etiqueta):
+    return re.sub(r"[^\w-]+", "-", etiqueta).strip("-")[:60] or "perfil"
+
+
+def _guardar(perfilador, etiqueta, duracion):
+    """Escribe el perfil en PERFIL_DIR y recorta el anillo; devuelve su id."""
+    id_perfil = "{}_{}_{}_{}ms_{}".format(
+        time.strftime("%Y%m%d-%H%M%S"), os.getpid(), next(_secuencia),
+        int(duracion * 1000), _limpiar_etiqueta(etiqueta))
+    try:
+        os.makedirs(PERFIL_DIR, exist_ok=True)
+        perfilador.dump_stats(os.path.join(PERFIL_DIR, id_perfil + ".pstats"))
+        _recortar()
+    except OSError as e:
+        print(f"Advertencia: no se pudo guardar el perfil '{id_perfil}': {e}")
+        return None
+    return id_perfil
+
+
+def _recortar():
+    with _lock_anillo:
+        archivos = _archivos()
+        for _, ruta in archivos[:-max_perfiles]:
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass  # otro worker ya lo borró
+
+
+def _archivos():
+    """[(mtime, ruta)] de los perfiles guardados, del más viejo al más nuevo."""
+    if not os.path.isdir(PERFIL_DIR):
+        return []
+    archivos = []
+    for nombre in os.listdir(PERFIL_DIR):
+        if nombre.endswith(".pstats"):
+            ruta = os.path.join(PERFIL_DIR, nombre)
+            try:
+                archivos.append((os.path.getmtime(ruta), ruta))
+            except OSError:
+                pass
+    return sorted(archivos)
+
+
+def listar():
+    """Perfiles disponibles, del más nuevo al más viejo."""
+    perfiles = []
+    for mtime, ruta in reversed(_archivos()):
+        id_perfil = os.path.basename(ruta)[:-len(".pstats")]
+        partes = id_perfil.split("_", 4)
+        perfiles.append({
+            "id": id_perfil,
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(mtime)),
+            "pid": int(partes[1]) if len(partes) == 5 else None,
+            "duracion_ms": int(partes[3][:-2]) if len(partes) == 5 else None,
+            "etiqueta": partes[4] if len(partes) == 5 else id_perfil,
+            "bytes": os.path.getsize(ruta) if os.path.exists(ruta) else 0,
+        })
+    return perfiles
+
+
+def ruta(id_perfil):
+    """Ruta del .pstats de un perfil, o None si el id no es válido o ya salió del anillo."""
+    if not id_perfil or not _ID_VALIDO.match(id_perfil):
+        return None
+    ruta_perfil = os.path.join(PERFIL_DIR, id_perfil + ".pstats")
+    return ruta_perfil if os.path.exists(ruta_perfil) else None
+
+
+def como_texto(id_perfil, orden="cumulative", limite=60):
+    """Resumen legible de un perfil (pstats ordenado), o None si no existe."""
+    ruta_perfil = ruta(id_perfil)
+    if ruta_perfil is None:
+        return None
+    salida = io.StringIO()
+    stats = pstats.Stats(ruta_perfil, stream=salida)
+    stats.strip_dirs().sort_stats(orden).print_stats(limite)
+    return salida.getvalue()
@@ -1,10 +1,17 @@
 
 
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, send_file
 from flask_cors import CORS
 import os
-import json
-from c3 import cargar_diccionario, ReverseDict, GRAPH_DIR
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import OrderedDict
+from c3 import cargar_diccionario, preparar_busqueda, listar_diccionarios as listar_indice, ReverseDict, CONFIG, BusquedaParcial, Plazo, PlazoVencido, DECAIMIENTOS
+from servicio import pool_busqueda, ColaLlena, buscar_coalescido, buscar_progresivo_coalescido, buscar_federado
+import metricas
+import ndjson
+import perfilado
 
 app = Flask(__name__)
 # Permitir peticiones desde cualquier dominio (ajusta según necesites)
@@ -13,9 +20,39 @@ CORS(app, resources={r"/api/*": {"origins": "*"}})
 # Cache de diccionarios cargados para evitar recargarlos constantemente
 diccionarios_cache = {}
 
+# Variantes (ventana, decaimiento) pedidas en las consultas, armadas desde las
+# coocurrencias guardadas; se conservan las MAX_VARIANTES usadas más recientemente
+variantes_cache = OrderedDict()
+MAX_VARIANTES = int(os.getenv("MAX_VARIANTES", "4"))
+_lock_variantes = threading.Lock()
+
+# Máximo de definiciones por request en /api/v1/buscar_batch
+MAX_DEFINICIONES_BATCH = 500
+# En modo NDJSON la respuesta no se arma entera en memoria: se acepta más y
+# se busca por bloques de BLOQUE_STREAM definiciones
+MAX_DEFINICIONES_STREAM = int(os.getenv("MAX_DEFINICIONES_STREAM", "20000"))
+BLOQUE_STREAM = 32
+
+# Precarga al arrancar: hilos que cargan diccionarios a la vez y consultas de
+# calentamiento por diccionario (0 = sólo cargar)
+PRECARGA_HILOS = int(os.getenv("PRECARGA_HILOS", str(os.cpu_count() or 1)))
+CONSULTAS_CALENTAMIENTO = int(os.getenv("CONSULTAS_CALENTAMIENTO", "3"))
+
+# /api/v1/ready responde 200 sólo cuando termina precargar_diccionarios
+precarga_lista = threading.Event()
+estado_precarga = {"pendientes": [], "cargados": [], "fallidos": [], "segundos": None}
+
+# Plazo por defecto de los endpoints asíncronos (ms)
+PLAZO_MS_DEFECTO = float(os.getenv("PLAZO_MS", "10000"))
+
+# En la búsqueda progresiva el corte duro (504) llega este margen después del
+# presupuesto, para que la última estrategia y la fusión alcancen a terminar
+MARGEN_PROGRESIVO_MS = float(os.getenv("MARGEN_PROGRESIVO_MS", "1000"))
+
 
 def get_diccionario(nombre):
     """Obtiene un diccionario del cache o lo carga si no existe."""
+    metricas.registrar_cache("diccionarios", nombre in diccionarios_cache)
     if nombre not in diccionarios_cache:
         grafo, processor, builder = cargar_diccionario(nombre)
         if grafo is None:
@@ -24,11 +61,114 @@ def get_diccionario(nombre):
             "grafo": grafo,
             "processor": processor,
             "builder": builder,
-            "reverse_dict": ReverseDict(grafo, processor, builder)
+            "reverse_dict": preparar_busqueda(nombre, grafo, processor, builder)
         }
     return diccionarios_cache[nombre]
 
 
+def get_variante(nombre, ventana=None, decaimiento=None):
+    """
+    Como get_diccionario, pero con el grafo armado con otra ventana o
+    decaimiento (sin reconstruir; ver c3.Coocurrencias). Sin caché de
+    PageRank por lema: sólo el diccionario base la precalcula.
+    Lanza ValueError si el diccionario no tiene coocurrencias guardadas.
+    """
+    if ventana is None and decaimiento is None:
+        return get_diccionario(nombre)
+    clave = (nombre, ventana, decaimiento)
+    with _lock_variantes:
+        metricas.registrar_cache("variantes", clave in variantes_cache)
+        if clave in variantes_cache:
+            variantes_cache.move_to_end(clave)
+            return variantes_cache[clave]
+
+    grafo, processor, builder = cargar_diccionario(nombre, ventana=ventana, decaimiento=decaimiento)
+    if grafo is None:
+        return None
+    dic = {
+        "grafo": grafo,
+        "processor": processor,
+        "builder": builder,
+        "reverse_dict": ReverseDict(grafo, processor, builder)
+    }
+    with _lock_variantes:
+        variantes_cache[clave] = dic
+        while len(variantes_cache) > MAX_VARIANTES:
+            variantes_cache.popitem(last=False)
+    return dic
+
+
+def diccionarios_configurados():
+    """
+    Nombres de diccionarios a precargar.
+    Prioridad: DICCIONARIOS_PRECARGA (separados por coma) > "precargar" en config.json > todos.
+    """
+    nombres = os.getenv("DICCIONARIOS_PRECARGA")
+    if nombres:
+        return [n.strip() for n in nombres.split(",") if n.strip()]
+    if CONFIG.get("precargar"):
+        return list(CONFIG["precargar"])
+    return [dic["nombre"] for dic in listar_indice()]
+
+
+def _precargar_uno(nombre):
+    """Carga un diccionario y lo calienta; devuelve (cargado, segundos)."""
+    inicio = time.perf_counter()
+    dic = get_diccionario(nombre)
+    if dic is not None and CONSULTAS_CALENTAMIENTO > 0:
+        dic["reverse_dict"].calentar(CONSULTAS_CALENTAMIENTO)
+    return dic is not None, time.perf_counter() - inicio
+
+
+def precargar_diccionarios(nombres, hilos=None):
+    """
+    Carga y calienta (ReverseDict.calentar) los diccionarios indicados en el
+    cache, varios a la vez en un pool de hilos, y marca la instancia como
+    lista (/api/v1/ready) al terminar, aunque alguno falle.
+    Devuelve los que se pudieron cargar, en el orden pedido.
+    """
+    nombres = list(dict.fromkeys(nombres))
+    hilos = max(1, min(hilos or PRECARGA_HILOS, len(nombres) or 1))
+    estado_precarga.update({"pendientes": list(nombres), "cargados": [], "fallidos": []})
+    inicio = time.perf_counter()
+    cargados = set()
+    try:
+        with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="precarga") as pool:
+            futuros = {pool.submit(_precargar_uno, nombre): nombre for nombre in nombres}
+            for futuro in as_completed(futuros):
+                nombre = futuros[futuro]
+                estado_precarga["pendientes"].remove(nombre)
+                try:
+                    cargado, segundos = futuro.result()
+                except Exception as e:
+                    cargado, segundos = False, 0.0
+                    print(f"  ✗ '{nombre}': {type(e).__name__}: {e}")
+                if cargado:
+                    cargados.add(nombre)
+                    estado_precarga["cargados"].append(nombre)
+                    print(f"  • '{nombre}' cargado y calentado en {segundos:.1f} s")
+                else:
+                    estado_precarga["fallidos"].append(nombre)
+    finally:
+        estado_precarga["segundos"] = round(time.perf_counter() - inicio, 2)
+        precarga_lista.set()
+    return [nombre for nombre in nombres if nombre in cargados]
+
+
+def _perfil_pedido():
+    """True si el request pide un perfil (X-Perfilar) con un X-Admin-Token válido."""
+    return perfilado.pedido(request.headers) and \
+        perfilado.autorizado(request.headers, CONFIG.get("admin_token"))
+
+
+def _con_perfiles(respuesta, perfiles):
+    """Agrega el header X-Perfil con los ids de los perfiles generados por el request."""
+    respuesta = jsonify(respuesta)
+    if perfiles:
+        respuesta.headers["X-Perfil"] = ",".join(perfiles)
+    return respuesta
+
+
 # ============================================
 # ENDPOINTS PÚBLICOS
 # ============================================
@@ -51,12 +191,7 @@ def listar_diccionarios():
     }
     """
     try:
-        index_path = os.path.join(GRAPH_DIR, "diccionarios_index.json")
-        if not os.path.exists(index_path):
-            return jsonify({"ok": True, "diccionarios": []})
-        
-        with open(index_path, "r", encoding="utf-8") as f:
-            index = json.load(f)
+        index = listar_indice()
         
         # Agregar información adicional de cada diccionario
         resultado = []
@@ -76,6 +211,73 @@ def listar_diccionarios():
         return jsonify({"ok": False, "error": str(e)}), 500
 
 
+def _parametros_busqueda(data):
+    """
+    Valida el body de una búsqueda individual.
+    Devuelve (diccionario, definicion, top_k, error); error es una respuesta 400 o None.
+    """
+    diccionario_nombre = data.get("diccionario")
+    definicion = data.get("definicion", "").strip()
+    top_k = int(data.get("top_k", 10))
+    
+    if not diccionario_nombre:
+        return None, None, None, (jsonify({
+            "ok": False, 
+            "error": "Falta el parámetro 'diccionario'"
+        }), 400)
+    
+    if not definicion:
+        return None, None, None, (jsonify({
+            "ok": False, 
+            "error": "Falta el parámetro 'definicion'"
+        }), 400)
+    
+    if top_k < 1 or top_k > 50:
+        return None, None, None, (jsonify({
+            "ok": False, 
+            "error": "top_k debe estar entre 1 y 50"
+        }), 400)
+    
+    return diccionario_nombre, definicion, top_k, None
+
+
+def _diccionario_pedido(data, diccionario_nombre):
+    """
+    Diccionario del request, con la ventana y el decaimiento opcionales del body.
+    Devuelve (dic, etiqueta, error): etiqueta distingue la variante en la
+    coalescencia y los perfiles; error es una respuesta 400/404 o None.
+    """
+    ventana = data.get("ventana")
+    decaimiento = data.get("decaimiento")
+    if ventana is not None:
+        try:
+            ventana = int(ventana)
+        except (TypeError, ValueError):
+            return None, None, (jsonify({"ok": False, "error": "ventana debe ser un entero"}), 400)
+        if ventana < 1:
+            return None, None, (jsonify({"ok": False, "error": "ventana debe ser un entero mayor o igual a 1"}), 400)
+    if decaimiento is not None and decaimiento not in DECAIMIENTOS:
+        return None, None, (jsonify({
+            "ok": False,
+            "error": f"decaimiento debe ser uno de: {', '.join(DECAIMIENTOS)}"
+        }), 400)
+    
+    try:
+        dic = get_variante(diccionario_nombre, ventana, decaimiento)
+    except ValueError as e:
+        return None, None, (jsonify({"ok": False, "error": str(e)}), 400)
+    if dic is None:
+        return None, None, (jsonify({
+            "ok": False, 
+            "error": f"Diccionario '{diccionario_nombre}' no encontrado"
+        }), 404)
+    
+    etiqueta = diccionario_nombre
+    if ventana is not None or decaimiento is not None:
+        etiqueta = f"{diccionario_nombre} (ventana={ventana}, decaimiento={decaimiento})"
+    return dic, etiqueta, None
+
+
 @app.route("/api/v1/buscar", methods=["POST"])
 def buscar():
     """
@@ -85,9 +287,18 @@ def buscar():
     {
         "diccionario": "corpus_medicina",
         "definicion": "órgano que bombea sangre",
-        "top_k": 10
+        "top_k": 10,
+        "debug": false
     }
     
+    Opcionales: "ventana" (1..ventana_max) y "decaimiento" (inversa, uniforme,
+    lineal, exponencial) buscan en el grafo armado con esa ventana desde las
+    coocurrencias guardadas del diccionario, sin reconstruirlo.
+    
+    Con "progresivo": true y "deadline_ms" la búsqueda corre las estrategias de
+    la más barata a la más cara mientras queda tiempo y responde con lo que
+    alcanzó a combinar; la respuesta agrega "estrategias" con las que se usaron.
+    
     Respuesta:
     {
         "ok": true,
@@ -98,46 +309,61 @@ def buscar():
             {"palabra": "cardíaco", "score": 0.7231}
         ]
     }
+    
+    Con "debug": true se agrega {"debug": {"etapas_ms": {...}, "coalescida": false}}
+    con el tiempo de cada etapa de esta consulta (clean, lemmatize, pagerank,
+    tfidf, ...). Si la búsqueda reutilizó una idéntica en vuelo, "coalescida"
+    es true y las etapas de la búsqueda son las que midió esa otra.
+
+    Con los headers "X-Perfilar: 1" y "X-Admin-Token" la búsqueda se perfila y
+    la respuesta trae "X-Perfil" con el id del perfil (ver /api/v1/admin/perfiles).
     """
     try:
         data = request.get_json()
         
         # Validar parámetros
-        diccionario_nombre = data.get("diccionario")
-        definicion = data.get("definicion", "").strip()
-        top_k = int(data.get("top_k", 10))
+        diccionario_nombre, definicion, top_k, error = _parametros_busqueda(data)
+        if error:
+            return error
         
-        if not diccionario_nombre:
-            return jsonify({
-                "ok": False, 
-                "error": "Falta el parámetro 'diccionario'"
-            }), 400
+        presupuesto = None
+        if data.get("progresivo"):
+            presupuesto, error = _plazo_request(data)
+            if error:
+                return error
         
-        if not definicion:
-            return jsonify({
-                "ok": False, 
-                "error": "Falta el parámetro 'definicion'"
-            }), 400
+        # Cargar diccionario (o la variante de ventana/decaimiento pedida)
+        dic, etiqueta, error = _diccionario_pedido(data, diccionario_nombre)
+        if error:
+            return error
         
-        if top_k < 1 or top_k > 50:
-            return jsonify({
-                "ok": False, 
-                "error": "top_k debe estar entre 1 y 50"
-            }), 400
-        
-        # Cargar diccionario
-        dic = get_diccionario(diccionario_nombre)
-        if dic is None:
-            return jsonify({
-                "ok": False, 
-                "error": f"Diccionario '{diccionario_nombre}' no encontrado"
-            }), 404
-        
-        # Realizar búsqueda
-        resultados = dic["reverse_dict"].buscar_multiple_estrategias(
-            definicion, 
-            top_k=top_k
-        )
+        # Realizar búsqueda (las idénticas en vuelo se calculan una sola vez)
+        perfiles = []
+        estrategias = None
+        with metricas.desglose() as etapas:
+            if presupuesto is not None:
+                resultados, estrategias = perfilado.ejecutar_perfilado(
+                    f"buscar {etiqueta}",
+                    _perfil_pedido(),
+                    perfiles,
+                    buscar_progresivo_coalescido,
+                    etiqueta,
+                    dic["reverse_dict"],
+                    definicion,
+                    top_k=top_k,
+                    presupuesto=presupuesto
+                )
+            else:
+                resultados = perfilado.ejecutar_perfilado(
+                    f"buscar {etiqueta}",
+                    _perfil_pedido(),
+                    perfiles,
+                    buscar_coalescido,
+                    etiqueta,
+                    dic["reverse_dict"],
+                    definicion, 
+                    top_k=top_k
+                )
         
         # Formatear resultados
         resultados_formateados = [
@@ -145,21 +371,57 @@ def buscar():
             for r in resultados
         ]
         
-        return jsonify({
+        respuesta = {
             "ok": True,
             "diccionario": diccionario_nombre,
             "definicion": definicion,
             "resultados": resultados_formateados
-        })
+        }
+        if estrategias is not None:
+            respuesta["estrategias"] = estrategias
+        if data.get("debug"):
+            respuesta["debug"] = metricas.debug(etapas)
+        
+        return _con_perfiles(respuesta, perfiles)
     
+    except PlazoVencido:
+        return _respuesta_plazo_vencido()
     except Exception as e:
         return jsonify({"ok": False, "error": str(e)}), 500
 
 
+def _buscar_batch_ndjson(rd, diccionario_nombre, definiciones, top_k):
+    """
+    /api/v1/buscar_batch en NDJSON: una línea de encabezado y una por
+    definición, enviadas en cuanto termina cada bloque de BLOQUE_STREAM.
+    """
+    def bloques():
+        # El encabezado sale junto con el primer bloque de resultados
+        encabezado = [{"ok": True, "diccionario": diccionario_nombre, "total": len(definiciones)}]
+        for inicio in range(0, len(definiciones), BLOQUE_STREAM):
+            bloque = definiciones[inicio:inicio + BLOQUE_STREAM]
+            yield encabezado + [
+                {
+                    "n": inicio + i,
+                    "definicion": definicion,
+                    "palabras": [
+                        {"palabra": r[0], "score": round(float(r[1]), 4)}
+                        for r in resultados
+                    ]
+                }
+                for i, (definicion, resultados) in enumerate(zip(bloque, rd.buscar_batch(bloque, top_k=top_k)))
+            ]
+            encabezado = []
+
+    return ndjson.respuesta(bloques(), request)
+
+
 @app.route("/api/v1/buscar_batch", methods=["POST"])
 def buscar_batch():
     """
-    Busca múltiples definiciones en un solo request.
+    Busca múltiples definiciones en un solo request (hasta MAX_DEFINICIONES_BATCH).
+    Todas las definiciones se resuelven juntas con ReverseDict.buscar_batch.
+    Acepta "ventana" y "decaimiento" como /api/v1/buscar.
     
     Body (JSON):
     {
@@ -181,6 +443,13 @@ def buscar_batch():
             }
         ]
     }
+    
+    Con "stream": true (o Accept: application/x-ndjson) responde NDJSON por
+    bloques (hasta MAX_DEFINICIONES_STREAM definiciones), comprimido con br
+    o gzip según Accept-Encoding:
+    {"ok": true, "diccionario": "corpus_medicina", "total": 2}
+    {"n": 0, "definicion": "órgano que bombea sangre", "palabras": [...]}
+    {"n": 1, "definicion": "líquido rojo vital", "palabras": [...]}
     """
     try:
         data = request.get_json()
@@ -195,27 +464,34 @@ def buscar_batch():
                 "error": "Faltan parámetros requeridos"
             }), 400
         
-        if len(definiciones) > 20:
+        stream = ndjson.pedido(request, data)
+        maximo = MAX_DEFINICIONES_STREAM if stream else MAX_DEFINICIONES_BATCH
+        if len(definiciones) > maximo:
             return jsonify({
                 "ok": False, 
-                "error": "Máximo 20 definiciones por request"
+                "error": f"Máximo {maximo} definiciones por request"
             }), 400
         
-        # Cargar diccionario
-        dic = get_diccionario(diccionario_nombre)
-        if dic is None:
-            return jsonify({
-                "ok": False, 
-                "error": f"Diccionario '{diccionario_nombre}' no encontrado"
-            }), 404
+        # Cargar diccionario (o la variante de ventana/decaimiento pedida)
+        dic, etiqueta, error = _diccionario_pedido(data, diccionario_nombre)
+        if error:
+            return error
+        
+        if stream:
+            return _buscar_batch_ndjson(dic["reverse_dict"], diccionario_nombre, definiciones, top_k)
         
-        # Procesar todas las definiciones
+        # Procesar todas las definiciones en un solo lote
+        perfiles = []
+        resultados_lote = perfilado.ejecutar_perfilado(
+            f"buscar_batch {etiqueta}",
+            _perfil_pedido(),
+            perfiles,
+            dic["reverse_dict"].buscar_batch,
+            definiciones,
+            top_k=top_k
+        )
         resultados_batch = []
-        for definicion in definiciones:
-            resultados = dic["reverse_dict"].buscar_multiple_estrategias(
-                definicion, 
-                top_k=top_k
-            )
+        for definicion, resultados in zip(definiciones, resultados_lote):
             resultados_batch.append({
                 "definicion": definicion,
                 "palabras": [
@@ -224,12 +500,305 @@ def buscar_batch():
                 ]
             })
         
-        return jsonify({
+        return _con_perfiles({
             "ok": True,
             "diccionario": diccionario_nombre,
             "resultados": resultados_batch
+        }, perfiles)
+    
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e)}), 500
+
+
+@app.route("/api/v1/buscar_federado", methods=["POST"])
+def buscar_federado_endpoint():
+    """
+    Busca una definición en varios diccionarios en paralelo y mezcla los
+    resultados en un top-k global. Los scores se normalizan por diccionario
+    (ver ReverseDict.buscar_desde_lemas con normalizar=True) para que sean
+    comparables entre grafos de distinto tamaño.
+    
+    Body (JSON):
+    {
+        "diccionarios": ["Corpus Chancroide", "Corpus Recetas"],
+        "definicion": "órgano que bombea sangre",
+        "top_k": 10,
+        "deadline_ms": 5000
+    }
+    Sin "diccionarios" se busca en todos los configurados (ver DICCIONARIOS_PRECARGA).
+    
+    Respuesta:
+    {
+        "ok": true,
+        "definicion": "órgano que bombea sangre",
+        "resultados": [
+            {"palabra": "corazón", "diccionario": "Corpus Chancroide", "score": 0.75}
+        ],
+        "diccionarios": {
+            "Corpus Chancroide": {"ms": 41.2, "resultados": 10},
+            "Corpus Recetas": {"error": "plazo vencido"}
+        }
+    }
+    """
+    try:
+        data = request.get_json()
+        pedidos = data.get("diccionarios")
+        nombres = pedidos or diccionarios_configurados()
+        definicion = data.get("definicion", "").strip()
+        top_k = int(data.get("top_k", 10))
+        
+        if not isinstance(nombres, list) or not nombres:
+            return jsonify({
+                "ok": False, 
+                "error": "'diccionarios' debe ser una lista de nombres"
+            }), 400
+        
+        if not definicion:
+            return jsonify({
+                "ok": False, 
+                "error": "Falta el parámetro 'definicion'"
+            }), 400
+        
+        if top_k < 1 or top_k > 50:
+            return jsonify({
+                "ok": False, 
+                "error": "top_k debe estar entre 1 y 50"
+            }), 400
+        plazo, error = _plazo_request(data)
+        if error:
+            return error
+        
+        diccionarios, no_disponibles = [], {}
+        for nombre in dict.fromkeys(nombres):
+            dic = get_diccionario(nombre)
+            if dic is not None:
+                diccionarios.append((nombre, dic["reverse_dict"]))
+            elif pedidos:
+                return jsonify({
+                    "ok": False, 
+                    "error": f"Diccionario '{nombre}' no encontrado"
+                }), 404
+            else:
+                # Con la lista por defecto, un diccionario que no carga no cancela la búsqueda
+                no_disponibles[nombre] = {"error": "no se pudo cargar"}
+        
+        resultados, estado = buscar_federado(diccionarios, definicion, top_k=top_k, plazo=plazo)
+        estado.update(no_disponibles)
+        
+        return jsonify({
+            "ok": True,
+            "definicion": definicion,
+            "resultados": [
+                {"palabra": palabra, "diccionario": nombre, "score": round(float(score), 4)}
+                for palabra, nombre, score in resultados
+            ],
+            "diccionarios": estado
         })
     
+    except PlazoVencido:
+        return _respuesta_plazo_vencido()
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e)}), 500
+
+
+# ============================================
+# ENDPOINTS ASÍNCRONOS (pool acotado + plazos)
+# ============================================
+
+def _plazo_request(data):
+    """
+    Plazo del request: 'deadline_ms' del body o PLAZO_MS por defecto.
+    Devuelve (plazo, error); error es una respuesta 400 o None.
+    """
+    try:
+        return Plazo.desde_ms(data.get("deadline_ms", PLAZO_MS_DEFECTO)), None
+    except ValueError as e:
+        return None, (jsonify({
+            "ok": False, 
+            "error": str(e)
+        }), 400)
+
+
+def _respuesta_cola_llena(e):
+    respuesta = jsonify({
+        "ok": False,
+        "error": "Servidor ocupado, reintenta más tarde"
+    })
+    respuesta.headers["Retry-After"] = str(e.reintentar_en)
+    return respuesta, 503
+
+
+def _respuesta_plazo_vencido():
+    return jsonify({
+        "ok": False,
+        "error": "La búsqueda superó el plazo (deadline_ms)"
+    }), 504
+
+
+@app.route("/api/v1/async/buscar", methods=["POST"])
+async def buscar_async():
+    """
+    Igual que /api/v1/buscar, pero la lematización y el scoring corren en el
+    pool acotado de servicio.py. Acepta además "deadline_ms" en el body.
+    
+    - 503 + Retry-After si la cola del pool está llena
+    - 504 si la búsqueda no terminó dentro del plazo (el trabajo se cancela)
+    
+    Con "progresivo": true, "deadline_ms" es el presupuesto de la búsqueda
+    progresiva (ver /api/v1/buscar): si una estrategia no termina
+    MARGEN_PROGRESIVO_MS después del presupuesto se responde con las que ya
+    terminaron, y el 504 queda para cuando no terminó ninguna.
+    """
+    try:
+        # Con la cola llena se responde 503 antes de cargar nada
+        pool_busqueda.verificar_lugar()
+        data = request.get_json()
+        diccionario_nombre, definicion, top_k, error = _parametros_busqueda(data)
+        if error:
+            return error
+        progresivo = bool(data.get("progresivo"))
+        plazo, error = _plazo_request(data)
+        if error:
+            return error
+        if progresivo:
+            presupuesto = plazo
+            plazo = Plazo(presupuesto.segundos + MARGEN_PROGRESIVO_MS / 1000.0)
+        
+        # Cargar diccionario (o la variante de ventana/decaimiento pedida)
+        dic, etiqueta, error = _diccionario_pedido(data, diccionario_nombre)
+        if error:
+            return error
+        
+        perfiles = []
+        estrategias = None
+        if progresivo:
+            parcial = BusquedaParcial()
+            try:
+                (resultados, estrategias), debug = await pool_busqueda.ejecutar(
+                    perfilado.ejecutar_perfilado,
+                    f"buscar {etiqueta}",
+                    _perfil_pedido(),
+                    perfiles,
+                    metricas.ejecutar_con_desglose,
+                    buscar_progresivo_coalescido,
+                    etiqueta,
+                    dic["reverse_dict"],
+                    definicion,
+                    top_k=top_k,
+                    presupuesto=presupuesto,
+                    plazo=plazo,
+                    parcial=parcial
+                )
+            except PlazoVencido:
+                # Una estrategia se pasó del corte duro: se responde con las que ya terminaron
+                fusion = parcial.fusionar(dic["reverse_dict"], top_k=top_k)
+                if fusion is None:
+                    raise
+                (resultados, estrategias), debug = fusion, metricas.debug({})
+        else:
+            resultados, debug = await pool_busqueda.ejecutar(
+                perfilado.ejecutar_perfilado,
+                f"buscar {etiqueta}",
+                _perfil_pedido(),
+                perfiles,
+                metricas.ejecutar_con_desglose,
+                buscar_coalescido,
+                etiqueta,
+                dic["reverse_dict"],
+                definicion,
+                top_k=top_k,
+                plazo=plazo
+            )
+        
+        respuesta = {
+            "ok": True,
+            "diccionario": diccionario_nombre,
+            "definicion": definicion,
+            "resultados": [
+                {"palabra": r[0], "score": round(float(r[1]), 4)} 
+                for r in resultados
+            ]
+        }
+        if estrategias is not None:
+            respuesta["estrategias"] = estrategias
+        if data.get("debug"):
+            respuesta["debug"] = debug
+        
+        return _con_perfiles(respuesta, perfiles)
+    
+    except ColaLlena as e:
+        return _respuesta_cola_llena(e)
+    except PlazoVencido:
+        return _respuesta_plazo_vencido()
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e)}), 500
+
+
+@app.route("/api/v1/async/buscar_batch", methods=["POST"])
+async def buscar_batch_async():
+    """
+    Igual que /api/v1/buscar_batch, ejecutado en el pool acotado y con
+    "deadline_ms" opcional (mismos códigos 503/504 que /api/v1/async/buscar).
+    """
+    try:
+        pool_busqueda.verificar_lugar()
+        data = request.get_json()
+        
+        diccionario_nombre = data.get("diccionario")
+        definiciones = data.get("definiciones", [])
+        top_k = int(data.get("top_k", 10))
+        
+        if not diccionario_nombre or not definiciones:
+            return jsonify({
+                "ok": False, 
+                "error": "Faltan parámetros requeridos"
+            }), 400
+        
+        if len(definiciones) > MAX_DEFINICIONES_BATCH:
+            return jsonify({
+                "ok": False, 
+                "error": f"Máximo {MAX_DEFINICIONES_BATCH} definiciones por request"
+            }), 400
+        plazo, error = _plazo_request(data)
+        if error:
+            return error
+        
+        # Cargar diccionario (o la variante de ventana/decaimiento pedida)
+        dic, etiqueta, error = _diccionario_pedido(data, diccionario_nombre)
+        if error:
+            return error
+        
+        perfiles = []
+        resultados_lote = await pool_busqueda.ejecutar(
+            perfilado.ejecutar_perfilado,
+            f"buscar_batch {etiqueta}",
+            _perfil_pedido(),
+            perfiles,
+            dic["reverse_dict"].buscar_batch,
+            definiciones,
+            top_k=top_k,
+            plazo=plazo
+        )
+        
+        return _con_perfiles({
+            "ok": True,
+            "diccionario": diccionario_nombre,
+            "resultados": [
+                {
+                    "definicion": definicion,
+                    "palabras": [
+                        {"palabra": r[0], "score": round(float(r[1]), 4)} 
+                        for r in resultados
+                    ]
+                }
+                for definicion, resultados in zip(definiciones, resultados_lote)
+            ]
+        }, perfiles)
+    
+    except ColaLlena as e:
+        return _respuesta_cola_llena(e)
+    except PlazoVencido:
+        return _respuesta_plazo_vencido()
     except Exception as e:
         return jsonify({"ok": False, "error": str(e)}), 500
 
@@ -287,6 +856,84 @@ def health():
     })
 
 
+@app.route("/api/v1/ready", methods=["GET"])
+def ready():
+    """
+    Readiness para el balanceador: 503 mientras se precargan y calientan los
+    diccionarios, 200 cuando terminó (health sólo dice que el proceso vive).
+    
+    Respuesta:
+    {
+        "ok": true,
+        "cargados": ["corpus_medicina", ...],
+        "fallidos": [],
+        "pendientes": [],
+        "segundos": 12.4
+    }
+    """
+    estado = {
+        "cargados": list(estado_precarga["cargados"]),
+        "fallidos": list(estado_precarga["fallidos"]),
+        "pendientes": list(estado_precarga["pendientes"]),
+        "segundos": estado_precarga["segundos"]
+    }
+    if not precarga_lista.is_set():
+        return jsonify({"ok": False, "error": "Precargando diccionarios", **estado}), 503
+    return jsonify({"ok": True, **estado})
+
+
+@app.route("/api/v1/metrics", methods=["GET"])
+def metrics():
+    """Métricas del proceso en formato de texto de Prometheus."""
+    return Response(metricas.exportar_prometheus(), content_type=metricas.CONTENT_TYPE)
+
+
+# ============================================
+# ADMINISTRACIÓN (requiere X-Admin-Token)
+# ============================================
+
+@app.route("/api/v1/admin/perfiles", methods=["GET"])
+def admin_perfiles():
+    """
+    Lista los perfiles guardados (los pide X-Perfilar o el muestreo PERFIL_TASA).
+    
+    Respuesta:
+    {
+        "ok": true,
+        "perfiles": [
+            {"id": "...", "fecha": "...", "pid": 123, "duracion_ms": 840,
+             "etiqueta": "buscar-corpus_medicina", "bytes": 51234}
+        ]
+    }
+    """
+    if not perfilado.autorizado(request.headers, CONFIG.get("admin_token")):
+        return jsonify({"ok": False, "error": "No autorizado"}), 403
+    return jsonify({"ok": True, "perfiles": perfilado.listar()})
+
+
+@app.route("/api/v1/admin/perfiles/<id_perfil>", methods=["GET"])
+def admin_perfil(id_perfil):
+    """
+    Descarga un perfil: ?formato=pstats (por defecto, para pstats/snakeviz)
+    o ?formato=texto (resumen ordenado por tiempo acumulado; &orden=tottime).
+    """
+    if not perfilado.autorizado(request.headers, CONFIG.get("admin_token")):
+        return jsonify({"ok": False, "error": "No autorizado"}), 403
+    
+    ruta = perfilado.ruta(id_perfil)
+    if ruta is None:
+        return jsonify({"ok": False, "error": f"Perfil '{id_perfil}' no encontrado"}), 404
+    
+    if request.args.get("formato") == "texto":
+        orden = request.args.get("orden", "cumulative")
+        if orden not in ("cumulative", "tottime", "calls"):
+            return jsonify({"ok": False, "error": "orden debe ser cumulative, tottime o calls"}), 400
+        return Response(perfilado.como_texto(id_perfil, orden=orden),
+                        content_type="text/plain; charset=utf-8")
+    return send_file(os.path.abspath(ruta), mimetype="application/octet-stream",
+                     as_attachment=True, download_name=id_perfil + ".pstats")
+
+
 @app.route("/api/v1/docs", methods=["GET"])
 def docs():
     """Documentación de la API."""
@@ -296,8 +943,15 @@ def docs():
             "GET /api/v1/diccionarios": "Lista todos los diccionarios disponibles",
             "POST /api/v1/buscar": "Busca palabras basándose en una definición",
             "POST /api/v1/buscar_batch": "Busca múltiples definiciones",
+            "POST /api/v1/buscar_federado": "Busca una definición en varios diccionarios en paralelo",
+            "POST /api/v1/async/buscar": "Búsqueda en pool acotado con deadline_ms (503/504)",
+            "POST /api/v1/async/buscar_batch": "Búsqueda múltiple en pool acotado con deadline_ms",
             "GET /api/v1/info/<nombre>": "Información detallada de un diccionario",
-            "GET /api/v1/health": "Verifica que la API esté funcionando"
+            "GET /api/v1/health": "Verifica que la API esté funcionando",
+            "GET /api/v1/ready": "200 cuando terminó la precarga de diccionarios (503 antes)",
+            "GET /api/v1/metrics": "Métricas en formato Prometheus",
+            "GET /api/v1/admin/perfiles": "Perfiles guardados (X-Admin-Token)",
+            "GET /api/v1/admin/perfiles/<id>": "Descarga un perfil (.pstats o ?formato=texto)"
         },
         "ejemplos": {
             "buscar": {
@@ -325,23 +979,24 @@ if __name__ == "__main__":
     print("  • GET  /api/v1/diccionarios")
     print("  • POST /api/v1/buscar")
     print("  • POST /api/v1/buscar_batch")
+    print("  • POST /api/v1/buscar_federado")
+    print("  • POST /api/v1/async/buscar")
+    print("  • POST /api/v1/async/buscar_batch")
     print("  • GET  /api/v1/info/<nombre>")
     print("  • GET  /api/v1/health")
+    print("  • GET  /api/v1/ready")
+    print("  • GET  /api/v1/metrics")
+    print("  • GET  /api/v1/admin/perfiles")
     print("  • GET  /api/v1/docs")
     print("\n" + "=" * 60)
     
-    # Precargar diccionarios al inicio (opcional)
-    print("\nPrecargando diccionarios...")
-    index_path = os.path.join(GRAPH_DIR, "diccionarios_index.json")
-    if os.path.exists(index_path):
-        with open(index_path, "r", encoding="utf-8") as f:
-            index = json.load(f)
-        for dic in index[:3]:  # Precargar solo los primeros 3
-            nombre = dic["nombre"]
-            print(f"  • Cargando '{nombre}'...")
-            get_diccionario(nombre)
+    # Precargar en segundo plano: el servidor arranca enseguida y
+    # /api/v1/ready responde 503 hasta que termina (wsgi.py precarga antes del fork)
+    print("\nPrecargando diccionarios en segundo plano...")
+    threading.Thread(target=precargar_diccionarios, args=(diccionarios_configurados(),),
+                     name="precarga", daemon=True).start()
     
-    print("\n✓ API lista en http://localhost:5001")
+    print("\n✓ API en http://localhost:5001 (lista cuando /api/v1/ready responda 200)")
     print("=" * 60)
     
     app.run(debug=False, host="0.0.0.0", port=5001)
\ No newline at end of file
@@ -0,0 +1,614 @@
+# ============================================
+# router.py — reparte los diccionarios entre varios procesos de la API
+# - Cada shard es una API pública (gunicorn wsgi:api) que precarga sólo los
+#   diccionarios que le tocan, así la memoria total crece con los shards
+# - Hash consistente con nodos virtuales: cuando un shard entra o sale sólo
+#   cambian de dueño los diccionarios de su tramo del anillo
+# - Reenvía las búsquedas al shard dueño por HTTP local o socket Unix, con
+#   conexiones persistentes por hilo
+# - Verifica la salud de los shards: los caídos salen del anillo y vuelven
+#   al responder; los diccionarios que cambian de dueño se precargan
+#
+#   python router.py iniciar --shards 4 --puerto 5001         # shards locales + router
+#   python router.py iniciar --shards 4 --unix                # shards en sockets Unix
+#   ROUTER_SHARDS="a=http://10.0.0.2:5001,b=unix:/run/b.sock" \
+#       gunicorn -b 0.0.0.0:5001 "router:crear_app()"
+# ============================================
+
+import argparse
+import bisect
+import hashlib
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from flask import Flask, Response, jsonify, request
+
+from catalogo import Catalogo
+import metricas
+
+# El mismo directorio que c3.GRAPH_DIR; el router no importa c3 (ni spaCy)
+GRAPH_DIR = "data/grafos"
+DIR_ROUTER = os.path.join("data", "router")
+
+# Headers del cliente que se pasan al shard
+HEADERS_REENVIADOS = ("Content-Type", "Accept", "X-Perfilar", "X-Admin-Token")
+# Headers de la respuesta del shard que se devuelven al cliente
+HEADERS_RESPUESTA = ("Retry-After", "X-Perfil")
+
+reenvios = metricas.contador("router_reenvios_total", "Requests reenviados a cada shard")
+fallos_shard = metricas.contador("router_fallos_total", "Requests que un shard no pudo atender")
+
+
+class AnilloConsistente:
+    """
+    Anillo de hash consistente: cada miembro ocupa `replicas` posiciones
+    (nodos virtuales) y una clave pertenece al primer miembro que aparece
+    después de su hash. Agregar o quitar un miembro sólo mueve las claves
+    de los tramos que ganó o perdió (~1/n del total).
+    """
+
+    def __init__(self, replicas=100):
+        self.replicas = replicas
+        self._posiciones = []  # ordenadas
+        self._duenos = {}      # posición -> miembro
+        self.miembros = set()
+
+    @staticmethod
+    def _hash(clave):
+        return int.from_bytes(hashlib.md5(clave.encode("utf-8")).digest()[:8], "big")
+
+    def agregar(self, miembro):
+        if miembro in self.miembros:
+            return
+        self.miembros.add(miembro)
+        for i in range(self.replicas):
+            posicion = self._hash(f"{miembro}#{i}")
+            if posicion not in self._duenos:
+                bisect.insort(self._posiciones, posicion)
+            self._duenos[posicion] = miembro
+
+    def quitar(self, miembro):
+        if miembro not in self.miembros:
+            return
+        self.miembros.discard(miembro)
+        for i in range(self.replicas):
+            posicion = self._hash(f"{miembro}#{i}")
+            if self._duenos.get(posicion) == miembro:
+                del self._duenos[posicion]
+                self._posiciones.pop(bisect.bisect_left(self._posiciones, posicion))
+
+    def asignar(self, clave):
+        """Miembro dueño de la clave (None si el anillo está vacío)."""
+        if not self._posiciones:
+            return None
+        i = bisect.bisect(self._posiciones, self._hash(clave)) % len(self._posiciones)
+        return self._duenos[self._posiciones[i]]
+
+    def reparto(self, claves):
+        """{miembro: [claves]} para todos los miembros (también los que no reciben ninguna)."""
+        reparto = {m: [] for m in sorted(self.miembros)}
+        for clave in claves:
+            miembro = self.asignar(clave)
+            if miembro is not None:
+                reparto[miembro].append(clave)
+        return reparto
+
+
+# --------------------------------------------
+# SHARDS
+# --------------------------------------------
+
+class ConexionUnix(http.client.HTTPConnection):
+    """HTTPConnection sobre un socket Unix."""
+
+    def __init__(self, ruta, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.ruta = ruta
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.ruta)
+
+
+class Shard:
+    """
+    Un proceso de la API. direccion es "http://host:puerto" o "unix:/ruta.sock".
+    Cada hilo del router mantiene su propia conexión persistente al shard.
+    """
+
+    def __init__(self, id_shard, direccion, timeout=60):
+        self.id = id_shard
+        self.direccion = direccion
+        self.timeout = timeout
+        self.fallos = 0
+        self._local = threading.local()
+
+    def _conexion(self):
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            if self.direccion.startswith("unix:"):
+                conexion = ConexionUnix(self.direccion[len("unix:"):], timeout=self.timeout)
+            else:
+                destino = self.direccion.split("://", 1)[-1].rstrip("/")
+                conexion = http.client.HTTPConnection(destino, timeout=self.timeout)
+            self._local.conexion = conexion
+        return conexion
+
+    def pedir(self, metodo, ruta, cuerpo=None, headers=None, timeout=None):
+        """
+        Hace el request y devuelve (status, headers, cuerpo). Si la conexión
+        persistente se había cerrado del otro lado se reintenta una vez con
+        una nueva (las búsquedas no tienen efectos, repetirlas es seguro).
+        Lanza OSError o http.client.HTTPException si el shard no responde.
+        """
+        for intento in range(2):
+            conexion = self._conexion()
+            conexion.timeout = timeout or self.timeout
+            if conexion.sock is not None:
+                conexion.sock.settimeout(conexion.timeout)
+            try:
+                conexion.request(metodo, ruta, body=cuerpo, headers=headers or {})
+                respuesta = conexion.getresponse()
+                datos = respuesta.read()
+                return respuesta.status, dict(respuesta.getheaders()), datos
+            except (OSError, http.client.HTTPException):
+                conexion.close()
+                self._local.conexion = None
+                if intento:
+                    raise
+
+    def pedir_json(self, metodo, ruta, datos=None, timeout=None):
+        cuerpo = json.dumps(datos).encode("utf-8") if datos is not None else None
+        status, _, respuesta = self.pedir(metodo, ruta, cuerpo,
+                                          {"Content-Type": "application/json"}, timeout)
+        return status, json.loads(respuesta) if respuesta else None
+
+    def sano(self):
+        try:
+            status, _ = self.pedir_json("GET", "/api/v1/health", timeout=2)
+            return status == 200
+        except (OSError, http.client.HTTPException, ValueError):
+            return False
+
+
+# --------------------------------------------
+# ROUTER
+# --------------------------------------------
+
+class Router:
+    """
+    Mapea nombres de diccionario a shards con un AnilloConsistente.
+    En el anillo sólo están los shards sanos; un shard que falla
+    `max_fallos` verificaciones seguidas (o un request) sale del anillo y
+    sus diccionarios pasan a los demás hasta que vuelva a responder.
+    """
+
+    def __init__(self, shards, replicas=100, max_fallos=2):
+        self.shards = {s.id: s for s in shards}
+        self.anillo = AnilloConsistente(replicas)
+        self.max_fallos = max_fallos
+        self.catalogo = Catalogo(GRAPH_DIR)
+        self._lock = threading.Lock()
+        self._precarga = ThreadPoolExecutor(max_workers=2, thread_name_prefix="precarga")
+        for shard in shards:
+            self.anillo.agregar(shard.id)
+
+    def nombres(self):
+        return [d["nombre"] for d in self.catalogo.listar()]
+
+    def shard_para(self, nombre):
+        with self._lock:
+            id_shard = self.anillo.asignar(nombre)
+        return self.shards.get(id_shard)
+
+    def reparto(self, nombres=None):
+        with self._lock:
+            return self.anillo.reparto(self.nombres() if nombres is None else nombres)
+
+    # -------- membresía --------
+
+    def _cambiar(self, cambio):
+        """Aplica cambio() al anillo y precarga los diccionarios que cambiaron de dueño."""
+        nombres = self.nombres()
+        with self._lock:
+            antes = {n: self.anillo.asignar(n) for n in nombres}
+            cambio()
+            despues = {n: self.anillo.asignar(n) for n in nombres}
+        movidos = [n for n in nombres if antes[n] != despues[n] and despues[n] is not None]
+        for nombre in movidos:
+            print(f"Router: '{nombre}' pasa de {antes[nombre]} a {despues[nombre]}")
+            self._precarga.submit(self._precargar, self.shards[despues[nombre]], nombre)
+        return movidos
+
+    def _precargar(self, shard, nombre):
+        # /api/v1/info carga el diccionario en el shard si todavía no lo tiene
+        try:
+            shard.pedir("GET", "/api/v1/info/" + _ruta_nombre(nombre), timeout=600)
+        except (OSError, http.client.HTTPException) as e:
+            print(f"Router: no se pudo precargar '{nombre}' en {shard.id}: {e}")
+
+    def agregar_shard(self, shard):
+        self.shards[shard.id] = shard
+        shard.fallos = 0
+        return self._cambiar(lambda: self.anillo.agregar(shard.id))
+
+    def quitar_shard(self, id_shard, olvidar=False):
+        movidos = self._cambiar(lambda: self.anillo.quitar(id_shard))
+        if olvidar:
+            self.shards.pop(id_shard, None)
+        return movidos
+
+    def marcar_fallo(self, shard):
+        shard.fallos += 1
+        fallos_shard.inc(shard=shard.id)
+        if shard.fallos >= self.max_fallos and shard.id in self.anillo.miembros:
+            print(f"Router: {shard.id} no responde; sale del anillo")
+            self.quitar_shard(shard.id)
+
+    def verificar(self):
+        """Una ronda de verificación de salud de todos los shards conocidos."""
+        for shard in list(self.shards.values()):
+            if shard.sano():
+                shard.fallos = 0
+                if shard.id not in self.anillo.miembros:
+                    print(f"Router: {shard.id} responde; vuelve al anillo")
+                    self.agregar_shard(shard)
+            else:
+                self.marcar_fallo(shard)
+
+    def iniciar_verificacion(self, intervalo=2.0):
+        def bucle():
+            while True:
+                time.sleep(intervalo)
+                self.verificar()
+        threading.Thread(target=bucle, name="verificacion", daemon=True).start()
+
+    # -------- reenvío --------
+
+    def reenviar(self, nombre, metodo, ruta, cuerpo=None, headers=None):
+        """
+        Reenvía el request al dueño de `nombre`. Si el shard no responde se
+        marca el fallo y se intenta una vez con el dueño siguiente del anillo.
+        Devuelve (status, headers, cuerpo) o None si no hay shard disponible.
+        """
+        for _ in range(2):
+            shard = self.shard_para(nombre)
+            if shard is None:
+                return None
+            try:
+                reenvios.inc(shard=shard.id)
+                return shard.pedir(metodo, ruta, cuerpo, headers)
+            except (OSError, http.client.HTTPException):
+                self.marcar_fallo(shard)
+                # Un fallo en un request saca al shard de inmediato
+                if shard.id in self.anillo.miembros:
+                    self.quitar_shard(shard.id)
+        return None
+
+
+def _ruta_nombre(nombre):
+    return quote(nombre, safe="")
+
+
+def shards_desde_texto(texto):
+    """"a=http://h:5001,b=unix:/run/b.sock" (o sólo direcciones) -> [Shard]."""
+    shards = []
+    for i, parte in enumerate(p.strip() for p in texto.split(",") if p.strip()):
+        id_shard, _, direccion = parte.partition("=") if "=" in parte.split(":", 1)[0] else ("", "", parte)
+        shards.append(Shard(id_shard or f"shard-{i}", direccion))
+    return shards
+
+
+# ============================================
+# APP DEL ROUTER
+# ============================================
+
+def crear_app(router=None):
+    """
+    App Flask del router. Sin router se arma desde ROUTER_SHARDS (ver
+    shards_desde_texto) y arranca su propia verificación de salud; varios
+    workers de gunicorn llegan al mismo reparto porque el anillo es determinista.
+    """
+    if router is None:
+        router = Router(shards_desde_texto(os.environ["ROUTER_SHARDS"]),
+                        replicas=int(os.getenv("ROUTER_REPLICAS", "100")))
+        router.iniciar_verificacion(float(os.getenv("ROUTER_VERIFICACION", "2")))
+
+    app = Flask(__name__)
+    app.config["router"] = router
+
+    def _headers_entrada():
+        return {h: request.headers[h] for h in HEADERS_REENVIADOS if h in request.headers}
+
+    def _respuesta(resultado):
+        if resultado is None:
+            return jsonify({"ok": False, "error": "No hay shards disponibles"}), 503
+        status, headers, cuerpo = resultado
+        respuesta = Response(cuerpo, status=status,
+                             content_type=headers.get("Content-Type", "application/json"))
+        for h in HEADERS_RESPUESTA:
+            if h in headers:
+                respuesta.headers[h] = headers[h]
+        return respuesta
+
+    def _por_diccionario(ruta):
+        cuerpo = request.get_data()
+        try:
+            nombre = json.loads(cuerpo or b"{}").get("diccionario")
+        except ValueError:
+            return jsonify({"ok": False, "error": "Body JSON inválido"}), 400
+        if not nombre:
+            return jsonify({"ok": False, "error": "Falta el parámetro 'diccionario'"}), 400
+        return _respuesta(router.reenviar(nombre, "POST", ruta, cuerpo, _headers_entrada()))
+
+    @app.route("/api/v1/buscar", methods=["POST"])
+    def buscar():
+        return _por_diccionario("/api/v1/buscar")
+
+    @app.route("/api/v1/buscar_batch", methods=["POST"])
+    def buscar_batch():
+        return _por_diccionario("/api/v1/buscar_batch")
+
+    @app.route("/api/v1/async/buscar", methods=["POST"])
+    def buscar_async():
+        return _por_diccionario("/api/v1/async/buscar")
+
+    @app.route("/api/v1/async/buscar_batch", methods=["POST"])
+    def buscar_batch_async():
+        return _por_diccionario("/api/v1/async/buscar_batch")
+
+    @app.route("/api/v1/info/<nombre>", methods=["GET"])
+    def info(nombre):
+        return _respuesta(router.reenviar(nombre, "GET", "/api/v1/info/" + _ruta_nombre(nombre)))
+
+    @app.route("/api/v1/diccionarios", methods=["GET"])
+    def diccionarios():
+        """Como en public_api, con el shard de cada diccionario (consultados en paralelo)."""
+        def uno(nombre):
+            resultado = router.reenviar(nombre, "GET", "/api/v1/info/" + _ruta_nombre(nombre))
+            if resultado is None or resultado[0] != 200:
+                return None
+            info = json.loads(resultado[2])
+            shard = router.shard_para(nombre)
+            return {"nombre": nombre, "nodos": info["nodos"], "aristas": info["aristas"],
+                    "shard": shard.id if shard else None}
+
+        nombres = router.nombres()
+        with ThreadPoolExecutor(max_workers=max(1, min(8, len(nombres)))) as pool:
+            resultado = [d for d in pool.map(uno, nombres) if d is not None]
+        return jsonify({"ok": True, "diccionarios": resultado})
+
+    @app.route("/api/v1/buscar_federado", methods=["POST"])
+    def buscar_federado():
+        """
+        Divide los diccionarios por shard, manda a cada uno su parte de la
+        búsqueda federada y mezcla los top-k (los scores ya vienen normalizados).
+        """
+        data = request.get_json(silent=True) or {}
+        nombres = list(dict.fromkeys(data.get("diccionarios") or router.nombres()))
+        top_k = int(data.get("top_k", 10))
+        grupos = [(router.shards[id_shard], grupo)
+                  for id_shard, grupo in router.reparto(nombres).items() if grupo]
+        if not grupos:
+            return jsonify({"ok": False, "error": "No hay shards disponibles"}), 503
+
+        def parte(shard_y_grupo):
+            shard, grupo = shard_y_grupo
+            try:
+                return shard.pedir_json("POST", "/api/v1/buscar_federado",
+                                        dict(data, diccionarios=grupo))
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                router.marcar_fallo(shard)
+                return None, {"error": str(e)}
+
+        with ThreadPoolExecutor(max_workers=len(grupos)) as pool:
+            partes = list(pool.map(parte, grupos))
+
+        orden = {nombre: i for i, nombre in enumerate(nombres)}
+        resultados, estado = [], {}
+        for (_, grupo), (status, respuesta) in zip(grupos, partes):
+            if status == 200:
+                resultados.extend(respuesta["resultados"])
+                estado.update(respuesta["diccionarios"])
+            else:
+                error = (respuesta or {}).get("error", "shard no disponible")
+                estado.update({nombre: {"error": error} for nombre in grupo})
+        if all(status != 200 for status, _ in partes):
+            # Ningún shard pudo: se devuelve el error del primero (400, 404, 504...)
+            status, respuesta = partes[0]
+            return jsonify({"ok": False, "error": (respuesta or {}).get("error", "shard no disponible")}), \
+                status or 502
+
+        # Mismo desempate que servicio.buscar_federado: orden de los diccionarios pedidos
+        resultados.sort(key=lambda r: (-r["score"], orden.get(r["diccionario"], len(orden))))
+        return jsonify({
+            "ok": True,
+            "definicion": data.get("definicion", "").strip(),
+            "resultados": resultados[:top_k],
+            "diccionarios": estado
+        })
+
+    @app.route("/api/v1/health", methods=["GET"])
+    def health():
+        activos = len(router.anillo.miembros)
+        return jsonify({
+            "ok": activos > 0,
+            "status": "running" if activos else "sin shards",
+            "shards_activos": activos
+        }), 200 if activos else 503
+
+    @app.route("/api/v1/metrics", methods=["GET"])
+    def metrics():
+        return Response(metricas.exportar_prometheus(), content_type=metricas.CONTENT_TYPE)
+
+    @app.route("/api/v1/router", methods=["GET"])
+    def estado():
+        """Shards conocidos, si están en el anillo y qué diccionarios tienen asignados."""
+        reparto = router.reparto()
+        return jsonify({
+            "ok": True,
+            "shards": [
+                {"id": s.id, "direccion": s.direccion, "activo": s.id in router.anillo.miembros,
+                 "diccionarios": reparto.get(s.id, [])}
+                for s in router.shards.values()
+            ]
+        })
+
+    @app.route("/api/v1/router/shards", methods=["POST"])
+    def agregar_shard():
+        """Agrega un shard ({"id": "...", "direccion": "..."}); requiere X-Admin-Token."""
+        if not _autorizado():
+            return jsonify({"ok": False, "error": "No autorizado"}), 403
+        data = request.get_json(silent=True) or {}
+        if not data.get("id") or not data.get("direccion"):
+            return jsonify({"ok": False, "error": "Faltan 'id' y 'direccion'"}), 400
+        movidos = router.agregar_shard(Shard(data["id"], data["direccion"]))
+        return jsonify({"ok": True, "movidos": movidos})
+
+    @app.route("/api/v1/router/shards/<id_shard>", methods=["DELETE"])
+    def quitar_shard(id_shard):
+        """Saca un shard del anillo; sus diccionarios pasan a los demás."""
+        if not _autorizado():
+            return jsonify({"ok": False, "error": "No autorizado"}), 403
+        if id_shard not in router.shards:
+            return jsonify({"ok": False, "error": f"Shard '{id_shard}' no encontrado"}), 404
+        return jsonify({"ok": True, "movidos": router.quitar_shard(id_shard, olvidar=True)})
+
+    def _autorizado():
+        token = os.getenv("ADMIN_TOKEN")
+        return bool(token) and request.headers.get("X-Admin-Token") == token
+
+    return app
+
+
+# ============================================
+# SHARDS LOCALES (python router.py iniciar)
+# ============================================
+
+class ShardLocal:
+    """Un shard lanzado como proceso gunicorn propio (wsgi:api) en esta máquina."""
+
+    def __init__(self, shard, workers=1):
+        self.shard = shard
+        self.workers = workers
+        self.proceso = None
+
+    def bind(self):
+        if self.shard.direccion.startswith("unix:"):
+            return self.shard.direccion
+        return self.shard.direccion.split("://", 1)[-1]
+
+    def lanzar(self, diccionarios):
+        if self.shard.direccion.startswith("unix:"):
+            ruta = self.shard.direccion[len("unix:"):]
+            if os.path.exists(ruta):
+                os.unlink(ruta)
+        env = dict(os.environ, BIND=self.bind(), WORKERS=str(self.workers),
+                   PIDFILE=os.path.join(DIR_ROUTER, f"{self.shard.id}.pid"),
+                   # "," = lista vacía: el shard no precarga nada (no "todos")
+                   DICCIONARIOS_PRECARGA=",".join(diccionarios) or ",")
+        self.proceso = subprocess.Popen(["gunicorn", "-c", "gunicorn.conf.py", "wsgi:api"], env=env)
+        print(f"Router: {self.shard.id} en {self.shard.direccion} con {len(diccionarios)} "
+              f"diccionarios (pid {self.proceso.pid})")
+
+    def vivo(self):
+        return self.proceso is not None and self.proceso.poll() is None
+
+    def terminar(self):
+        if self.vivo():
+            self.proceso.terminate()
+            self.proceso.wait()
+
+
+def iniciar_local(n_shards, puerto, unix=False, workers=1, host="0.0.0.0", espera=300):
+    """Lanza n_shards shards locales, los supervisa y sirve el router en `puerto`."""
+    from werkzeug.serving import make_server
+
+    os.makedirs(DIR_ROUTER, exist_ok=True)
+    shards = [
+        Shard(f"shard-{i}", f"unix:{os.path.abspath(os.path.join(DIR_ROUTER, f'shard-{i}.sock'))}"
+              if unix else f"http://127.0.0.1:{puerto + 1 + i}")
+        for i in range(n_shards)
+    ]
+    router = Router(shards)
+    reparto = router.reparto()
+    locales = {s.id: ShardLocal(s, workers) for s in shards}
+    for id_shard, local in locales.items():
+        local.lanzar(reparto[id_shard])
+
+    def supervisar():
+        # Un shard que terminó sale del anillo y se relanza con su parte del reparto completo
+        while True:
+            time.sleep(1.0)
+            for id_shard, local in locales.items():
+                if not local.vivo():
+                    if id_shard in router.anillo.miembros:
+                        print(f"Router: {id_shard} terminó; se relanza")
+                        router.quitar_shard(id_shard)
+                    completo = AnilloConsistente(router.anillo.replicas)
+                    for s in locales:
+                        completo.agregar(s)
+                    local.lanzar(completo.reparto(router.nombres())[id_shard])
+
+    def terminar(*_):
+        for local in locales.values():
+            local.terminar()
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, terminar)
+
+    # Mientras precargan, los shards no responden: se espera a que arranquen
+    # todos antes de verificar, para no sacarlos del anillo y reasignar sus diccionarios
+    limite = time.time() + espera
+    pendientes = set(locales)
+    while pendientes and time.time() < limite:
+        pendientes = {i for i in pendientes if not router.shards[i].sano()}
+        time.sleep(0.5)
+    if pendientes:
+        print(f"Router: sin respuesta de {', '.join(sorted(pendientes))}; se sigue con los demás")
+
+    threading.Thread(target=supervisar, name="supervisor", daemon=True).start()
+    router.iniciar_verificacion()
+
+    servidor = make_server(host, puerto, crear_app(router), threaded=True)
+    print(f"✓ Router en http://localhost:{puerto} con {n_shards} shards")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        terminar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Router de diccionarios entre shards de la API")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_iniciar = sub.add_parser("iniciar", help="Lanza shards locales y sirve el router")
+    p_iniciar.add_argument("--shards", type=int, default=2)
+    p_iniciar.add_argument("--puerto", type=int, default=5001,
+                           help="Puerto del router; los shards HTTP usan los siguientes")
+    p_iniciar.add_argument("--unix", action="store_true", help="Shards en sockets Unix (data/router)")
+    p_iniciar.add_argument("--workers", type=int, default=1, help="Workers de gunicorn por shard")
+
+    p_reparto = sub.add_parser("reparto", help="Muestra qué diccionarios tocan a cada shard")
+    p_reparto.add_argument("--shards", type=int, default=2)
+
+    args = parser.parse_args()
+    if args.comando == "iniciar":
+        iniciar_local(args.shards, args.puerto, args.unix, args.workers)
+    else:
+        anillo = AnilloConsistente()
+        for i in range(args.shards):
+            anillo.agregar(f"shard-{i}")
+        nombres = [d["nombre"] for d in Catalogo(GRAPH_DIR).listar()]
+        for id_shard, asignados in anillo.reparto(nombres).items():
+            print(f"{id_shard}: {', '.join(asignados) or '-'}")
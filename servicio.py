@@ -0,0 +1,371 @@
+# ============================================
+# servicio.py — capa de servicio compartida por app.py y public_api.py
+# - Pool acotado para lematización + scoring fuera del hilo del request
+# - Control de admisión (cola máxima -> 503 con Retry-After)
+# - Coalescencia (single-flight) de búsquedas idénticas en vuelo
+# - Búsqueda federada: una definición en varios diccionarios en paralelo
+# - Exportaciones (GraphML/GEXF) en segundo plano
+# ============================================
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+
+from c3 import BusquedaParcial, Plazo, PlazoVencido, exportar_grafo, exportacion_vigente
+import metricas
+
+busquedas_ejecutadas = metricas.contador(
+    "busquedas_ejecutadas_total", "Búsquedas calculadas (líderes de coalescencia)")
+busquedas_coalescidas = metricas.contador(
+    "busquedas_coalescidas_total", "Búsquedas que reutilizaron una búsqueda idéntica en vuelo")
+
+
+class ColaLlena(Exception):
+    """El pool de búsqueda no admite más trabajo; el cliente debe reintentar."""
+
+    def __init__(self, reintentar_en):
+        super().__init__(f"Cola de búsqueda llena; reintentar en {reintentar_en} s")
+        self.reintentar_en = reintentar_en
+
+
+class PoolBusqueda:
+    """
+    Ejecutor acotado para búsquedas.
+    - hilos: búsquedas en paralelo (spaCy, NumPy y SciPy liberan el GIL en buena parte)
+    - max_cola: trabajos que pueden esperar; por encima se rechaza con ColaLlena
+    Un trabajo cuyo plazo venció mientras esperaba en la cola no se ejecuta, y uno
+    en curso se corta en la siguiente etapa (ver Plazo.verificar en c3).
+    """
+
+    def __init__(self, hilos=4, max_cola=32):
+        self.hilos = hilos
+        self.max_pendientes = hilos + max_cola
+        self._executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="busqueda")
+        self._lock = threading.Lock()
+        self._pendientes = 0
+        self._duracion_media = 0.1  # media exponencial de la duración de cada trabajo (s)
+
+    @property
+    def pendientes(self):
+        return self._pendientes
+
+    def reintentar_en(self):
+        """Segundos estimados hasta que la cola tenga lugar (valor de Retry-After)."""
+        espera = self._duracion_media * self._pendientes / self.hilos
+        return max(1, math.ceil(espera))
+
+    def verificar_lugar(self):
+        """
+        Lanza ColaLlena si ya no hay lugar, sin reservarlo: permite rechazar un
+        request antes de que haga trabajo bloqueante (p. ej. cargar el
+        diccionario). La reserva es la de enviar().
+        """
+        if self._pendientes >= self.max_pendientes:
+            raise ColaLlena(self.reintentar_en())
+
+    def _admitir(self):
+        with self._lock:
+            if self._pendientes >= self.max_pendientes:
+                raise ColaLlena(self.reintentar_en())
+            self._pendientes += 1
+
+    def _liberar(self, _future=None):
+        with self._lock:
+            self._pendientes -= 1
+
+    def _ejecutar_con_plazo(self, fn, args, kwargs, plazo):
+        # Trabajo viejo: su request ya respondió (o está por hacerlo) con timeout
+        plazo.verificar()
+        inicio = time.perf_counter()
+        try:
+            return fn(*args, plazo=plazo, **kwargs)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self._duracion_media = 0.8 * self._duracion_media + 0.2 * duracion
+
+    def enviar(self, fn, *args, plazo=None, **kwargs):
+        """Encola fn(*args, plazo=plazo, **kwargs); lanza ColaLlena si no hay lugar."""
+        plazo = plazo or Plazo()
+        self._admitir()
+        try:
+            future = self._executor.submit(self._ejecutar_con_plazo, fn, args, kwargs, plazo)
+        except Exception:
+            self._liberar()
+            raise
+        # El lugar se libera cuando el trabajo termina de verdad, no cuando el request se rinde
+        future.add_done_callback(self._liberar)
+        return future
+
+    async def ejecutar(self, fn, *args, plazo=None, **kwargs):
+        """Versión async de enviar(): espera el resultado sin bloquear el event loop."""
+        plazo = plazo or Plazo()
+        future = self.enviar(fn, *args, plazo=plazo, **kwargs)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=plazo.restante())
+        except asyncio.TimeoutError:
+            # Si aún no empezó, no se ejecutará; si ya corre, se corta en la siguiente etapa
+            future.cancel()
+            raise PlazoVencido()
+
+
+# Pool compartido por el proceso (en producción, uno por worker de gunicorn)
+pool_busqueda = PoolBusqueda(
+    hilos=int(os.getenv("POOL_HILOS", "4")),
+    max_cola=int(os.getenv("POOL_MAX_COLA", "32")),
+)
+
+
+# --------------------------------------------
+# COALESCENCIA DE BÚSQUEDAS IDÉNTICAS
+# --------------------------------------------
+
+class SingleFlight:
+    """
+    Agrupa llamadas concurrentes con la misma clave: la primera (líder) calcula
+    y las demás esperan y comparten su resultado (o su excepción).
+    Sólo se agrupan llamadas simultáneas; no es un cache.
+    Cada llamada espera con su propio plazo. fn corre con el plazo del líder:
+    si el líder se corta por PlazoVencido, las que esperaban y todavía tienen
+    tiempo no heredan la excepción sino que vuelven a intentar (una pasa a
+    ser líder y calcula con su propio fn y su plazo).
+    compartido (p. ej. una BusquedaParcial) se publica con el vuelo del líder:
+    el de cada llamada que espera lo sigue (compartido.seguir).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._en_vuelo = {}
+
+    def hacer(self, clave, fn, plazo=None, compartido=None):
+        plazo = plazo or Plazo()
+        while True:
+            with self._lock:
+                future = self._en_vuelo.get(clave)
+                lider = future is None
+                if lider:
+                    future = Future()
+                    future.compartido = compartido
+                    self._en_vuelo[clave] = future
+            if compartido is not None:
+                compartido.seguir(None if lider else future.compartido)
+            if lider:
+                break
+
+            busquedas_coalescidas.inc()
+            try:
+                resultado = future.result(timeout=plazo.restante())
+                # El desglose de este request muestra las etapas que midió el líder
+                metricas.marcar_coalescida(getattr(future, "etapas", {}))
+                return resultado
+            except FutureTimeout:
+                raise PlazoVencido()
+            except PlazoVencido:
+                # Venció el plazo del líder, no necesariamente el de esta llamada
+                plazo.verificar()
+
+        busquedas_ejecutadas.inc()
+        try:
+            with metricas.desglose_parcial() as etapas:
+                resultado = fn()
+        except BaseException as e:
+            self._aterrizar(clave)
+            future.set_exception(e)
+            raise
+        self._aterrizar(clave)
+        future.etapas = etapas
+        future.set_result(resultado)
+        return resultado
+
+    def _aterrizar(self, clave):
+        # Antes de publicar el resultado: quien reintente no debe encontrar este vuelo
+        with self._lock:
+            del self._en_vuelo[clave]
+
+
+vuelos_busqueda = SingleFlight()
+
+
+def clave_consulta(diccionario, definicion_limpia, lemas, top_k):
+    """
+    Clave normalizada de una búsqueda: dos definiciones con los mismos lemas y
+    los mismos términos (sin importar el orden) dan exactamente el mismo resultado,
+    porque PageRank, propagación y intermediación sólo usan el conjunto de lemas
+    y TF-IDF sólo las frecuencias de los términos.
+    """
+    terminos = tuple(sorted(Counter(definicion_limpia.split()).items()))
+    return (diccionario, tuple(sorted(set(lemas))), terminos, top_k)
+
+
+def buscar_coalescido(diccionario, reverse_dict, definicion, top_k=15, plazo=None):
+    """buscar_multiple_estrategias con coalescencia por (diccionario, lemas, top_k)."""
+    definicion_limpia, lemas = reverse_dict.processor.procesar_consulta(definicion)
+    clave = clave_consulta(diccionario, definicion_limpia, lemas, top_k)
+    return vuelos_busqueda.hacer(
+        clave,
+        lambda: reverse_dict.buscar_desde_lemas(definicion_limpia, lemas, top_k=top_k, plazo=plazo),
+        plazo=plazo,
+    )
+
+
+def buscar_progresivo_coalescido(diccionario, reverse_dict, definicion, top_k=15,
+                                 presupuesto=None, plazo=None, parcial=None):
+    """
+    ReverseDict.buscar_progresivo con coalescencia; sólo se agrupan búsquedas
+    con el mismo presupuesto. Devuelve (resultados, estrategias).
+    parcial (BusquedaParcial) va recibiendo los scores de la búsqueda, propia o
+    del líder, para quien deje de esperarla (ver /api/v1/async/buscar).
+    """
+    presupuesto = presupuesto or Plazo()
+    parcial = parcial or BusquedaParcial()
+    definicion_limpia, lemas = reverse_dict.processor.procesar_consulta(definicion)
+    clave = clave_consulta(diccionario, definicion_limpia, lemas, top_k) + ("progresivo", presupuesto.segundos)
+    return vuelos_busqueda.hacer(
+        clave,
+        lambda: reverse_dict.buscar_progresivo(
+            definicion_limpia, lemas, top_k=top_k, plazo=plazo, presupuesto=presupuesto,
+            parcial=parcial),
+        plazo=plazo,
+        compartido=parcial,
+    )
+
+
+# --------------------------------------------
+# BÚSQUEDA FEDERADA
+# --------------------------------------------
+
+# Hilos propios: una búsqueda federada que corre dentro de pool_busqueda no
+# debe esperar lugar en ese mismo pool
+pool_federado = ThreadPoolExecutor(
+    max_workers=int(os.getenv("FEDERADO_HILOS", "8")), thread_name_prefix="federado")
+
+
+def _buscar_en_diccionario(nombre, reverse_dict, definicion_limpia, lemas, top_k, plazo):
+    """Búsqueda normalizada en un diccionario; devuelve (resultados, ms)."""
+    plazo.verificar()
+    inicio = time.perf_counter()
+    clave = clave_consulta(("federado", nombre), definicion_limpia, lemas, top_k)
+    resultados = vuelos_busqueda.hacer(
+        clave,
+        lambda: reverse_dict.buscar_desde_lemas(
+            definicion_limpia, lemas, top_k=top_k, plazo=plazo, normalizar=True),
+        plazo=plazo,
+    )
+    return resultados, (time.perf_counter() - inicio) * 1000
+
+
+def buscar_federado(diccionarios, definicion, top_k=10, plazo=None):
+    """
+    Busca una definición en varios diccionarios a la vez.
+    diccionarios es una lista de (nombre, reverse_dict). La definición se
+    lematiza una sola vez (el procesador es el mismo en todos) y cada
+    diccionario calcula su top-k en paralelo con scores normalizados
+    (ReverseDict.buscar_desde_lemas con normalizar=True), que se mezclan en un top-k global.
+
+    Devuelve (resultados, estado): resultados es [(palabra, diccionario, score)]
+    y estado {nombre: {"ms": ..., "resultados": n} o {"error": "..."}}. Un
+    diccionario que falla o no termina dentro del plazo sólo queda fuera de
+    la mezcla; si no respondió ninguno por el plazo se lanza PlazoVencido.
+    """
+    plazo = plazo or Plazo()
+    if not diccionarios:
+        return [], {}
+
+    with metricas.medir("lemmatize"):
+        definicion_limpia, lemas = diccionarios[0][1].processor.procesar_consulta(definicion)
+
+    futuros = {
+        nombre: pool_federado.submit(
+            _buscar_en_diccionario, nombre, reverse_dict, definicion_limpia, lemas, top_k, plazo)
+        for nombre, reverse_dict in diccionarios
+    }
+    wait(list(futuros.values()), timeout=plazo.restante())
+
+    candidatos, estado = [], {}
+    vencidos = 0
+    for orden, (nombre, futuro) in enumerate(futuros.items()):
+        if not futuro.done():
+            # Si ya corre, se corta en la siguiente etapa (Plazo.verificar)
+            futuro.cancel()
+            estado[nombre] = {"error": "plazo vencido"}
+            vencidos += 1
+            continue
+        try:
+            resultados, ms = futuro.result()
+        except PlazoVencido:
+            estado[nombre] = {"error": "plazo vencido"}
+            vencidos += 1
+            continue
+        except Exception as e:
+            estado[nombre] = {"error": str(e)}
+            continue
+        estado[nombre] = {"ms": round(ms, 1), "resultados": len(resultados)}
+        candidatos.extend((-score, orden, i, palabra, nombre)
+                          for i, (palabra, score) in enumerate(resultados))
+
+    if vencidos == len(futuros):
+        raise PlazoVencido()
+
+    # Empates: se respeta el orden de los diccionarios pedidos y el de cada top-k
+    candidatos.sort()
+    return [(palabra, nombre, -score) for score, _, _, palabra, nombre in candidatos[:top_k]], estado
+
+
+# --------------------------------------------
+# EXPORTACIONES EN SEGUNDO PLANO
+# --------------------------------------------
+
+class ExportadorGrafos:
+    """
+    Ejecuta exportar_grafo en un hilo aparte, de a una exportación por vez.
+    Pedir una exportación que ya está en curso devuelve el mismo Future.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="exportacion")
+        self._lock = threading.Lock()
+        self._en_curso = {}
+        self._errores = {}
+
+    def solicitar(self, nombre, formato, grafo=None):
+        """Encola la exportación si hace falta; devuelve su Future o None si ya está vigente."""
+        if exportacion_vigente(nombre, formato):
+            return None
+        clave = (nombre, formato)
+        with self._lock:
+            future = self._en_curso.get(clave)
+            if future is not None:
+                return future
+            self._errores.pop(clave, None)
+            future = self._executor.submit(exportar_grafo, nombre, formato, grafo)
+            self._en_curso[clave] = future
+        # Fuera del lock: si la exportación ya terminó, el callback corre acá mismo
+        # y _terminar toma el lock
+        future.add_done_callback(lambda f: self._terminar(clave, f))
+        return future
+
+    def _terminar(self, clave, future):
+        with self._lock:
+            if self._en_curso.get(clave) is future:
+                del self._en_curso[clave]
+            if future.exception() is not None:
+                self._errores[clave] = str(future.exception())
+
+    def estado(self, nombre, formato):
+        """'listo', 'en_curso', 'error' o 'pendiente' (nunca pedida o desactualizada)."""
+        clave = (nombre, formato)
+        with self._lock:
+            if clave in self._en_curso:
+                return "en_curso"
+            if clave in self._errores:
+                return "error"
+        return "listo" if exportacion_vigente(nombre, formato) else "pendiente"
+
+    def error(self, nombre, formato):
+        return self._errores.get((nombre, formato))
+
+
+exportador = ExportadorGrafos()
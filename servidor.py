@@ -0,0 +1,125 @@
+# ============================================
+# servidor.py — modo producción de la API pública
+#
+#   python servidor.py iniciar --workers 4 --puerto 5001
+#   python servidor.py recargar
+#
+# "recargar" cambia a diccionarios reconstruidos sin tiempo de caída:
+#   1. USR2 al master actual: gunicorn arranca un master nuevo (que vuelve a
+#      importar wsgi.py y precarga los diccionarios actualizados) junto al viejo.
+#      El hook pre_exec de gunicorn.conf.py deja su pid en <pidfile>.nuevo.
+#   2. El master nuevo escribe <pidfile>.2 cuando terminó de precargar, y cada
+#      worker suyo agrega una línea a <pidfile>.<pid>.workers al arrancar
+#      (post_worker_init). Está listo cuando arrancaron todos sus workers.
+#   3. TERM al master viejo: sus workers terminan los requests en curso y salen;
+#      gunicorn renombra <pidfile>.2 a <pidfile>.
+#   Si el nuevo no está listo a tiempo (o muere), se le manda TERM a él y
+#   sigue atendiendo el viejo.
+# ============================================
+
+import argparse
+import os
+import signal
+import sys
+import time
+
+PIDFILE = os.getenv("PIDFILE", "data/gunicorn.pid")
+
+
+def leer_pid(pidfile):
+    """Lee el pid del master de gunicorn (None si no existe el archivo)."""
+    try:
+        with open(pidfile, "r") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def iniciar(workers, puerto, app="wsgi:api"):
+    """Reemplaza el proceso actual por gunicorn con la configuración del proyecto."""
+    os.environ["WORKERS"] = str(workers)
+    os.environ["BIND"] = f"0.0.0.0:{puerto}"
+    os.execvp("gunicorn", ["gunicorn", "-c", "gunicorn.conf.py", app])
+
+
+def workers_listos(pidfile, pid_master):
+    """True si ya arrancaron todos los workers del master (ver post_worker_init en gunicorn.conf.py)."""
+    try:
+        with open(f"{pidfile}.{pid_master}.workers", "r") as f:
+            lineas = [l.split() for l in f if l.strip()]
+    except OSError:
+        return False
+    return bool(lineas) and len({pid for pid, _ in lineas}) >= int(lineas[-1][1])
+
+
+def vivo(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except OSError:
+        return False
+
+
+def borrar(ruta):
+    try:
+        os.remove(ruta)
+    except OSError:
+        pass
+
+
+def recargar(pidfile=PIDFILE, espera=300, gracia=2.0):
+    """Recarga sin caída: levanta un master nuevo y retira el viejo cuando el nuevo está listo."""
+    pid_viejo = leer_pid(pidfile)
+    if pid_viejo is None:
+        print(f"No se encontró el pidfile '{pidfile}'. ¿Está corriendo el servidor?")
+        return False
+
+    borrar(pidfile + ".nuevo")
+    print(f"Enviando USR2 al master {pid_viejo}...")
+    os.kill(pid_viejo, signal.SIGUSR2)
+
+    pid_nuevo = None
+    limite = time.time() + espera
+    while time.time() < limite:
+        pid_nuevo = pid_nuevo or leer_pid(pidfile + ".nuevo")
+        if pid_nuevo and not vivo(pid_nuevo):
+            print(f"El master nuevo {pid_nuevo} terminó sin arrancar; se mantiene el actual.")
+            borrar(pidfile + ".nuevo")
+            return False
+        if pid_nuevo and leer_pid(pidfile + ".2") == pid_nuevo and workers_listos(pidfile, pid_nuevo):
+            break
+        time.sleep(0.5)
+    else:
+        print("El master nuevo no terminó de arrancar a tiempo; se mantiene el actual.")
+        if pid_nuevo and vivo(pid_nuevo):
+            print(f"Retirando el master nuevo {pid_nuevo}...")
+            os.kill(pid_nuevo, signal.SIGTERM)
+        borrar(pidfile + ".nuevo")
+        return False
+
+    # Dar tiempo a que los workers nuevos acepten conexiones
+    time.sleep(gracia)
+    print(f"Master nuevo {pid_nuevo} listo. Retirando el master {pid_viejo}...")
+    os.kill(pid_viejo, signal.SIGTERM)
+    borrar(pidfile + ".nuevo")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Modo producción de la API pública")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_iniciar = sub.add_parser("iniciar", help="Arranca gunicorn con diccionarios precargados")
+    p_iniciar.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", "2")))
+    p_iniciar.add_argument("--puerto", type=int, default=5001)
+    p_iniciar.add_argument("--app", default="wsgi:api")
+
+    p_recargar = sub.add_parser("recargar", help="Cambia a diccionarios reconstruidos sin caída")
+    p_recargar.add_argument("--pidfile", default=PIDFILE)
+    p_recargar.add_argument("--espera", type=float, default=300)
+
+    args = parser.parse_args()
+    if args.comando == "iniciar":
+        iniciar(args.workers, args.puerto, args.app)
+    else:
+        sys.exit(0 if recargar(args.pidfile, args.espera) else 1)
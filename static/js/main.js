@@ -258,8 +258,8 @@ document.addEventListener("DOMContentLoaded", function () {
           statusBox.innerText = res.message;
           currentDiccionario = dicName; // Establecer diccionario actual
           
-          graphSummary.innerHTML = `<strong>Nodos:</strong> ${res.graph.nodes.length} — <strong>Aristas:</strong> ${res.graph.edges.length}`;
-          renderGraphPreview(res.graph); // Tu función original
+          graphSummary.innerHTML = `<strong>Nodos:</strong> ${res.resumen.nodos} — <strong>Aristas:</strong> ${res.resumen.aristas}`;
+          cargarVistaPrevia(dicName);
           
           alert("Diccionario guardado.");
           document.getElementById("tab2-tab").click(); // Ir a pestaña 2
@@ -338,8 +338,8 @@ document.addEventListener("DOMContentLoaded", function () {
     if (data.ok) {
       currentDiccionario = nombre; // IMPORTANTE: Actualizamos la variable global para la búsqueda
       
-      graphSummary.innerHTML = `<strong>Diccionario:</strong> ${nombre} (Nodos: ${data.graph.nodes.length})`;
-      renderGraphPreview(data.graph); // Usamos tu visualización original
+      graphSummary.innerHTML = `<strong>Diccionario:</strong> ${nombre} (Nodos: ${data.resumen.nodos})`;
+      cargarVistaPrevia(nombre);
       loadDiccionarios(); // Recargar lista para actualizar el badge de "Activo"
     } else {
       alert("Error: " + data.error);
@@ -411,6 +411,18 @@ document.addEventListener("DOMContentLoaded", function () {
   // ============================================
   // 6. VISUALIZACIÓN ORIGINAL (LA QUE QUERÍAS)
   // ============================================
+  // La vista previa llega comprimida y ya calculada desde /api/preview
+  async function cargarVistaPrevia(nombre, n = 500, pesoMin = 0) {
+    graphView.innerHTML = "<div class='text-muted'>Cargando vista previa...</div>";
+    try {
+      const res = await fetch(locationPathName + `/api/preview/${encodeURIComponent(nombre)}?n=${n}&peso_min=${pesoMin}`);
+      if (!res.ok) throw new Error(res.status);
+      renderGraphPreview(await res.json());
+    } catch (e) {
+      graphView.innerHTML = "<p class='text-danger'>No se pudo cargar la vista previa</p>";
+    }
+  }
+
   function renderGraphPreview(graphJson) {
     graphView.innerHTML = "";
 
@@ -0,0 +1,23 @@
+# ============================================
+# wsgi.py — punto de entrada para producción
+# - Precarga y calienta los diccionarios configurados ANTES de que gunicorn
+#   haga fork (varios a la vez, PRECARGA_HILOS); /api/v1/ready ya responde 200
+# - Los workers heredan los diccionarios por copy-on-write
+# Uso: python servidor.py iniciar   (o gunicorn -c gunicorn.conf.py wsgi:api)
+# ============================================
+
+import gc
+
+from public_api import app as api, diccionarios_configurados, precargar_diccionarios
+
+print("Precargando diccionarios para producción...")
+cargados = precargar_diccionarios(diccionarios_configurados())
+print(f"✓ {len(cargados)} diccionarios precargados y calentados: {', '.join(cargados)}")
+
+# Mover los objetos precargados a la generación permanente del GC: así los
+# recorridos del recolector en los workers no escriben en esas páginas y la
+# memoria sigue compartida por copy-on-write en lugar de duplicarse.
+gc.freeze()
+
+# Alias por convención WSGI
+application = api